@@ -75,7 +75,7 @@ def _count_completed_by_type(user_id: str) -> dict:
     from apps.submissions.documents import LessonProgress
 
     completed = {"lecture": 0, "task": 0, "puzzle": 0, "question": 0}
-    for lp in LessonProgress.objects(user_id=user_id, status="completed"):
+    for lp in LessonProgress.objects(user_id=user_id, status="completed").only("lesson_type").exclude("id"):
         completed[lp.lesson_type] = completed.get(lp.lesson_type, 0) + 1
     return completed
 
@@ -87,23 +87,21 @@ def _count_lectures_with_questions_completed(user_id: str) -> int:
     # lesson_id вида "lecture_id::block_id" — это блок вопроса
     # Нужно посчитать уникальные lecture_id, у которых все блоки completed
     from apps.tracks.documents import Track
+    from apps.tracks.progress import load_lecture_question_blocks
     from apps.tracks.serializers import _get_lesson_display_id, get_lesson_status_for_user
 
+    tracks = list(Track.objects.only("lessons"))
+    lecture_refs = [lesson for track in tracks for lesson in track.lessons if lesson.type == "lecture"]
+    # Индекс вопросов всех лекций одним запросом; учитываются только блоки-вопросы (не паузы видео)
+    question_blocks = load_lecture_question_blocks(lecture_refs)
     count = 0
-    for track in Track.objects.all():
-        for lesson in track.lessons:
-            if lesson.type != "lecture":
-                continue
-            display_id = _get_lesson_display_id(lesson)
-            status, _ = get_lesson_status_for_user(user_id, lesson, display_id)
-            if status in ("completed", "completed_late"):
-                # Проверяем, есть ли в лекции question-блоки
-                from apps.tracks.serializers import _get_lecture_for_lesson
-                lecture = _get_lecture_for_lesson(lesson)
-                blocks = getattr(lecture, "blocks", None) or []
-                q_count = sum(1 for b in blocks if isinstance(b, dict) and b.get("type") == "question" and b.get("id"))
-                if q_count > 0:
-                    count += 1
+    for lesson in lecture_refs:
+        if not any("::" not in bid for bid in question_blocks.get(str(lesson.id), [])):
+            continue
+        display_id = _get_lesson_display_id(lesson)
+        status, _ = get_lesson_status_for_user(user_id, lesson, display_id)
+        if status in ("completed", "completed_late"):
+            count += 1
     return count
 
 
@@ -7,6 +7,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 
 from common.db_utils import get_doc_by_pk
+from common.http_cache import conditional_get
 from .documents import LayoutLesson
 from .serializers import LayoutSerializer, LayoutCheckSerializer, LayoutDraftSerializer
 from .checker import check_layout
@@ -53,8 +54,7 @@ class LayoutViewSet(GenericViewSet, RetrieveModelMixin, CreateModelMixin, Update
             instance = self.get_object()
         except LayoutLesson.DoesNotExist:
             return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
-        ser = self.get_serializer(instance)
-        return Response(ser.data)
+        return conditional_get(request, ("lessons",), lambda: Response(self.get_serializer(instance).data))
 
     def create(self, request, *args, **kwargs):
         visible_group_ids = request.data.get("visible_group_ids") or []
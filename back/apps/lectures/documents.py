@@ -19,6 +19,36 @@ class BlockCode(EmbeddedDocument):
     language = StringField(default="python")
 
 
+# Версия формата производного индекса вопросов; 0 — индекс ещё не построен (старые лекции)
+QUESTION_INDEX_VERSION = 1
+
+
+def build_question_index(blocks) -> tuple:
+    """
+    (question_block_ids, question_answers) по блокам лекции.
+    question_block_ids — id блоков-вопросов и "<video_id>::<pause_id>" для вопросов на паузах видео;
+    question_answers — {block_id: [id верных вариантов]} для вопросов, у которых есть варианты.
+    """
+    ids, answers = [], {}
+
+    def add(block_id, question):
+        ids.append(block_id)
+        choices = (question or {}).get("choices") or []
+        if choices:
+            answers[block_id] = [str(c.get("id")) for c in choices if c.get("is_correct")]
+
+    for b in blocks or []:
+        if not isinstance(b, dict) or not b.get("id"):
+            continue
+        if b.get("type") == "question":
+            add(b["id"], b)
+        elif b.get("type") == "video":
+            for pp in b.get("pause_points", []):
+                if pp.get("id"):
+                    add(f"{b['id']}::{pp['id']}", pp.get("question"))
+    return ids, answers
+
+
 class Lecture(Document):
     meta = {
         "collection": "lectures",
@@ -45,3 +75,46 @@ class Lecture(Document):
     max_attempts = IntField(default=None)
     # ID оригинального материала, из которого скопирован (copy-on-edit / fork)
     copied_from_id = StringField(default="")
+    # Производный индекс вопросов (build_question_index), пересчитывается при сохранении:
+    # проверкам статуса не нужно загружать и разбирать blocks.
+    question_block_ids = ListField(StringField(), default=list)
+    question_answers = DictField(default=dict)
+    question_index_version = IntField(default=0)
+
+    def clean(self):
+        self.question_block_ids, self.question_answers = build_question_index(self.blocks)
+        self.question_index_version = QUESTION_INDEX_VERSION
+
+    def get_question_block_ids(self) -> list:
+        """id блоков-вопросов: из индекса, а для лекции без индекса — разбором blocks."""
+        if (self.question_index_version or 0) >= QUESTION_INDEX_VERSION:
+            return list(self.question_block_ids or [])
+        return build_question_index(self.blocks)[0]
+
+    def get_question_answers(self) -> dict:
+        """{block_id: [id верных вариантов]}: из индекса или разбором blocks."""
+        if (self.question_index_version or 0) >= QUESTION_INDEX_VERSION:
+            return dict(self.question_answers or {})
+        return build_question_index(self.blocks)[1]
+
+
+def load_question_block_ids(lecture_ids) -> dict:
+    """
+    {ObjectId-строка лекции: id блоков-вопросов} одним запросом только по полям индекса;
+    blocks читаются лишь для лекций, сохранённых до появления индекса.
+    """
+    from bson import ObjectId
+
+    oids = list({ObjectId(str(i)) for i in lecture_ids if ObjectId.is_valid(str(i or ""))})
+    if not oids:
+        return {}
+    result, legacy = {}, []
+    for raw in Lecture.objects(id__in=oids).only("question_block_ids", "question_index_version").as_pymongo():
+        if (raw.get("question_index_version") or 0) >= QUESTION_INDEX_VERSION:
+            result[str(raw["_id"])] = list(raw.get("question_block_ids") or [])
+        else:
+            legacy.append(raw["_id"])
+    if legacy:
+        for raw in Lecture.objects(id__in=legacy).only("blocks").as_pymongo():
+            result[str(raw["_id"])] = build_question_index(raw.get("blocks"))[0]
+    return result
@@ -0,0 +1,29 @@
+"""
+Пересчёт производного индекса вопросов лекций (question_block_ids, question_answers).
+Нужен для лекций, сохранённых до появления индекса; новые и изменённые лекции
+индексируются при сохранении.
+Запуск: python manage.py reindex_lecture_questions [--all]
+"""
+from django.core.management.base import BaseCommand
+
+from apps.lectures.documents import QUESTION_INDEX_VERSION, Lecture, build_question_index
+
+
+class Command(BaseCommand):
+    help = "Build question_block_ids / question_answers for lectures saved without them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Reindex every lecture, not only outdated ones")
+
+    def handle(self, *args, **options):
+        qs = Lecture.objects if options["all"] else Lecture.objects(question_index_version__ne=QUESTION_INDEX_VERSION)
+        count = 0
+        for raw in qs.only("blocks").as_pymongo():
+            ids, answers = build_question_index(raw.get("blocks"))
+            Lecture.objects(id=raw["_id"]).update_one(
+                set__question_block_ids=ids,
+                set__question_answers=answers,
+                set__question_index_version=QUESTION_INDEX_VERSION,
+            )
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Reindexed {count} lecture(s)."))
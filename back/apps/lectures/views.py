@@ -14,34 +14,17 @@ import os
 from pathlib import Path
 
 from common.db_utils import get_doc_by_pk
+from common.http_cache import conditional_get
 from .documents import Lecture
 from .serializers import LectureSerializer
 from apps.users.permissions import IsTeacher, IsTeacherOrSuperuser
 from apps.users.teacher_utils import validate_visible_group_ids_for_teacher
-from apps.submissions.progress import save_lesson_progress
+from apps.submissions.progress import load_block_progress, save_lesson_progress
 from apps.tracks.documents import Track
 
 
-def _get_question_block_ids(blocks):
-    """Возвращает список block_id для блоков-вопросов и video_id::pause_point_id для таймкодов видео."""
-    if not blocks:
-        return []
-    ids = []
-    for b in blocks:
-        if not isinstance(b, dict):
-            continue
-        if b.get("type") == "question" and b.get("id"):
-            ids.append(b.get("id"))
-        elif b.get("type") == "video" and b.get("id"):
-            for pp in b.get("pause_points", []):
-                if pp.get("id"):
-                    ids.append(f"{b.get('id')}::{pp.get('id')}")
-    return ids
-
-
 def _lecture_has_question_blocks(lecture):
-    ids = _get_question_block_ids(getattr(lecture, "blocks", None) or [])
-    return len(ids) > 0
+    return len(lecture.get_question_block_ids()) > 0
 
 
 def _is_visible_group_only_patch(data):
@@ -97,8 +80,7 @@ class LectureViewSet(GenericViewSet, RetrieveModelMixin, CreateModelMixin, Updat
                 track_title=track_title,
                 available_until=getattr(instance, "available_until", None),
             )
-        ser = self.get_serializer(instance)
-        return Response(ser.data)
+        return conditional_get(request, ("lessons",), lambda: Response(self.get_serializer(instance).data))
 
     def create(self, request, *args, **kwargs):
         visible_group_ids = request.data.get("visible_group_ids") or []
@@ -201,30 +183,17 @@ class LectureViewSet(GenericViewSet, RetrieveModelMixin, CreateModelMixin, Updat
         user_id = str(request.user.id) if request.user and getattr(request.user, "id", None) else None
         if not user_id:
             return Response({"blocks": {}}, status=200)
-        from apps.submissions.documents import LessonProgress
         lecture_display_id = str(getattr(lecture, "public_id", None) or lecture.id)
-        q_block_ids = _get_question_block_ids(getattr(lecture, "blocks", None) or [])
+        answers = lecture.get_question_answers()
+        q_block_ids = lecture.get_question_block_ids()
+        progress = load_block_progress(user_id, lecture_display_id, q_block_ids)
         blocks_data = {}
-        blocks_raw = getattr(lecture, "blocks", None) or []
         for bid in q_block_ids:
-            lid = f"{lecture_display_id}::{bid}"
-            lp = LessonProgress.objects(user_id=user_id, lesson_id=lid).first()
-            block = None
-            correct_ids = []
-            if "::" in bid:
-                vid, ppid = bid.split("::", 1)
-                vblock = next((b for b in blocks_raw if isinstance(b, dict) and b.get("type") == "video" and b.get("id") == vid), None)
-                if vblock:
-                    pp = next((p for p in vblock.get("pause_points", []) if p.get("id") == ppid), None)
-                    if pp:
-                        block = pp.get("question", {})
-            else:
-                block = next((b for b in blocks_raw if isinstance(b, dict) and b.get("type") == "question" and b.get("id") == bid), None)
-            if block and lp and lp.status == "completed":
-                correct_ids = [str(c.get("id")) for c in block.get("choices", []) if c.get("is_correct")]
+            lp = progress.get(bid)
+            completed = bool(lp and lp.status == "completed")
             blocks_data[bid] = {
                 "status": lp.status if lp else None,
-                "correct_ids": correct_ids if lp and lp.status == "completed" else None,
+                "correct_ids": list(answers.get(bid, [])) if completed else None,
             }
         return Response({"blocks": blocks_data})
 
@@ -239,25 +208,11 @@ class LectureViewSet(GenericViewSet, RetrieveModelMixin, CreateModelMixin, Updat
         selected = request.data.get("selected", [])
         if not block_id or not isinstance(selected, list):
             return Response({"detail": "block_id and selected required."}, status=status.HTTP_400_BAD_REQUEST)
-        blocks = getattr(lecture, "blocks", None) or []
-        choices = []
-        # Обычный блок-вопрос
-        block = next((b for b in blocks if isinstance(b, dict) and b.get("type") == "question" and b.get("id") == block_id), None)
-        if block:
-            choices = block.get("choices", [])
-        else:
-            # Таймкод видео: block_id = "video_id::pause_point_id"
-            if "::" in block_id:
-                vid, ppid = block_id.split("::", 1)
-                vblock = next((b for b in blocks if isinstance(b, dict) and b.get("type") == "video" and b.get("id") == vid), None)
-                if vblock:
-                    pp = next((p for p in vblock.get("pause_points", []) if p.get("id") == ppid), None)
-                    if pp:
-                        block = pp.get("question", {})
-                        choices = block.get("choices", [])
-        if not choices:
+        # Блок-вопрос или таймкод видео (block_id = "video_id::pause_point_id")
+        answers = lecture.get_question_answers()
+        if block_id not in answers:
             return Response({"detail": "Question block not found."}, status=status.HTTP_404_NOT_FOUND)
-        correct_ids = {str(c.get("id")) for c in choices if c.get("is_correct")}
+        correct_ids = set(answers[block_id])
         selected_set = {str(s) for s in selected}
         passed = correct_ids == selected_set
         user_id = str(request.user.id) if request.user and getattr(request.user, "id", None) else None
@@ -279,15 +234,11 @@ class LectureViewSet(GenericViewSet, RetrieveModelMixin, CreateModelMixin, Updat
                 available_until=getattr(lecture, "available_until", None),
             )
             if passed:
-                from apps.submissions.documents import LessonProgress
-                q_block_ids = _get_question_block_ids(blocks)
-                all_done = True
-                for qid in q_block_ids:
-                    lid = f"{lecture_display_id}::{qid}"
-                    lp = LessonProgress.objects(user_id=user_id, lesson_id=lid).first()
-                    if not lp or lp.status != "completed":
-                        all_done = False
-                        break
+                q_block_ids = lecture.get_question_block_ids()
+                progress = load_block_progress(user_id, lecture_display_id, q_block_ids)
+                all_done = all(
+                    qid in progress and progress[qid].status == "completed" for qid in q_block_ids
+                )
                 if all_done:
                     save_lesson_progress(
                         user_id, lecture_display_id, "lecture", True,
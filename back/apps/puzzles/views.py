@@ -4,6 +4,7 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 
 from common.db_utils import get_doc_by_pk
+from common.http_cache import conditional_get
 from .documents import Puzzle
 from .serializers import PuzzleSerializer
 from apps.users.permissions import IsTeacher
@@ -45,8 +46,9 @@ def puzzle_detail(request, puzzle_id):
         return Response({'error': 'Puzzle not found'}, status=status.HTTP_404_NOT_FOUND)
 
     if request.method == 'GET':
-        serializer = PuzzleSerializer(puzzle, context={"request": request})
-        return Response(serializer.data)
+        return conditional_get(
+            request, ("lessons",), lambda: Response(PuzzleSerializer(puzzle, context={"request": request}).data)
+        )
 
     if request.method in ('PUT', 'PATCH'):
         if not request.user or not getattr(request.user, "id", None):
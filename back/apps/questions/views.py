@@ -4,6 +4,7 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
 from common.db_utils import get_doc_by_pk
+from common.http_cache import conditional_get
 from .documents import Question
 from .serializers import QuestionSerializer
 from apps.submissions.progress import save_lesson_progress
@@ -66,8 +67,9 @@ def question_detail(request, question_id):
         return Response({"error": "Question not found"}, status=status.HTTP_404_NOT_FOUND)
 
     if request.method == "GET":
-        serializer = QuestionSerializer(question, context={"request": request})
-        return Response(serializer.data)
+        return conditional_get(
+            request, ("lessons",), lambda: Response(QuestionSerializer(question, context={"request": request}).data)
+        )
 
     if request.method in ("PUT", "PATCH"):
         if not request.user or not getattr(request.user, "id", None):
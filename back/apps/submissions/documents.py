@@ -5,7 +5,14 @@ from mongoengine import Document, StringField, ListField, DateTimeField, DictFie
 class Submission(Document):
     meta = {
         "collection": "submissions",
-        "indexes": ["task_id", "user_id", "created_at"],
+        "indexes": [
+            "task_id",
+            "created_at",
+            # Попытки ученика по задаче: счётчик, последняя отправка, последний результат (passed в индексе —
+            # запросы с проекцией passed/created_at покрываются индексом)
+            {"fields": ["user_id", "task_id", "-created_at", "passed"], "name": "user_task_latest"},
+        ],
+        "index_background": True,
     }
     task_id = StringField(required=True)
     user_id = StringField(required=True)
@@ -15,6 +22,24 @@ class Submission(Document):
     created_at = DateTimeField(default=datetime.utcnow)
 
 
+class SubmissionJob(Document):
+    """Отправка решения, поставленная в очередь Celery (TASK_SUBMIT_ASYNC)."""
+    meta = {
+        "collection": "submission_jobs",
+        "indexes": [{"fields": ["user_id", "task_id"]}, "created_at"],
+    }
+    task_id = StringField(required=True)
+    user_id = StringField(required=True)
+    status = StringField(required=True, default="queued", choices=["queued", "running", "done", "failed"])
+    passed = BooleanField(default=None)
+    results = ListField(DictField(), default=list)
+    message = StringField(default="")
+    unlocked_achievements = ListField(DictField(), default=list)
+    error = StringField(default="")
+    created_at = DateTimeField(default=datetime.utcnow)
+    updated_at = DateTimeField(default=datetime.utcnow)
+
+
 class TaskDraft(Document):
     """Черновик кода ученика по задаче (сохраняется при редактировании)."""
     meta = {
@@ -55,10 +80,12 @@ class LessonProgress(Document):
         "collection": "lesson_progress",
         "indexes": [
             {"fields": ["user_id", "lesson_id"], "unique": True},
-            "user_id",
             "lesson_id",
             "updated_at",
+            # Аналитика по выполненным урокам: (ученики, status, период) с проекцией updated_at / lesson_type
+            {"fields": ["user_id", "status", "-updated_at", "lesson_type"], "name": "user_status_updated"},
         ],
+        "index_background": True,
     }
     user_id = StringField(required=True)
     lesson_id = StringField(required=True)  # id урока (ObjectId или public_id)
@@ -0,0 +1,61 @@
+"""
+Сверка индексов MongoDB с объявленными в meta документов всех приложений.
+Недостающие индексы создаются (в фоне, если у документа index_background),
+лишние только выводятся; с --drop-extra — удаляются.
+Запуск: python manage.py ensure_indexes [--collection NAME] [--dry-run] [--drop-extra]
+"""
+import inspect
+from importlib import import_module
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from mongoengine import Document
+
+
+def iter_documents():
+    """Классы документов (с коллекцией) из documents.py всех установленных приложений."""
+    for app_config in apps.get_app_configs():
+        try:
+            module = import_module(f"{app_config.name}.documents")
+        except ImportError:
+            continue
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if (
+                issubclass(cls, Document)
+                and cls.__module__ == module.__name__
+                and not cls._meta.get("abstract")
+                and cls._meta.get("collection")
+            ):
+                yield cls
+
+
+class Command(BaseCommand):
+    help = "Create missing MongoDB indexes declared in document meta and report extra ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--collection", action="append", default=[], help="Only this collection (repeatable)")
+        parser.add_argument("--dry-run", action="store_true", help="Only report, do not create or drop")
+        parser.add_argument("--drop-extra", action="store_true", help="Drop indexes not declared in meta")
+
+    def handle(self, *args, **options):
+        for doc in iter_documents():
+            collection_name = doc._meta["collection"]
+            if options["collection"] and collection_name not in options["collection"]:
+                continue
+            diff = doc.compare_indexes()
+            for fields in diff["missing"]:
+                self.stdout.write(f"{collection_name}: missing {fields}")
+            for fields in diff["extra"]:
+                self.stdout.write(self.style.WARNING(f"{collection_name}: extra {fields}"))
+            if options["dry_run"]:
+                continue
+            if diff["missing"]:
+                doc.ensure_indexes()
+            if options["drop_extra"] and diff["extra"]:
+                collection = doc._get_collection()
+                extra = [[tuple(key) for key in fields] for fields in diff["extra"]]
+                for name, info in collection.index_information().items():
+                    if name != "_id_" and [tuple(key) for key in info["key"]] in extra:
+                        collection.drop_index(name)
+                        self.stdout.write(f"{collection_name}: dropped {name}")
+        self.stdout.write(self.style.SUCCESS("Indexes are up to date." if not options["dry_run"] else "Dry run done."))
@@ -0,0 +1,161 @@
+"""
+Пересчёт LessonProgress из истории: Submission, AssignmentAttempt и прогресс блоков лекций
+(см. apps/submissions/rebuild.py). Нужен после смены id уроков (assign_public_ids) и изменения
+вопросов в лекциях.
+
+Пользователи обрабатываются пакетами по возрастанию id; данные пакета читаются курсорами,
+изменения пишутся неупорядоченным bulk_write. После каждого пакета id последнего пользователя
+сохраняется в --checkpoint, --resume продолжает с него. TrackProgress пользователей с изменениями
+удаляется (bulk_write не проходит через save_lesson_progress) — следующее чтение пересчитает его.
+
+Запуск: python manage.py rebuild_lesson_progress [--dry-run] [--batch-size N]
+        [--checkpoint FILE] [--resume] [--after USER_ID] [--user USER_ID]
+"""
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+
+from bson import ObjectId
+from django.core.management.base import BaseCommand, CommandError
+from pymongo import DeleteOne, UpdateOne
+
+from apps.lectures.documents import load_question_block_ids
+from apps.submissions.documents import AssignmentAttempt, LessonProgress, Submission
+from apps.submissions.rebuild import rebuild_user_progress
+from apps.tracks.documents import TrackProgress
+from apps.users.documents import User
+from common import http_cache, lesson_registry
+
+
+class Command(BaseCommand):
+    help = "Recompute LessonProgress from Submission / AssignmentAttempt history in user batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Users per batch")
+        parser.add_argument("--dry-run", action="store_true", help="Print the diff, write nothing")
+        parser.add_argument("--checkpoint", type=Path, help="JSON file with the last processed user id")
+        parser.add_argument("--resume", action="store_true", help="Start after the user id in --checkpoint")
+        parser.add_argument("--after", default="", help="Start after this user id")
+        parser.add_argument("--user", action="append", default=[], help="Only this user id (repeatable)")
+
+    def handle(self, *args, **options):
+        after = options["after"]
+        if options["resume"]:
+            if not options["checkpoint"] or not options["checkpoint"].exists():
+                raise CommandError("--resume needs an existing --checkpoint file.")
+            after = json.loads(options["checkpoint"].read_text(encoding="utf-8")).get("last_user_id", "")
+
+        lecture_blocks = load_question_block_ids(entry["id"] for entry in lesson_registry.get_lessons("lecture"))
+        users = User.objects.order_by("id").only("id")
+        if options["user"]:
+            users = users.filter(id__in=[ObjectId(u) for u in options["user"]])
+        if after:
+            users = users.filter(id__gt=ObjectId(after))
+        total = users.count()
+
+        started = time.monotonic()
+        done = upserts = deletes = 0
+        batch = []
+        for raw in users.as_pymongo().no_cache():
+            batch.append(str(raw["_id"]))
+            if len(batch) >= options["batch_size"]:
+                u, d = self._process(batch, lecture_blocks, options)
+                done, upserts, deletes = done + len(batch), upserts + u, deletes + d
+                self._report(done, total, upserts, deletes, started, batch[-1], options)
+                batch = []
+        if batch:
+            u, d = self._process(batch, lecture_blocks, options)
+            done, upserts, deletes = done + len(batch), upserts + u, deletes + d
+            self._report(done, total, upserts, deletes, started, batch[-1], options)
+
+        verb = "Would write" if options["dry_run"] else "Wrote"
+        self.stdout.write(
+            self.style.SUCCESS(f"{verb} {upserts} upsert(s), {deletes} delete(s) for {done} user(s).")
+        )
+
+    def _process(self, user_ids, lecture_blocks, options):
+        rows, submissions, attempts = self._load_batch(user_ids)
+        requests = []
+        changed_users = []
+        n_upserts = n_deletes = 0
+        for user_id in user_ids:
+            ops = rebuild_user_progress(
+                rows.get(user_id, []),
+                submissions.get(user_id, {}),
+                attempts.get(user_id, {}),
+                lesson_registry.get_lesson,
+                lecture_blocks,
+            )
+            if not ops:
+                continue
+            changed_users.append(user_id)
+            for op in ops:
+                if op[0] == "upsert":
+                    _, lesson_id, fields, old = op
+                    n_upserts += 1
+                    if options["dry_run"]:
+                        mark = "~" if old else "+"
+                        old_status = f"{old['status']} -> " if old else ""
+                        self.stdout.write(f"{mark} {user_id} {lesson_id}: {old_status}{fields['status']}")
+                        continue
+                    fields = {**fields, "updated_at": fields.get("updated_at") or datetime.utcnow()}
+                    requests.append(
+                        UpdateOne({"user_id": user_id, "lesson_id": lesson_id}, {"$set": fields}, upsert=True)
+                    )
+                else:
+                    _, doc_id, lesson_id, new_lesson_id = op
+                    n_deletes += 1
+                    if options["dry_run"]:
+                        self.stdout.write(f"- {user_id} {lesson_id} (-> {new_lesson_id})")
+                        continue
+                    requests.append(DeleteOne({"_id": doc_id}))
+        if requests:
+            LessonProgress._get_collection().bulk_write(requests, ordered=False)
+            http_cache.bump(*[http_cache.progress_scope(user_id) for user_id in changed_users])
+            # Статусы в TrackProgress устарели: get_track_progress пересчитает удалённые записи при чтении
+            TrackProgress.objects(user_id__in=changed_users).delete()
+        return n_upserts, n_deletes
+
+    def _load_batch(self, user_ids):
+        """Данные пакета пользователей курсорами: {user_id: ...} для прогресса, отправок и попыток."""
+        rows = {}
+        for row in LessonProgress.objects(user_id__in=user_ids).as_pymongo().no_cache():
+            rows.setdefault(row["user_id"], []).append(row)
+
+        submissions = {}
+        pipeline = [
+            {"$group": {
+                "_id": {"user_id": "$user_id", "task_id": "$task_id"},
+                "passed": {"$max": "$passed"},
+                "first_at": {"$min": "$created_at"},
+                "first_passed_at": {"$min": {"$cond": ["$passed", "$created_at", None]}},
+            }},
+        ]
+        for row in Submission.objects(user_id__in=user_ids).aggregate(pipeline, allowDiskUse=True):
+            key = row["_id"]
+            submissions.setdefault(key["user_id"], {})[key["task_id"]] = {
+                "passed": bool(row["passed"]),
+                "first_at": row["first_at"],
+                "first_passed_at": row["first_passed_at"],
+            }
+
+        attempts = {}
+        pipeline = [
+            {"$group": {
+                "_id": {"user_id": "$user_id", "type": "$target_type", "id": "$target_id"},
+                "first_at": {"$min": "$created_at"},
+            }},
+        ]
+        for row in AssignmentAttempt.objects(user_id__in=user_ids).aggregate(pipeline, allowDiskUse=True):
+            key = row["_id"]
+            attempts.setdefault(key["user_id"], {})[(key["type"], key["id"])] = row["first_at"]
+        return rows, submissions, attempts
+
+    def _report(self, done, total, upserts, deletes, started, last_user_id, options):
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"{done}/{total} users, {upserts} upsert(s), {deletes} delete(s), {elapsed:.1f}s (last user {last_user_id})"
+        )
+        if options["checkpoint"] and not options["dry_run"]:
+            options["checkpoint"].write_text(json.dumps({"last_user_id": last_user_id}), encoding="utf-8")
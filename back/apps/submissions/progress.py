@@ -1,8 +1,90 @@
 """Хелперы для сохранения прогресса по урокам."""
+import logging
 from datetime import datetime, timezone
 
+from mongoengine.errors import NotUniqueError
+
 from apps.submissions.documents import LessonProgress
-from common.db_utils import get_doc_by_pk
+from common import http_cache
+from common.db_utils import get_doc_by_pk, to_utc_datetime
+
+logger = logging.getLogger(__name__)
+
+
+def completion_lateness(completed_at, available_until) -> tuple:
+    """(completed_late, late_by_seconds) для выполнения в completed_at при сроке available_until (naive — UTC)."""
+    if completed_at is None or available_until is None:
+        return (False, 0)
+    done = to_utc_datetime(completed_at)
+    au = to_utc_datetime(available_until)
+    if done > au:
+        return (True, max(0, int((done - au).total_seconds())))
+    return (False, 0)
+
+
+def load_block_progress(user_id: str, lecture_display_id: str, block_ids) -> dict:
+    """{block_id: LessonProgress} по блокам-вопросам лекции ("<display_id>::<block_id>") одним запросом $in."""
+    keys = {f"{lecture_display_id}::{bid}": bid for bid in block_ids}
+    if not keys:
+        return {}
+    progress = {}
+    for lp in LessonProgress.objects(user_id=user_id, lesson_id__in=list(keys)).only("lesson_id", "status"):
+        progress.setdefault(keys[lp.lesson_id], lp)
+    return progress
+
+
+def upsert_lesson_progress(
+    user_id: str,
+    lesson_id: str,
+    lesson_type: str,
+    status: str,
+    *,
+    completed_late: bool = False,
+    late_by_seconds: int = 0,
+    lesson_title: str = "",
+    track_id: str = "",
+    track_title: str = "",
+) -> bool:
+    """
+    Атомарно записывает прогресс по уроку одним findAndModify с upsert.
+    completed никогда не понижается до started: для started статус пишется через $min,
+    а "completed" < "started" в порядке строк. Пустые lesson_title / track_id / track_title
+    не перезаписывают сохранённые.
+    Возвращает True, если статус урока изменился (в том числе при создании записи).
+    """
+    update = {
+        "set_on_insert__lesson_type": lesson_type,
+        "set_on_insert__updated_at": datetime.utcnow(),
+    }
+    for name, value in (("lesson_title", lesson_title), ("track_id", track_id), ("track_title", track_title)):
+        update[f"set__{name}" if value else f"set_on_insert__{name}"] = value or ""
+    if status == "completed":
+        update.update(set__status="completed", set__completed_late=completed_late, set__late_by_seconds=late_by_seconds)
+    else:
+        update.update(min__status=status, set_on_insert__completed_late=False, set_on_insert__late_by_seconds=0)
+
+    # Повтор: при одновременном upsert одна из вставок получает ошибку уникального индекса,
+    # а второй раз запрос уже находит созданную запись
+    for attempt in range(2):
+        try:
+            previous = LessonProgress.objects(user_id=user_id, lesson_id=lesson_id).only(
+                "status", "completed_late", "late_by_seconds"
+            ).modify(upsert=True, new=False, **update)
+        except NotUniqueError:
+            if attempt:
+                raise
+            continue
+        if previous is None:
+            http_cache.bump(http_cache.progress_scope(user_id))
+            return True
+        current = status if status == "completed" else min(previous.status, status)
+        late_changed = status == "completed" and (previous.completed_late, previous.late_by_seconds) != (
+            completed_late, late_by_seconds
+        )
+        if current != previous.status or late_changed:
+            http_cache.bump(http_cache.progress_scope(user_id))
+        return current != previous.status
+    return False
 
 
 def save_lesson_progress(
@@ -24,56 +106,39 @@ def save_lesson_progress(
     status = "completed" if passed else "started"
     completed_late = False
     late_by_seconds = 0
-    if passed and available_until is not None:
-        now = datetime.now(timezone.utc)
-        au = available_until
-        if au.tzinfo is None:
-            au = au.replace(tzinfo=timezone.utc)
-        else:
-            au = au.astimezone(timezone.utc)
-        if now > au:
-            completed_late = True
-            late_by_seconds = max(0, int((now - au).total_seconds()))
-
-    lp = LessonProgress.objects(user_id=user_id, lesson_id=lesson_id).first()
-    if lp:
-        # Не перезаписывать "completed" на "started" (например при повторном открытии лекции)
-        if lp.status == "completed" and status == "started":
-            if lesson_title:
-                lp.lesson_title = lesson_title
-            if track_id:
-                lp.track_id = track_id
-            if track_title:
-                lp.track_title = track_title
-            lp.save()
-            return
-        lp.status = status
-        if lesson_title:
-            lp.lesson_title = lesson_title
-        if track_id:
-            lp.track_id = track_id
-        if track_title:
-            lp.track_title = track_title
-        if passed:
-            lp.completed_late = completed_late
-            lp.late_by_seconds = late_by_seconds
-        lp.save()
-    else:
-        LessonProgress(
-            user_id=user_id,
-            lesson_id=lesson_id,
-            lesson_type=lesson_type,
-            lesson_title=lesson_title,
-            track_id=track_id,
-            track_title=track_title,
-            status=status,
-            completed_late=completed_late,
-            late_by_seconds=late_by_seconds,
-        ).save()
+    if passed:
+        completed_late, late_by_seconds = completion_lateness(datetime.now(timezone.utc), available_until)
+
+    transitioned = upsert_lesson_progress(
+        user_id,
+        lesson_id,
+        lesson_type,
+        status,
+        completed_late=completed_late,
+        late_by_seconds=late_by_seconds,
+        lesson_title=lesson_title,
+        track_id=track_id,
+        track_title=track_title,
+    )
+    # Повторное открытие урока без смены статуса: пересчитывать нечего.
+    # Повторное выполнение пересчитывает TrackProgress (могла измениться просрочка), но не достижения.
+    if not transitioned and not passed:
+        return []
+
+    # Денормализованный прогресс по трекам: ошибка не прерывает сохранение, но пишется в лог
+    try:
+        from apps.tracks.progress import update_lesson_progress
+
+        update_lesson_progress(user_id, str(lesson_id), lesson_type)
+    except Exception:
+        logger.exception(
+            "TrackProgress update failed for user %s lesson %s; run manage.py rebuild_track_progress --user %s",
+            user_id, lesson_id, user_id,
+        )
 
     # Начисление достижений при завершении урока (только для основных типов)
     unlocked_ids = []
-    if passed and lesson_type in ("lecture", "task", "puzzle", "question", "survey", "layout"):
+    if transitioned and passed and lesson_type in ("lecture", "task", "puzzle", "question", "survey", "layout"):
         try:
             from apps.achievements.registry import (
                 check_and_award_achievements,
@@ -0,0 +1,154 @@
+"""
+Пересчёт LessonProgress пользователя из истории (Submission, AssignmentAttempt, прогресс блоков лекций).
+
+Расчёт чистый: на вход — сырые записи одного пользователя, на выход — операции записи.
+Ввод-вывод пакетами по пользователям — в команде rebuild_lesson_progress.
+
+Что исправляется:
+- lesson_id переводится на текущий display id урока (после появления public_id), в том числе
+  "<display_id>::<block_id>" блоков лекций; записи одного урока под разными id сливаются;
+- задачи с отправками и пазлы/вопросы с попытками без записи прогресса получают её;
+- статус лекции пересчитывается по блокам-вопросам (все выполнены — completed, есть ответы — started,
+  вопросов нет — completed при открытии). completed никогда не понижается.
+"""
+from common.db_utils import to_utc_datetime
+
+from .progress import completion_lateness
+
+PROGRESS_FIELDS = (
+    "lesson_type",
+    "status",
+    "completed_late",
+    "late_by_seconds",
+    "lesson_title",
+    "track_id",
+    "track_title",
+    "updated_at",
+)
+
+
+def _display_id(entry) -> str:
+    return str(entry["public_id"] or entry["id"])
+
+
+def _record(row) -> dict:
+    return {name: row.get(name) for name in PROGRESS_FIELDS}
+
+
+def _merge(current, incoming) -> dict:
+    """Запись урока из двух: completed важнее started, при равенстве — более ранняя; пустые подписи дополняются."""
+    if current is None:
+        return incoming
+    rank = {"completed": 1, "started": 0}
+
+    def key(rec):
+        updated = to_utc_datetime(rec.get("updated_at"))
+        return (-rank.get(rec.get("status"), 0), updated is None, updated)
+
+    best, other = (current, incoming) if key(current) <= key(incoming) else (incoming, current)
+    merged = dict(best)
+    for name in ("lesson_title", "track_id", "track_title"):
+        merged[name] = merged.get(name) or other.get(name) or ""
+    return merged
+
+
+def _complete(rec, completed_at, available_until) -> dict:
+    late, late_by = completion_lateness(completed_at, available_until)
+    return {**rec, "status": "completed", "completed_late": late, "late_by_seconds": late_by}
+
+
+def rebuild_user_progress(rows, submissions, attempts, resolve, lecture_blocks) -> list:
+    """
+    Операции для приведения LessonProgress одного пользователя к пересчитанному состоянию.
+
+    rows — сырые документы LessonProgress пользователя (dict из as_pymongo);
+    submissions — {ObjectId задачи: {"passed": bool, "first_passed_at", "first_at"}};
+    attempts — {(target_type, ObjectId): первая попытка (datetime)};
+    resolve(lesson_type, lesson_id) — запись реестра уроков или None;
+    lecture_blocks — {ObjectId лекции: id блоков-вопросов}.
+
+    Возвращает [("upsert", lesson_id, fields, old_fields | None), ("delete", _id, lesson_id, new_lesson_id)].
+    """
+    records = {}
+    originals = {}
+    deletes = []
+    lectures = {}  # display id лекции -> запись реестра
+
+    for row in rows:
+        lesson_id = row["lesson_id"]
+        key = lesson_id
+        if "::" in lesson_id:
+            prefix, block_id = lesson_id.split("::", 1)
+            entry = resolve("lecture", prefix)
+            if entry is not None:
+                key = f"{_display_id(entry)}::{block_id}"
+                lectures[_display_id(entry)] = entry
+        else:
+            entry = resolve(row.get("lesson_type"), lesson_id)
+            if entry is not None:
+                key = _display_id(entry)
+                if row.get("lesson_type") == "lecture":
+                    lectures[key] = entry
+        if key == lesson_id:
+            originals[key] = _record(row)
+        else:
+            deletes.append(("delete", row["_id"], lesson_id, key))
+        records[key] = _merge(records.get(key), _record(row))
+
+    for task_id, info in submissions.items():
+        entry = resolve("task", task_id)
+        if entry is None:
+            continue
+        key = _display_id(entry)
+        rec = records.get(key) or {
+            "lesson_type": "task", "status": "started", "completed_late": False, "late_by_seconds": 0,
+            "lesson_title": entry.get("title") or "", "track_id": "", "track_title": "",
+            "updated_at": info.get("first_passed_at") or info.get("first_at"),
+        }
+        if info.get("passed") and rec.get("status") != "completed":
+            rec = _complete(rec, info.get("first_passed_at"), entry.get("available_until"))
+        records[key] = rec
+
+    for (target_type, target_id), first_at in attempts.items():
+        entry = resolve(target_type, target_id)
+        if entry is None or _display_id(entry) in records:
+            continue
+        records[_display_id(entry)] = {
+            "lesson_type": target_type, "status": "started", "completed_late": False, "late_by_seconds": 0,
+            "lesson_title": entry.get("title") or "", "track_id": "", "track_title": "", "updated_at": first_at,
+        }
+
+    for display_id, entry in lectures.items():
+        block_ids = lecture_blocks.get(entry["id"], [])
+        rec = records.get(display_id)
+        if rec is not None and rec.get("status") == "completed":
+            continue
+        blocks = [records.get(f"{display_id}::{bid}") for bid in block_ids]
+        base = rec or {
+            "lesson_type": "lecture", "status": "started", "completed_late": False, "late_by_seconds": 0,
+            "lesson_title": entry.get("title") or "", "track_id": "", "track_title": "", "updated_at": None,
+        }
+        if not block_ids:
+            if rec is not None:
+                records[display_id] = _complete(rec, rec.get("updated_at"), entry.get("available_until"))
+        elif all(b is not None and b.get("status") == "completed" for b in blocks):
+            done_at = max((to_utc_datetime(b.get("updated_at")) for b in blocks if b.get("updated_at")), default=None)
+            records[display_id] = _complete({**base, "updated_at": base.get("updated_at") or done_at}, done_at,
+                                            entry.get("available_until"))
+        elif any(b is not None for b in blocks) and rec is None:
+            first_at = min((to_utc_datetime(b.get("updated_at")) for b in blocks if b.get("updated_at")), default=None)
+            records[display_id] = {**base, "updated_at": first_at}
+
+    ops = []
+    for key, rec in records.items():
+        old = originals.get(key)
+        if old is None or any(_normalize(old.get(f)) != _normalize(rec.get(f)) for f in PROGRESS_FIELDS):
+            ops.append(("upsert", key, rec, old))
+    return ops + deletes
+
+
+def _normalize(value):
+    """Сравнение полей без разницы naive/aware datetime и None/""."""
+    if hasattr(value, "tzinfo"):
+        return to_utc_datetime(value)
+    return value if value not in (None, "") else None
@@ -1,11 +1,29 @@
+from datetime import datetime
+
 from celery import shared_task
 
 
 @shared_task(bind=True)
-def run_code_check(self, task_id: str, user_id: str, code: str):
+def run_code_check(self, task_id: str, user_id: str, code: str, job_id: str | None = None, fail_fast: bool = False):
     """
-    Run user code against task test cases (stub).
-    Later: run in sandbox (Docker/Firejail), save Submission, notify.
+    Проверяет решение в воркере Celery: запуск тестов, сохранение Submission и прогресса.
+    Если передан job_id, статус и результат пишутся в SubmissionJob (его опрашивает клиент).
     """
-    # Stub: no real execution
-    return {"task_id": task_id, "user_id": user_id, "passed": True, "results": []}
+    from apps.submissions.documents import SubmissionJob
+    from apps.tasks.documents import Task
+    from apps.tasks.grading import complete_job, fail_job, grade_submission
+    from common.db_utils import get_doc_by_pk
+
+    job = SubmissionJob.objects(id=job_id).first() if job_id else None
+    if job:
+        job.update(set__status="running", set__updated_at=datetime.utcnow())
+    try:
+        task = get_doc_by_pk(Task, task_id)
+        payload = grade_submission(task, user_id, code, fail_fast=fail_fast)
+    except Exception as e:
+        if job:
+            fail_job(job, e)
+        raise
+    if job:
+        complete_job(job, payload)
+    return {"task_id": task_id, "user_id": user_id, **payload}
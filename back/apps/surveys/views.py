@@ -4,6 +4,7 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
 from common.db_utils import get_doc_by_pk
+from common.http_cache import conditional_get
 from .documents import Survey, SurveyResponse
 from .serializers import SurveySerializer
 from apps.submissions.progress import save_lesson_progress
@@ -67,6 +68,18 @@ def survey_list(request):
     return Response(serializer.data)
 
 
+def _survey_detail_response(request, survey):
+    data = SurveySerializer(survey, context={"request": request}).data
+    # Для преподавателя/админа — добавить ответ текущего пользователя (если студент) или не добавлять; ответы всех показываются отдельным эндпоинтом или в standalone-progress
+    if request.user and getattr(request.user, "id", None):
+        resp = SurveyResponse.objects(survey_id=str(survey.id), user_id=str(request.user.id)).first()
+        if resp:
+            data["my_response"] = resp.answer
+        else:
+            data["my_response"] = None
+    return Response(data)
+
+
 @api_view(["GET", "PUT", "PATCH", "DELETE"])
 @permission_classes([AllowAny])
 def survey_detail(request, survey_id):
@@ -77,16 +90,7 @@ def survey_detail(request, survey_id):
         return Response({"error": "Survey not found"}, status=status.HTTP_404_NOT_FOUND)
 
     if request.method == "GET":
-        serializer = SurveySerializer(survey, context={"request": request})
-        data = serializer.data
-        # Для преподавателя/админа — добавить ответ текущего пользователя (если студент) или не добавлять; ответы всех показываются отдельным эндпоинтом или в standalone-progress
-        if request.user and getattr(request.user, "id", None):
-            resp = SurveyResponse.objects(survey_id=str(survey.id), user_id=str(request.user.id)).first()
-            if resp:
-                data["my_response"] = resp.answer
-            else:
-                data["my_response"] = None
-        return Response(data)
+        return conditional_get(request, ("lessons",), lambda: _survey_detail_response(request, survey))
 
     if request.method in ("PUT", "PATCH"):
         if not request.user or not getattr(request.user, "id", None):
@@ -25,6 +25,8 @@ class Task(Document):
     title = StringField(required=True, max_length=500)
     description = StringField(default="")
     starter_code = StringField(default="")
+    # Язык решения: движок запуска в runner.ENGINES
+    language = StringField(default="python", choices=["python", "javascript", "cpp"])
     track_id = StringField(required=True)
     test_cases = ListField(EmbeddedDocumentField(TaskCaseEmbed), default=list)
     public_id = StringField()  # Человекочитаемый id для URL (12 hex символов)
@@ -0,0 +1,96 @@
+"""
+Проверка отправленного решения: запуск тестов, сохранение Submission и прогресса.
+Общая часть синхронного TaskViewSet.submit и фоновой задачи run_code_check.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+
+from apps.submissions.documents import Submission, SubmissionJob
+from apps.submissions.progress import save_lesson_progress
+from .runner import _skipped_result, run_tests
+
+
+def _get_track_title(track_id: str) -> str:
+    if not track_id:
+        return ""
+    try:
+        from bson import ObjectId
+        from apps.tracks.documents import Track
+        t = Track.objects(id=ObjectId(track_id)).first()
+        if t:
+            return t.title
+    except Exception:
+        pass
+    return ""
+
+
+def pending_job_count(user_id: str, task_id: str) -> int:
+    """
+    Число отправок в очереди (queued / running), которые уже расходуют попытку.
+    Задания старше TASK_SUBMIT_JOB_TIMEOUT_SEC считаются потерянными (упал воркер Celery,
+    потоковая проверка оборвалась до первого кейса): они помечаются failed и попытку больше не занимают.
+    """
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=getattr(settings, "TASK_SUBMIT_JOB_TIMEOUT_SEC", 600))
+    pending = SubmissionJob.objects(user_id=user_id, task_id=task_id, status__in=["queued", "running"])
+    pending.filter(created_at__lt=cutoff).update(
+        set__status="failed", set__error="Проверка не завершилась вовремя", set__updated_at=now
+    )
+    return pending.filter(created_at__gte=cutoff).count()
+
+
+def grade_submission(task, user_id: str, code: str, *, fail_fast: bool = False) -> dict:
+    """
+    Запускает тесты, сохраняет Submission и прогресс по уроку.
+    Возвращает тело ответа submit: {passed, results, message, unlocked_achievements}.
+    """
+    results = run_tests(task, code, fail_fast=fail_fast)
+    return finalize_submission(task, user_id, code, results)
+
+
+def finalize_submission(task, user_id: str, code: str, results: list) -> dict:
+    """Сохраняет Submission и прогресс по уже полученным результатам тестов."""
+    passed = all(r.get("passed", False) for r in results)
+    Submission(
+        task_id=str(task.id),
+        user_id=user_id,
+        code=code,
+        passed=passed,
+        results=results,
+    ).save()
+    lesson_id = str(getattr(task, "public_id", None) or task.id)
+    unlocked_achievements = save_lesson_progress(
+        user_id, lesson_id, "task", passed,
+        lesson_title=task.title, track_id=task.track_id or "", track_title=_get_track_title(task.track_id),
+        available_until=getattr(task, "available_until", None),
+    )
+    message = "Все тесты пройдены." if passed else "Часть тестов не пройдена."
+    return {
+        "passed": passed,
+        "results": results,
+        "message": message,
+        "unlocked_achievements": unlocked_achievements,
+    }
+
+
+def finalize_partial_submission(task, user_id: str, code: str, results: list) -> dict:
+    """Как finalize_submission, но кейсы без результата (None) засчитываются как skipped."""
+    results = [r if r is not None else _skipped_result(tc) for r, tc in zip(results, task.test_cases)]
+    return finalize_submission(task, user_id, code, results)
+
+
+def complete_job(job, payload: dict) -> None:
+    """Записывает итог проверки в SubmissionJob (status=done)."""
+    job.update(
+        set__status="done",
+        set__passed=payload["passed"],
+        set__results=payload["results"],
+        set__message=payload["message"],
+        set__unlocked_achievements=payload["unlocked_achievements"],
+        set__updated_at=datetime.utcnow(),
+    )
+
+
+def fail_job(job, error) -> None:
+    job.update(set__status="failed", set__error=str(error), set__updated_at=datetime.utcnow())
@@ -0,0 +1,218 @@
+"""
+Пул заранее запущенных процессов-воркеров песочницы (см. sandbox_worker.py).
+
+Каждый воркер — отдельный интерпретатор с уже импортированными модулями;
+на каждое выполнение он форкает чистый дочерний процесс. Так запуск решения
+не платит за старт интерпретатора. Размер пула — settings.TASK_RUNNER_POOL_SIZE
+(0 отключает пул, runner тогда запускает отдельный процесс на каждый кейс).
+
+Параллельность: пакет кейсов одного запроса выполняется не более чем в
+TASK_RUNNER_PARALLELISM процессах одновременно, а все воркеры хоста вместе —
+не более чем в TASK_RUNNER_HOST_CONCURRENCY (общие слоты в TASK_RUNNER_SLOTS_DIR).
+"""
+import json
+import os
+import queue
+import select
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+LIMITS_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_limits.py")
+# Запас времени сверх таймаута выполнения на форк и обмен сообщениями.
+REPLY_GRACE_SEC = 2.0
+_HEADER = struct.Struct(">I")
+
+
+def _reply_grace() -> float:
+    """Запас на ответ воркера: форк и обмен сообщениями плюс ожидание слота хоста."""
+    return REPLY_GRACE_SEC + getattr(settings, "TASK_RUNNER_SLOT_TIMEOUT_SEC", 0)
+
+
+class WorkerError(Exception):
+    """Воркер упал или ответил некорректно; воркер пересоздаётся."""
+
+
+class WorkerTimeout(WorkerError):
+    """Воркер не ответил за отведённое время."""
+
+
+class SandboxWorker:
+    """Один процесс-воркер и канал обмена с ним."""
+
+    def __init__(self):
+        self.proc = subprocess.Popen(
+            [sys.executable, WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env={
+                **os.environ,
+                "PYTHONIOENCODING": "utf-8",
+                "KAVNT_RUNNER_HOST_SLOTS": str(getattr(settings, "TASK_RUNNER_HOST_CONCURRENCY", 0)),
+                "KAVNT_RUNNER_SLOTS_DIR": str(getattr(settings, "TASK_RUNNER_SLOTS_DIR", "")),
+                "KAVNT_RUNNER_SLOT_TIMEOUT": str(getattr(settings, "TASK_RUNNER_SLOT_TIMEOUT_SEC", 0)),
+            },
+            close_fds=True,
+        )
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def request(self, message: dict, timeout: float) -> dict:
+        self.send(message)
+        return self.receive(time.monotonic() + timeout)
+
+    def send(self, message: dict) -> None:
+        data = json.dumps(message).encode("utf-8")
+        try:
+            self.proc.stdin.write(_HEADER.pack(len(data)) + data)
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise WorkerError(str(e))
+
+    def receive(self, deadline: float) -> dict:
+        (size,) = _HEADER.unpack(self._read_exact(_HEADER.size, deadline))
+        try:
+            return json.loads(self._read_exact(size, deadline).decode("utf-8"))
+        except ValueError as e:
+            raise WorkerError(str(e))
+
+    def _read_exact(self, n: int, deadline: float) -> bytes:
+        fd = self.proc.stdout.fileno()
+        buf = b""
+        while len(buf) < n:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise WorkerTimeout("timeout")
+            readable, _, _ = select.select([fd], [], [], remaining)
+            if not readable:
+                continue
+            chunk = os.read(fd, n - len(buf))
+            if not chunk:
+                raise WorkerError("worker exited")
+            buf += chunk
+        return buf
+
+    def close(self) -> None:
+        try:
+            self.proc.kill()
+            self.proc.wait(timeout=1)
+        except Exception:
+            pass
+
+
+class WorkerPool:
+    """Потокобезопасный пул воркеров фиксированного размера."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._idle = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(None)  # воркеры стартуют лениво при первом запросе
+
+    def execute(self, code: str, stdin: str, timeout_sec: float, limits: dict | None = None) -> dict:
+        """
+        Выполняет код в свободном воркере.
+        Возвращает {"stdout", "stderr", "returncode", "timed_out", "limit", "cpu_ms", "peak_memory_kb"}.
+        limits — {"cpu_sec", "memory_bytes", "output_bytes"}, см. sandbox_worker.
+        """
+        return self._request(
+            {"code": code, "stdin": stdin, "timeout": timeout_sec, "limits": limits or {}},
+            timeout_sec + _reply_grace(),
+        )
+
+    def iter_batch(
+        self, code: str, stdins: list, timeout_sec: float, parallelism: int = 1, limits: dict | None = None
+    ):
+        """
+        Выполняет код против нескольких stdin за один обмен с воркером:
+        код компилируется один раз, каждый запуск — в своём дочернем процессе,
+        одновременно не более parallelism процессов.
+        Отдаёт (index, ответ как у execute()) по мере завершения каждого запуска.
+        Если генератор закрыть раньше времени (клиент отключился), воркер вместе с
+        оставшимися запусками убивается и будет пересоздан при следующем запросе.
+        """
+        worker = self._idle.get()
+        finished = False
+        try:
+            if worker is None or not worker.alive():
+                worker = SandboxWorker()
+            message = {
+                "code": code,
+                "stdins": list(stdins),
+                "timeout": timeout_sec,
+                "parallelism": parallelism,
+                "limits": limits or {},
+                "stream": True,
+            }
+            worker.send(message)
+            deadline = time.monotonic() + timeout_sec * max(len(stdins), 1) + _reply_grace()
+            while True:
+                reply = worker.receive(deadline)
+                if "error" in reply:
+                    raise WorkerError(reply["error"])
+                if reply.get("done"):
+                    finished = True
+                    return
+                yield reply["index"], reply["result"]
+        finally:
+            if not finished and worker is not None:
+                worker.close()
+                worker = None
+            self._idle.put(worker)
+
+    def _request(self, message: dict, reply_timeout: float) -> dict:
+        worker = self._idle.get()
+        try:
+            if worker is None or not worker.alive():
+                worker = SandboxWorker()
+            reply = worker.request(message, reply_timeout)
+            if "error" in reply:
+                raise WorkerError(reply["error"])
+            return reply
+        except WorkerError:
+            if worker is not None:
+                worker.close()
+            worker = None
+            raise
+        finally:
+            self._idle.put(worker)
+
+    def shutdown(self) -> None:
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker is not None:
+                worker.close()
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Возвращает пул текущего процесса или None, если пул отключён или fork недоступен.
+    Пул пересоздаётся после fork (например, в воркерах gunicorn).
+    """
+    global _pool, _pool_pid
+    size = getattr(settings, "TASK_RUNNER_POOL_SIZE", 0)
+    if size <= 0 or not hasattr(os, "fork"):
+        return None
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            _pool = WorkerPool(size)
+            _pool_pid = pid
+    return _pool
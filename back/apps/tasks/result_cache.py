@@ -0,0 +1,94 @@
+"""
+Кэш результатов проверки решений в памяти процесса.
+
+Ключ — язык задачи, хэш нормализованного кода плюс отпечаток тест-кейсов (id, input,
+expected_output). Когда преподаватель меняет тесты, отпечаток меняется и старые
+записи больше не находятся (и со временем вытесняются по LRU).
+Размер — settings.TASK_RESULT_CACHE_SIZE (0 отключает кэш).
+"""
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+def normalize_code(code: str) -> str:
+    """Приводит код к каноничному виду: переводы строк, хвостовые пробелы и пустые строки."""
+    lines = (code or "").replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip("\n")
+
+
+def test_cases_fingerprint(cases) -> str:
+    """Отпечаток набора тест-кейсов: меняется при любом изменении id, входа или ожидаемого вывода."""
+    payload = [[tc.id, tc.input or "", tc.expected_output or ""] for tc in cases]
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def make_key(code: str, cases, language: str = "python") -> str:
+    code_hash = hashlib.sha256(normalize_code(code).encode("utf-8")).hexdigest()
+    return f"{language}:{code_hash}:{test_cases_fingerprint(cases)}"
+
+
+class ResultCache:
+    """Потокобезопасный LRU-кэш {ключ: список результатов по кейсам} со счётчиками попаданий."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            results = self._data.get(key)
+            if results is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(results)
+
+    def put(self, key: str, results: list) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = copy.deepcopy(results)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._data),
+                "max_size": self.max_size,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Кэш текущего процесса или None, если TASK_RESULT_CACHE_SIZE == 0."""
+    global _cache
+    size = getattr(settings, "TASK_RESULT_CACHE_SIZE", 0)
+    if size <= 0:
+        return None
+    if _cache is None or _cache.max_size != size:
+        with _cache_lock:
+            if _cache is None or _cache.max_size != size:
+                _cache = ResultCache(size)
+    return _cache
@@ -1,11 +1,28 @@
 """
-Выполнение Python-кода на сервере для проверки решений задач.
+Выполнение кода решений на сервере для проверки задач.
+
+Python выполняется пулом воркеров (pool.py); JavaScript и C++ — отдельными
+процессами node / g++-бинарника. Движок выбирается по Task.language (ENGINES).
 """
+import hashlib
+import json
 import os
 import re
+import signal
 import subprocess
 import sys
+import shutil
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .pool import LIMITS_SCRIPT, WorkerError, WorkerTimeout, get_pool
+from .result_cache import get_result_cache, make_key
+from .sandbox_worker import HostSlots, SlotTimeout, busy_result, rusage_metrics
 
 
 def _sanitize_error_message(text: str) -> str:
@@ -24,12 +41,128 @@ def _normalize_output(s: str) -> str:
     return s.replace("\r\n", "\n").rstrip()
 
 
+DEFAULT_TIMEOUT_SEC = 5.0
+TIMEOUT_ERROR = "Превышено время выполнения"
+CPU_LIMIT_ERROR = "Превышен лимит процессорного времени"
+OUTPUT_LIMIT_ERROR = "Превышен лимит объёма вывода"
+COMPILE_ERROR = "Ошибка компиляции"
+HOST_BUSY_ERROR = "Сервер перегружен, попробуйте отправить решение позже"
+# Таймаут и нехватка слотов зависят от нагрузки на хост, а не от решения — такие результаты не кэшируем.
+_UNCACHEABLE_ERRORS = (TIMEOUT_ERROR, HOST_BUSY_ERROR)
+
+_READ_CHUNK = 65536
+_POLL_INTERVAL_SEC = 0.005
+
+
+def _result_tuple(stdout: str, stderr: str, returncode: int) -> tuple[str, str, str | None]:
+    if returncode != 0 and stderr:
+        err_msg = _sanitize_error_message(stderr.strip()) or f"Exit code {returncode}"
+        return stdout, stderr, err_msg
+    return stdout, stderr, None
+
+
+def _execution(stdout: str, stderr: str, error: str | None, cpu_ms=None, peak_memory_kb=None) -> dict:
+    """Результат одного запуска: вывод, ошибка и потреблённые ресурсы (None — не измерено)."""
+    return {
+        "stdout": stdout,
+        "stderr": stderr,
+        "error": error,
+        "cpu_ms": cpu_ms,
+        "peak_memory_kb": peak_memory_kb,
+    }
+
+
+def _as_tuple(execution: dict) -> tuple[str, str, str | None]:
+    return execution["stdout"], execution["stderr"], execution["error"]
+
+
+def _limits() -> dict:
+    """Лимиты ресурсов на один запуск из настроек (0 — без лимита)."""
+    return {
+        "cpu_sec": getattr(settings, "TASK_RUNNER_CPU_LIMIT_SEC", 0),
+        "memory_bytes": getattr(settings, "TASK_RUNNER_MEMORY_LIMIT_MB", 0) * 1024 * 1024,
+        "output_bytes": getattr(settings, "TASK_RUNNER_OUTPUT_LIMIT_KB", 0) * 1024,
+    }
+
+
+def _reply_execution(reply: dict) -> dict:
+    """Ответ воркера пула -> результат запуска."""
+    metrics = {"cpu_ms": reply.get("cpu_ms"), "peak_memory_kb": reply.get("peak_memory_kb")}
+    if reply.get("timed_out"):
+        return _execution("", "", TIMEOUT_ERROR, **metrics)
+    if reply.get("limit") == "slots":
+        return _execution("", "", HOST_BUSY_ERROR)
+    stdout = reply.get("stdout") or ""
+    stderr = reply.get("stderr") or ""
+    if reply.get("limit") == "output":
+        return _execution(stdout, stderr, OUTPUT_LIMIT_ERROR, **metrics)
+    if reply.get("limit") == "cpu":
+        return _execution(stdout, stderr, CPU_LIMIT_ERROR, **metrics)
+    return _execution(*_result_tuple(stdout, stderr, reply.get("returncode", 0)), **metrics)
+
+
+def _execute_python(code: str, stdin: str, timeout_sec: float) -> dict:
+    pool = get_pool()
+    if pool is None:
+        return _run_python_subprocess(code, stdin, timeout_sec)
+    try:
+        reply = pool.execute(code, stdin, timeout_sec, limits=_limits())
+    except WorkerTimeout:
+        return _execution("", "", TIMEOUT_ERROR)
+    except WorkerError:
+        # Воркер упал — выполняем в отдельном процессе, чтобы не терять результат
+        return _run_python_subprocess(code, stdin, timeout_sec)
+    except Exception as e:
+        return _execution("", "", str(e))
+    return _reply_execution(reply)
+
+
 def run_python_code(code: str, stdin: str = "", timeout_sec: float = 5.0) -> tuple[str, str, str | None]:
     """
     Выполняет Python-код с заданным stdin.
     Возвращает (stdout, stderr, error).
-    error — сообщение об ошибке (SyntaxError, timeout и т.д.), иначе None.
+    error — сообщение об ошибке (SyntaxError, timeout, превышение лимитов и т.д.), иначе None.
+    Если включён пул воркеров (TASK_RUNNER_POOL_SIZE > 0), код выполняется в нём,
+    иначе — в отдельном процессе интерпретатора. В обоих случаях действуют лимиты
+    TASK_RUNNER_CPU_LIMIT_SEC / _MEMORY_LIMIT_MB / _OUTPUT_LIMIT_KB.
     """
+    return _as_tuple(_execute_python(code, stdin, timeout_sec))
+
+
+def _read_bounded(stream, limit: int, chunks: list, on_exceed) -> None:
+    """Читает поток в chunks, но не больше limit байт; при превышении вызывает on_exceed."""
+    size = 0
+    try:
+        while True:
+            data = stream.read1(_READ_CHUNK) if hasattr(stream, "read1") else stream.read(_READ_CHUNK)
+            if not data:
+                break
+            if limit > 0 and size + len(data) > limit:
+                chunks.append(data[:limit - size])
+                on_exceed()
+                break
+            chunks.append(data)
+            size += len(data)
+    except (OSError, ValueError):
+        pass
+    finally:
+        stream.close()
+
+
+def _write_stdin(stream, data: bytes) -> None:
+    try:
+        stream.write(data)
+    except (BrokenPipeError, OSError):
+        pass
+    finally:
+        try:
+            stream.close()
+        except OSError:
+            pass
+
+
+def _run_python_subprocess(code: str, stdin: str, timeout_sec: float) -> dict:
+    """Запуск кода в новом процессе интерпретатора через временный файл."""
     with tempfile.NamedTemporaryFile(
         mode="w", suffix=".py", delete=False, encoding="utf-8"
     ) as f:
@@ -37,25 +170,9 @@ def run_python_code(code: str, stdin: str = "", timeout_sec: float = 5.0) -> tup
         f.write(code)
         tmp_path = f.name
     try:
-        proc = subprocess.run(
-            [sys.executable, tmp_path],
-            input=stdin,
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            timeout=timeout_sec,
-            env={**os.environ, "PYTHONIOENCODING": "utf-8"},
-        )
-        stdout = proc.stdout or ""
-        stderr = proc.stderr or ""
-        if proc.returncode != 0 and stderr:
-            err_msg = _sanitize_error_message(stderr.strip()) or f"Exit code {proc.returncode}"
-            return stdout, stderr, err_msg
-        return stdout, stderr, None
-    except subprocess.TimeoutExpired:
-        return "", "", "Превышено время выполнения"
+        return _reply_execution(_run_process([sys.executable, tmp_path], stdin, timeout_sec, _limits()))
     except Exception as e:
-        return "", "", str(e)
+        return _execution("", "", str(e))
     finally:
         try:
             os.unlink(tmp_path)
@@ -63,27 +180,517 @@ def run_python_code(code: str, stdin: str = "", timeout_sec: float = 5.0) -> tup
             pass
 
 
-def run_tests(task, code: str) -> list[dict]:
+@contextmanager
+def _host_slot():
     """
-    Запускает код против всех тест-кейсов задачи.
-    Возвращает список [{caseId, passed, actualOutput, error?}].
+    Слот общего лимита одновременных запусков на хосте (см. sandbox_worker.HostSlots).
+    Отдаёт False, если слот не освободился за TASK_RUNNER_SLOT_TIMEOUT_SEC.
     """
+    slots = HostSlots(
+        settings.TASK_RUNNER_SLOTS_DIR,
+        getattr(settings, "TASK_RUNNER_HOST_CONCURRENCY", 0),
+        getattr(settings, "TASK_RUNNER_SLOT_TIMEOUT_SEC", 0),
+    )
+    try:
+        fd = slots.acquire()
+    except SlotTimeout:
+        yield False
+        return
+    try:
+        yield True
+    finally:
+        HostSlots.release(fd)
+
+
+def _run_process(argv: list, stdin: str, timeout_sec: float, limits: dict, cwd: str | None = None) -> dict:
+    """
+    Запускает внешний процесс (интерпретатор или скомпилированное решение).
+    Вывод читается потоково с ограничением объёма; на POSIX — rlimit и замер ресурсов.
+    Возвращает ответ в формате воркера пула (см. sandbox_worker), его разбирает _reply_execution.
+    """
+    if os.name == "posix":
+        # rlimit выставляет обёртка sandbox_limits.py в дочернем процессе перед exec:
+        # preexec_fn небезопасен в многопоточном процессе (потоки gunicorn, пул движков)
+        argv = [sys.executable, "-I", "-S", LIMITS_SCRIPT, json.dumps(limits), *argv]
+    with _host_slot() as acquired:
+        if not acquired:
+            return busy_result()
+        proc = subprocess.Popen(
+            argv,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=cwd,
+            env={**os.environ, "PYTHONIOENCODING": "utf-8"},
+        )
+        exceeded = threading.Event()
+
+        def on_exceed():
+            exceeded.set()
+            proc.kill()
+
+        out_chunks, err_chunks = [], []
+        threads = [
+            threading.Thread(target=_write_stdin, args=(proc.stdin, stdin.encode("utf-8")), daemon=True),
+            threading.Thread(target=_read_bounded, args=(proc.stdout, limits["output_bytes"], out_chunks, on_exceed), daemon=True),
+            threading.Thread(target=_read_bounded, args=(proc.stderr, limits["output_bytes"], err_chunks, on_exceed), daemon=True),
+        ]
+        for t in threads:
+            t.start()
+        returncode, metrics, timed_out = _wait_process(proc, timeout_sec)
+        for t in threads:
+            t.join(timeout=1)
+    limit = None
+    if exceeded.is_set():
+        limit = "output"
+    elif limits["cpu_sec"] and os.name == "posix" and returncode == -signal.SIGXCPU:
+        limit = "cpu"
+    return {
+        "stdout": b"".join(out_chunks).decode("utf-8", errors="replace"),
+        "stderr": b"".join(err_chunks).decode("utf-8", errors="replace"),
+        "returncode": returncode,
+        "timed_out": timed_out,
+        "limit": limit,
+        "cpu_ms": metrics.get("cpu_ms"),
+        "peak_memory_kb": metrics.get("peak_memory_kb"),
+    }
+
+
+def _wait_process(proc, timeout_sec: float):
+    """
+    Ждёт завершения процесса с таймаутом. Возвращает (returncode, metrics, timed_out).
+    На POSIX процесс забирается через wait4, чтобы получить rusage.
+    """
+    if not hasattr(os, "wait4"):
+        try:
+            return proc.wait(timeout=timeout_sec), {}, False
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            return proc.wait(), {}, True
+    deadline = time.monotonic() + timeout_sec
+    timed_out = False
+    while True:
+        pid, status, rusage = os.wait4(proc.pid, 0 if timed_out else os.WNOHANG)
+        if pid:
+            break
+        if time.monotonic() >= deadline:
+            timed_out = True
+            proc.kill()
+            continue
+        time.sleep(_POLL_INTERVAL_SEC)
+    returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+    proc.returncode = returncode  # процесс уже забран wait4 — Popen не должен ждать его снова
+    return returncode, rusage_metrics(rusage), timed_out
+
+
+def _execute_python_batch(code: str, stdins: list, timeout_sec: float, parallelism: int | None) -> list:
+    pool = get_pool()
+    if pool is None or len(stdins) < 2:
+        return [_execute_python(code, stdin, timeout_sec) for stdin in stdins]
+    if parallelism is None:
+        parallelism = getattr(settings, "TASK_RUNNER_PARALLELISM", 1)
+    # Пакет идёт потоком: если воркер упадёт или зависнет, по одному перезапускаются
+    # только кейсы, результата которых ещё нет (см. _iter_python_batch)
+    executions = [None] * len(stdins)
+    try:
+        for index, execution in _iter_python_batch(code, stdins, parallelism, timeout_sec):
+            executions[index] = execution
+    except Exception as e:
+        return [execution or _execution("", "", str(e)) for execution in executions]
+    return executions
+
+
+def run_python_batch(
+    code: str, stdins: list, timeout_sec: float = 5.0, parallelism: int | None = None
+) -> list:
+    """
+    Выполняет один и тот же код против нескольких stdin.
+    Возвращает список (stdout, stderr, error) в порядке stdins — как у run_python_code.
+    С пулом воркеров код компилируется один раз, все запуски идут одним запросом
+    и выполняются параллельно (не более parallelism, по умолчанию TASK_RUNNER_PARALLELISM).
+    """
+    return [_as_tuple(e) for e in _execute_python_batch(code, stdins, timeout_sec, parallelism)]
+
+
+def _iter_python_batch(code: str, stdins: list, parallelism: int, timeout_sec: float = DEFAULT_TIMEOUT_SEC):
+    """
+    Как _execute_python_batch, но отдаёт (index, результат запуска) по мере готовности.
+    Закрытие генератора останавливает ещё не выполненные запуски.
+    """
+    pool = get_pool()
+    if pool is None:
+        for index, stdin in enumerate(stdins):
+            yield index, _execute_python(code, stdin, timeout_sec)
+        return
+    done = set()
+    replies = pool.iter_batch(code, stdins, timeout_sec, parallelism=parallelism, limits=_limits())
+    try:
+        for index, reply in replies:
+            done.add(index)
+            yield index, _reply_execution(reply)
+    except WorkerError:
+        # Воркер упал посреди пакета — оставшиеся кейсы запускаем по одному
+        for index, stdin in enumerate(stdins):
+            if index not in done:
+                yield index, _execute_python(code, stdin, timeout_sec)
+    finally:
+        replies.close()
+
+
+class PrepareError(Exception):
+    """Решение нельзя запустить (нет компилятора, ошибка компиляции); execution — результат для всех кейсов."""
+
+    def __init__(self, execution: dict):
+        super().__init__(execution["error"])
+        self.execution = execution
+
+
+def _unsupported(language: str) -> PrepareError:
+    return PrepareError(_execution("", "", f"Язык {language} не поддерживается на сервере"))
+
+
+class LanguageEngine:
+    """Движок выполнения решений одного языка."""
+
+    name = ""
+
+    def execute_batch(self, code: str, stdins: list, timeout_sec: float, parallelism: int) -> list:
+        """Результаты запусков в порядке stdins."""
+        executions = [None] * len(stdins)
+        for index, execution in self.iter_batch(code, stdins, timeout_sec, parallelism):
+            executions[index] = execution
+        return executions
+
+    def iter_batch(self, code: str, stdins: list, timeout_sec: float, parallelism: int):
+        """(index, результат запуска) по мере готовности; закрытие генератора останавливает оставшиеся."""
+        raise NotImplementedError
+
+
+class PythonEngine(LanguageEngine):
+    name = "python"
+
+    def execute_batch(self, code, stdins, timeout_sec, parallelism):
+        return _execute_python_batch(code, stdins, timeout_sec, parallelism)
+
+    def iter_batch(self, code, stdins, timeout_sec, parallelism):
+        return _iter_python_batch(code, stdins, parallelism, timeout_sec)
+
+
+class SubprocessEngine(LanguageEngine):
+    """
+    Движок для языков без пула: решение готовится один раз на пакет (prepare),
+    затем каждый кейс — отдельный процесс, не более parallelism одновременно.
+    """
+
+    source_name = ""
+
+    def prepare(self, code: str, workdir: str) -> list:
+        """Готовит решение в workdir и возвращает argv запуска; при ошибке — PrepareError."""
+        raise NotImplementedError
+
+    def process_limits(self) -> dict:
+        return _limits()
+
+    def iter_batch(self, code, stdins, timeout_sec, parallelism):
+        workdir = tempfile.mkdtemp(prefix="kavnt-run-")
+        try:
+            try:
+                argv = self.prepare(code, workdir)
+            except PrepareError as e:
+                for index in range(len(stdins)):
+                    yield index, dict(e.execution)
+                return
+            limits = self.process_limits()
+            workers = max(1, min(parallelism or 1, len(stdins)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(self._run_case, argv, stdin, timeout_sec, limits, workdir): index
+                    for index, stdin in enumerate(stdins)
+                }
+                try:
+                    for future in as_completed(futures):
+                        yield futures[future], future.result()
+                finally:
+                    for future in futures:
+                        future.cancel()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def _run_case(self, argv: list, stdin: str, timeout_sec: float, limits: dict, workdir: str) -> dict:
+        try:
+            reply = _run_process(argv, stdin, timeout_sec, limits, cwd=workdir)
+        except Exception as e:
+            return _execution("", "", str(e))
+        # Пути во временной папке не должны попадать к студенту
+        reply["stderr"] = reply["stderr"].replace(workdir + os.sep, "")
+        return _reply_execution(reply)
+
+
+class NodeEngine(SubprocessEngine):
+    name = "javascript"
+    source_name = "solution.js"
+
+    def prepare(self, code, workdir):
+        node = shutil.which("node")
+        if node is None:
+            raise _unsupported(self.name)
+        path = os.path.join(workdir, self.source_name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(code)
+        argv = [node]
+        memory_mb = getattr(settings, "TASK_RUNNER_MEMORY_LIMIT_MB", 0)
+        if memory_mb:
+            argv.append(f"--max-old-space-size={memory_mb}")
+        return argv + [path]
+
+    def process_limits(self):
+        # V8 резервирует гигабайты виртуальной памяти, RLIMIT_AS его не запустит;
+        # куча ограничивается флагом --max-old-space-size.
+        return {**_limits(), "memory_bytes": 0}
+
+
+class BuildCache:
+    """
+    Кэш скомпилированных бинарников на диске: имя файла — sha256 исходника и флагов.
+    Повторная проверка того же кода (и все кейсы пакета) не компилирует заново.
+    Хранится не больше max_entries бинарников, вытесняются давно не использованные (mtime).
+    """
+
+    def __init__(self, directory: str, max_entries: int):
+        self.directory = directory
+        self.max_entries = max_entries
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> str | None:
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def put(self, key: str, built_path: str) -> str:
+        """Атомарно переносит собранный файл в кэш и возвращает его путь."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(key)
+        os.replace(built_path, path)
+        self._prune()
+        return path
+
+    def _prune(self) -> None:
+        if self.max_entries <= 0:
+            return
+        try:
+            entries = [os.path.join(self.directory, name) for name in os.listdir(self.directory)]
+            entries.sort(key=os.path.getmtime, reverse=True)
+        except OSError:
+            return
+        for path in entries[self.max_entries:]:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def get_build_cache() -> BuildCache:
+    return BuildCache(
+        settings.TASK_RUNNER_BUILD_CACHE_DIR, getattr(settings, "TASK_RUNNER_BUILD_CACHE_SIZE", 0)
+    )
+
+
+class CppEngine(SubprocessEngine):
+    name = "cpp"
+    source_name = "solution.cpp"
+    flags = ["-std=c++17", "-O2", "-pipe"]
+    compile_timeout_sec = 30.0
+
+    def prepare(self, code, workdir):
+        compiler = shutil.which("g++")
+        if compiler is None:
+            raise _unsupported(self.name)
+        cache = get_build_cache()
+        key = hashlib.sha256("\0".join(self.flags + [code]).encode("utf-8")).hexdigest()
+        binary = cache.get(key)
+        if binary is None:
+            binary = cache.put(key, self._compile(compiler, code, workdir))
+        return [binary]
+
+    def _compile(self, compiler: str, code: str, workdir: str) -> str:
+        source = os.path.join(workdir, self.source_name)
+        output = os.path.join(workdir, "solution")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write(code)
+        # Компилятору нужно больше памяти и времени, чем решению
+        limits = {**_limits(), "cpu_sec": self.compile_timeout_sec, "memory_bytes": 0}
+        reply = _run_process(
+            [compiler, *self.flags, "-o", output, source], "", self.compile_timeout_sec, limits, cwd=workdir
+        )
+        if reply["timed_out"]:
+            raise PrepareError(_execution("", "", f"{COMPILE_ERROR}: превышено время компиляции"))
+        if reply["returncode"] != 0:
+            message = reply["stderr"].replace(workdir + os.sep, "").strip()
+            raise PrepareError(_execution("", message, f"{COMPILE_ERROR}:\n{message}"))
+        return output
+
+
+ENGINES = {
+    "python": PythonEngine(),
+    "javascript": NodeEngine(),
+    "cpp": CppEngine(),
+}
+
+
+def register_engine(engine: LanguageEngine) -> None:
+    """Подключает движок нового языка (ключ — engine.name, значение Task.language)."""
+    ENGINES[engine.name] = engine
+
+
+class _UnknownEngine(LanguageEngine):
+    def __init__(self, name: str):
+        self.name = name
+
+    def iter_batch(self, code, stdins, timeout_sec, parallelism):
+        for index in range(len(stdins)):
+            yield index, dict(_unsupported(self.name).execution)
+
+
+def get_engine(language: str | None) -> LanguageEngine:
+    language = language or "python"
+    return ENGINES.get(language) or _UnknownEngine(language)
+
+
+def _task_language(task) -> str:
+    return getattr(task, "language", None) or "python"
+
+
+def _case_result(tc, execution: dict) -> dict:
+    stdout, stderr, error = _as_tuple(execution)
+    actual = _normalize_output(stdout)
+    expected = _normalize_output(tc.expected_output or "")
+    if error:
+        passed = False
+        actual_output = _sanitize_error_message(stderr or error)
+    else:
+        passed = actual == expected
+        actual_output = stdout
+    result = {
+        "caseId": tc.id,
+        "passed": passed,
+        "actualOutput": actual_output,
+        # Потреблённые ресурсы (None, если на платформе не измеряются)
+        "cpuTimeMs": execution["cpu_ms"],
+        "peakMemoryKb": execution["peak_memory_kb"],
+    }
+    if error and not passed:
+        result["error"] = error
+    return result
+
+
+def _select_cases(task, public_only: bool) -> list:
+    return [tc for tc in task.test_cases if tc.is_public or not public_only]
+
+
+def _skipped_result(tc) -> dict:
+    return {
+        "caseId": tc.id,
+        "passed": False,
+        "actualOutput": "",
+        "skipped": True,
+    }
+
+
+def _is_cacheable(results: list) -> bool:
+    return not any(r.get("error") in _UNCACHEABLE_ERRORS for r in results)
+
+
+def run_tests(
+    task,
+    code: str,
+    parallelism: int | None = None,
+    *,
+    public_only: bool = False,
+    fail_fast: bool = False,
+) -> list[dict]:
+    """
+    Запускает код против тест-кейсов задачи движком её языка (task.language, см. ENGINES).
+    Возвращает список [{caseId, passed, actualOutput, cpuTimeMs, peakMemoryKb, error?, skipped?}]
+    в порядке тест-кейсов.
+    Повторная проверка того же кода на тех же тестах берётся из кэша (result_cache).
+    parallelism — сколько кейсов выполнять одновременно (None — TASK_RUNNER_PARALLELISM).
+    public_only — только открытые кейсы (is_public), скрытые не запускаются и не попадают в ответ.
+    fail_fast — остановиться после первого непройденного кейса; оставшиеся помечаются skipped.
+    """
+    cases = _select_cases(task, public_only)
+    language = _task_language(task)
+    engine = get_engine(language)
+    cache = get_result_cache()
+    key = make_key(code, cases, language) if cache is not None else None
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    if parallelism is None:
+        parallelism = getattr(settings, "TASK_RUNNER_PARALLELISM", 1)
+    # Без fail_fast — один пакет на все кейсы; с fail_fast — пакетами по parallelism,
+    # после каждого проверяем, не пора ли остановиться.
+    chunk = max(1, parallelism) if fail_fast else max(1, len(cases))
     results = []
-    for tc in task.test_cases:
-        stdout, stderr, error = run_python_code(code, stdin=tc.input or "")
-        actual = _normalize_output(stdout)
-        expected = _normalize_output(tc.expected_output or "")
-        if error:
-            passed = False
-            actual_output = _sanitize_error_message(stderr or error)
-        else:
-            passed = actual == expected
-            actual_output = stdout
-        results.append({
-            "caseId": tc.id,
-            "passed": passed,
-            "actualOutput": actual_output,
-        })
-        if error and not passed:
-            results[-1]["error"] = error
+    for start in range(0, len(cases), chunk):
+        part = cases[start:start + chunk]
+        executions = engine.execute_batch(code, [tc.input or "" for tc in part], DEFAULT_TIMEOUT_SEC, parallelism)
+        results.extend(_case_result(tc, execution) for tc, execution in zip(part, executions))
+        if fail_fast and not all(r["passed"] for r in results):
+            results.extend(_skipped_result(tc) for tc in cases[len(results):])
+            return results
+    if cache is not None and _is_cacheable(results):
+        cache.put(key, results)
     return results
+
+
+def iter_tests(
+    task,
+    code: str,
+    parallelism: int | None = None,
+    *,
+    public_only: bool = False,
+    fail_fast: bool = False,
+):
+    """
+    Потоковый вариант run_tests: отдаёт (index, result) по мере завершения кейсов,
+    index — позиция кейса в списке проверяемых. Параметры и формат result — как у run_tests.
+    Если перестать читать генератор и закрыть его, оставшиеся кейсы не выполняются.
+    """
+    cases = _select_cases(task, public_only)
+    language = _task_language(task)
+    engine = get_engine(language)
+    cache = get_result_cache()
+    key = make_key(code, cases, language) if cache is not None else None
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            yield from enumerate(cached)
+            return
+    if parallelism is None:
+        parallelism = getattr(settings, "TASK_RUNNER_PARALLELISM", 1)
+    results = [None] * len(cases)
+    failed = False
+    outputs = engine.iter_batch(code, [tc.input or "" for tc in cases], DEFAULT_TIMEOUT_SEC, parallelism)
+    try:
+        for index, execution in outputs:
+            results[index] = _case_result(cases[index], execution)
+            yield index, results[index]
+            if fail_fast and not results[index]["passed"]:
+                failed = True
+                break
+    finally:
+        outputs.close()
+    if failed:
+        for index, tc in enumerate(cases):
+            if results[index] is None:
+                results[index] = _skipped_result(tc)
+                yield index, results[index]
+        return
+    if cache is not None and _is_cacheable(results):
+        cache.put(key, results)
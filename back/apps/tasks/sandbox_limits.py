@@ -0,0 +1,39 @@
+"""
+Лимиты ресурсов запусков решений (setrlimit) и обёртка запуска внешних процессов с ними.
+
+python sandbox_limits.py <limits JSON> <argv...> выставляет лимиты в своём процессе и заменяет
+себя процессом argv (os.execv) — так runner._run_process ограничивает node / g++ / бинарники
+без preexec_fn. Модуль импортирует только json, os, sys и resource: обёртка стартует
+на каждый запуск, лишние импорты (прогрев sandbox_worker, Django) ей не нужны.
+"""
+import json
+import os
+import sys
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows: лимиты не выставляются
+    resource = None
+
+
+def apply_limits(limits: dict) -> None:
+    """Выставляет rlimit по CPU и памяти в текущем (дочернем) процессе."""
+    if resource is None or not limits:
+        return
+    cpu_sec = limits.get("cpu_sec") or 0
+    if cpu_sec > 0:
+        soft = max(1, int(cpu_sec + 0.999))
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, soft + 1))
+    memory_bytes = limits.get("memory_bytes") or 0
+    if memory_bytes > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+
+
+def exec_with_limits(limits: dict, argv: list) -> None:
+    """Выставляет лимиты в текущем процессе и заменяет его процессом argv."""
+    apply_limits(limits)
+    os.execv(argv[0], argv)
+
+
+if __name__ == "__main__":
+    exec_with_limits(json.loads(sys.argv[1]), sys.argv[2:])
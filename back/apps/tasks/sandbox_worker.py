@@ -0,0 +1,505 @@
+"""
+Процесс-воркер песочницы для пула запуска Python-кода.
+
+Запускается как отдельный интерпретатор (python sandbox_worker.py), заранее
+импортирует часто используемые модули и в цикле принимает задания по pipe.
+На каждое выполнение форкается чистый дочерний процесс, поэтому код ученика
+не может испортить состояние воркера.
+
+Протокол: 4 байта длины (big-endian) + JSON в UTF-8, в обе стороны.
+Запрос:  {"code": str, "stdin": str, "timeout": float}
+Ответ:   {"stdout": str, "stderr": str, "returncode": int, "timed_out": bool}
+Пакетный запрос: {"code": str, "stdins": [str, ...], "timeout": float, "parallelism": int} —
+код компилируется один раз, на каждый stdin форкается отдельный процесс,
+одновременно не больше parallelism процессов.
+Ответ: {"results": [<ответ как выше>, ...]} в порядке stdins.
+Во всех запросах может быть "limits": {"cpu_sec", "memory_bytes", "output_bytes"}
+(0 — без лимита): CPU и адресное пространство ограничиваются через setrlimit,
+вывод сверх output_bytes обрезается, процесс при этом завершается.
+В ответе также "cpu_ms", "peak_memory_kb" (по rusage) и "limit": "cpu" | "output" | "slots" | null;
+"slots" — запуск не состоялся: слот хоста не освободился за KAVNT_RUNNER_SLOT_TIMEOUT секунд.
+С "stream": true вместо одного ответа воркер шлёт {"index": i, "result": <ответ>}
+по мере завершения каждого запуска и в конце {"done": true}.
+
+Общий лимит одновременных запусков на хост (для всех воркеров всех процессов
+gunicorn) — слоты-файлы с flock в каталоге KAVNT_RUNNER_SLOTS_DIR,
+их число — KAVNT_RUNNER_HOST_SLOTS (0 — без лимита).
+
+Модуль не импортирует Django — его нельзя тянуть в песочницу.
+"""
+import json
+import linecache
+import os
+import select
+import signal
+import struct
+import sys
+import time
+import traceback
+
+# Прогрев: модули, которые чаще всего импортируют решения учеников.
+import collections  # noqa: F401
+import functools  # noqa: F401
+import heapq  # noqa: F401
+import itertools  # noqa: F401
+import math  # noqa: F401
+import random  # noqa: F401
+import re  # noqa: F401
+import string  # noqa: F401
+import io
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: пул не используется, runner берёт отсюда только хелперы
+    fcntl = None
+
+if __package__:
+    from .sandbox_limits import apply_limits
+else:  # запуск скриптом: python sandbox_worker.py
+    from sandbox_limits import apply_limits
+
+SOLUTION_FILENAME = "<solution>"
+# Первая строка совпадает с заголовком временного файла в runner.run_python_code,
+# чтобы номера строк в сообщениях об ошибках не отличались от прежних.
+SOURCE_HEADER = "# -*- coding: utf-8 -*-\n"
+
+_HEADER = struct.Struct(">I")
+_READ_CHUNK = 65536
+# Пауза между попытками занять слот хоста и опросами завершившихся процессов.
+_POLL_INTERVAL_SEC = 0.005
+
+
+def _read_exact(fd: int, n: int) -> bytes:
+    buf = b""
+    while len(buf) < n:
+        chunk = os.read(fd, n - len(buf))
+        if not chunk:
+            raise EOFError
+        buf += chunk
+    return buf
+
+
+def _recv(fd: int) -> dict:
+    (size,) = _HEADER.unpack(_read_exact(fd, _HEADER.size))
+    return json.loads(_read_exact(fd, size).decode("utf-8"))
+
+
+def _send(fd: int, message: dict) -> None:
+    data = json.dumps(message).encode("utf-8")
+    payload = _HEADER.pack(len(data)) + data
+    while payload:
+        written = os.write(fd, payload)
+        payload = payload[written:]
+
+
+def _compile_solution(source: str):
+    """Компилирует код ученика. Возвращает (code_obj, None) или (None, текст SyntaxError)."""
+    try:
+        return compile(source, SOLUTION_FILENAME, "exec"), None
+    except SyntaxError as e:
+        return None, "".join(traceback.format_exception_only(type(e), e))
+
+
+def _exec_solution(source: str, code_obj) -> int:
+    """Выполняется в дочернем процессе: исполняет код как __main__, возвращает exit code."""
+    # Исходник для трейсбеков; как при чтении файла, каждая строка заканчивается переводом строки.
+    lines = [line if line.endswith("\n") else line + "\n" for line in source.splitlines(True)]
+    linecache.cache[SOLUTION_FILENAME] = (len(source), None, lines, SOLUTION_FILENAME)
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+    try:
+        exec(code_obj, namespace)
+    except SystemExit as e:
+        if e.code is None:
+            return 0
+        if isinstance(e.code, int):
+            return e.code
+        sys.stderr.write(f"{e.code}\n")
+        return 1
+    except BaseException as e:
+        # Пропускаем кадр самого воркера — в трейсбеке только код ученика.
+        tb = e.__traceback__.tb_next if e.__traceback__ else None
+        traceback.print_exception(type(e), e, tb, file=sys.stderr)
+        return 1
+    return 0
+
+
+class SlotTimeout(Exception):
+    """Слот хоста не освободился за отведённое время."""
+
+
+def busy_result() -> dict:
+    """Ответ для запуска, которому не досталось слота хоста."""
+    return {
+        "stdout": "",
+        "stderr": "",
+        "returncode": None,
+        "timed_out": False,
+        "limit": "slots",
+        "cpu_ms": None,
+        "peak_memory_kb": None,
+    }
+
+
+class HostSlots:
+    """
+    Межпроцессный семафор на файлах: слот занят, пока на его файле держится flock.
+    Блокировка снимается и при аварийном завершении процесса.
+    acquire ждёт слот не дольше timeout секунд (0 — без ограничения).
+    """
+
+    def __init__(self, directory: str, count: int, timeout: float = 0.0):
+        self.count = count
+        self.timeout = timeout
+        self.paths = []
+        if count > 0:
+            os.makedirs(directory, exist_ok=True)
+            self.paths = [os.path.join(directory, f"slot-{i}.lock") for i in range(count)]
+
+    def try_acquire(self):
+        """Возвращает дескриптор занятого слота, -1 если лимита нет, None если все заняты."""
+        if self.count <= 0 or fcntl is None:
+            return -1
+        for path in self.paths:
+            fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                os.close(fd)
+        return None
+
+    def acquire(self) -> int:
+        """Дескриптор слота (-1 без лимита); SlotTimeout, если слот не освободился за timeout."""
+        deadline = time.monotonic() + self.timeout if self.timeout > 0 else None
+        while True:
+            fd = self.try_acquire()
+            if fd is not None:
+                return fd
+            if deadline is not None and time.monotonic() >= deadline:
+                raise SlotTimeout(f"no free host slot in {self.timeout:g}s")
+            time.sleep(_POLL_INTERVAL_SEC)
+
+    @staticmethod
+    def release(fd: int) -> None:
+        if fd < 0:
+            return
+        try:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+
+def host_slots_from_env() -> HostSlots:
+    import tempfile
+    directory = os.environ.get("KAVNT_RUNNER_SLOTS_DIR") or os.path.join(tempfile.gettempdir(), "kavnt-runner-slots")
+    try:
+        count = int(os.environ.get("KAVNT_RUNNER_HOST_SLOTS", "0"))
+    except ValueError:
+        count = 0
+    try:
+        timeout = float(os.environ.get("KAVNT_RUNNER_SLOT_TIMEOUT", "0"))
+    except ValueError:
+        timeout = 0.0
+    return HostSlots(directory, count, timeout)
+
+
+def _close_inherited_fds() -> None:
+    """Закрывает в дочернем процессе всё, кроме 0/1/2: канал воркера, pipe и слоты соседних запусков."""
+    try:
+        fds = [int(name) for name in os.listdir("/proc/self/fd")]
+    except OSError:
+        os.closerange(3, 1024)
+        return
+    for fd in fds:
+        if fd > 2:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def rusage_metrics(rusage) -> dict:
+    """cpu_ms и peak_memory_kb из rusage дочернего процесса (ru_maxrss на macOS — в байтах)."""
+    peak = rusage.ru_maxrss // 1024 if sys.platform == "darwin" else rusage.ru_maxrss
+    return {
+        "cpu_ms": int(round((rusage.ru_utime + rusage.ru_stime) * 1000)),
+        "peak_memory_kb": int(peak),
+    }
+
+
+def _child_main(source: str, code_obj, stdin_fd: int, stdout_fd: int, stderr_fd: int, limits: dict) -> None:
+    os.dup2(stdin_fd, 0)
+    os.dup2(stdout_fd, 1)
+    os.dup2(stderr_fd, 2)
+    _close_inherited_fds()
+    apply_limits(limits)
+    signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+    sys.stdin = io.TextIOWrapper(io.FileIO(0, "r", closefd=False), encoding="utf-8")
+    sys.stdout = io.TextIOWrapper(io.FileIO(1, "w", closefd=False), encoding="utf-8")
+    sys.stderr = io.TextIOWrapper(io.FileIO(2, "w", closefd=False), encoding="utf-8", line_buffering=True)
+    sys.argv = [SOLUTION_FILENAME]
+    exit_code = 1
+    try:
+        exit_code = _exec_solution(source, code_obj)
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except Exception:
+            pass
+        os._exit(exit_code & 0xFF)
+
+
+class _Run:
+    """Один запущенный дочерний процесс: его pipe, накопленный (ограниченный) вывод и дедлайн."""
+
+    def __init__(self, source: str, code_obj, stdin: str, timeout: float, slot_fd: int, limits: dict):
+        self.slot_fd = slot_fd
+        self.limits = limits or {}
+        in_r, in_w = os.pipe()
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        self.pid = os.fork()
+        if self.pid == 0:
+            _child_main(source, code_obj, in_r, out_w, err_w, self.limits)
+        os.close(in_r)
+        os.close(out_w)
+        os.close(err_w)
+        self.out_fd = out_r
+        self.err_fd = err_r
+        self.chunks = {out_r: [], err_r: []}
+        self.sizes = {out_r: 0, err_r: 0}
+        self.readers = [out_r, err_r]
+        self.pending_in = stdin.encode("utf-8")
+        self.in_fd = in_w
+        if not self.pending_in:
+            self._close_stdin()
+        self.deadline = time.monotonic() + timeout
+        self.timed_out = False
+        self.output_exceeded = False
+        self.returncode = None
+        self.metrics = {"cpu_ms": None, "peak_memory_kb": None}
+
+    def _close_stdin(self) -> None:
+        if self.in_fd is not None:
+            os.close(self.in_fd)
+            self.in_fd = None
+
+    def write_stdin(self) -> None:
+        try:
+            written = os.write(self.in_fd, self.pending_in[:_READ_CHUNK])
+            self.pending_in = self.pending_in[written:]
+        except BrokenPipeError:
+            self.pending_in = b""
+        if not self.pending_in:
+            self._close_stdin()
+
+    def _kill(self) -> None:
+        try:
+            os.kill(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def read(self, fd: int) -> None:
+        data = os.read(fd, _READ_CHUNK)
+        if not data:
+            self.readers.remove(fd)
+            os.close(fd)
+            return
+        limit = self.limits.get("output_bytes") or 0
+        if limit > 0 and self.sizes[fd] + len(data) > limit:
+            # Лимит вывода: сохраняем сколько влезло и завершаем процесс, не читая дальше
+            data = data[:limit - self.sizes[fd]]
+            if not self.output_exceeded:
+                self.output_exceeded = True
+                self._kill()
+        self.chunks[fd].append(data)
+        self.sizes[fd] += len(data)
+
+    def poll(self) -> bool:
+        """Проверяет завершение процесса (без блокировки), по дедлайну убивает его."""
+        if self.returncode is not None:
+            return True
+        if time.monotonic() >= self.deadline and not self.timed_out:
+            self.timed_out = True
+            self._kill()
+        killed = self.timed_out or self.output_exceeded
+        if self.readers and not killed:
+            return False
+        pid, status, rusage = os.wait4(self.pid, 0 if killed else os.WNOHANG)
+        if pid == 0:
+            return False
+        if os.WIFSIGNALED(status):
+            self.returncode = -os.WTERMSIG(status)
+        else:
+            self.returncode = os.WEXITSTATUS(status)
+        self.metrics = rusage_metrics(rusage)
+        # Сюда с открытыми pipe попадаем, только если процесс убит, — недочитанный вывод не нужен.
+        for fd in self.readers:
+            os.close(fd)
+        self.readers = []
+        self._close_stdin()
+        HostSlots.release(self.slot_fd)
+        self.slot_fd = -1
+        return True
+
+    def _hit_cpu_limit(self) -> bool:
+        """SIGXCPU — мягкий лимит RLIMIT_CPU; SIGKILL — жёсткий, только если процессорное время
+        действительно выбрано (иначе это OOM killer или другой внешний kill)."""
+        if self.returncode == -signal.SIGXCPU:
+            return True
+        cpu_ms = self.metrics.get("cpu_ms")
+        return self.returncode == -signal.SIGKILL and cpu_ms is not None and cpu_ms >= self.limits["cpu_sec"] * 1000
+
+    def result(self) -> dict:
+        limit = None
+        if self.output_exceeded:
+            limit = "output"
+        elif self.limits.get("cpu_sec") and not self.timed_out and self._hit_cpu_limit():
+            limit = "cpu"
+        return {
+            "stdout": b"".join(self.chunks[self.out_fd]).decode("utf-8", errors="replace"),
+            "stderr": b"".join(self.chunks[self.err_fd]).decode("utf-8", errors="replace"),
+            "returncode": self.returncode,
+            "timed_out": self.timed_out,
+            "limit": limit,
+            **self.metrics,
+        }
+
+
+def execute_many(
+    source: str,
+    code_obj,
+    stdins: list,
+    timeout: float,
+    parallelism: int,
+    slots: HostSlots,
+    on_result=None,
+    limits: dict | None = None,
+) -> list:
+    """
+    Запускает код против каждого stdin в отдельном дочернем процессе, не больше
+    parallelism одновременно и только при наличии свободного слота хоста.
+    Таймаут отсчитывается от старта каждого процесса. Результаты — в порядке stdins;
+    on_result(index, result), если задан, вызывается сразу по завершении каждого запуска.
+    Если слот хоста не освободился за slots.timeout, оставшиеся запуски получают busy_result().
+    """
+    parallelism = max(1, parallelism)
+    results = [None] * len(stdins)
+    queue = list(range(len(stdins)))
+    running = {}
+    while queue or running:
+        while queue and len(running) < parallelism:
+            # Если в запросе уже что-то выполняется, новый слот не ждём — разберём вывод.
+            try:
+                slot_fd = slots.try_acquire() if running else slots.acquire()
+            except SlotTimeout:
+                for index in queue:
+                    results[index] = busy_result()
+                    if on_result is not None:
+                        on_result(index, results[index])
+                queue = []
+                break
+            if slot_fd is None:
+                break
+            index = queue.pop(0)
+            running[index] = _Run(source, code_obj, stdins[index], timeout, slot_fd, limits)
+
+        readers = {}
+        writers = {}
+        wait = None
+        for run in running.values():
+            for fd in run.readers:
+                readers[fd] = run
+            if run.in_fd is not None:
+                writers[run.in_fd] = run
+            left = max(0.0, run.deadline - time.monotonic())
+            if not run.readers:
+                left = min(left, _POLL_INTERVAL_SEC)
+            wait = left if wait is None else min(wait, left)
+        if queue and len(running) < parallelism:
+            wait = _POLL_INTERVAL_SEC if wait is None else min(wait, _POLL_INTERVAL_SEC)
+        if readers or writers:
+            readable, writable, _ = select.select(list(readers), list(writers), [], wait)
+            for fd in writable:
+                writers[fd].write_stdin()
+            for fd in readable:
+                readers[fd].read(fd)
+        elif wait:
+            time.sleep(wait)
+
+        for index, run in list(running.items()):
+            if run.poll():
+                results[index] = run.result()
+                del running[index]
+                if on_result is not None:
+                    on_result(index, results[index])
+    return results
+
+
+def handle_request(request: dict, slots: HostSlots, send=None) -> dict:
+    """
+    Одиночный или пакетный запуск (если в запросе есть "stdins").
+    Для потокового запроса промежуточные результаты отправляются через send(message).
+    """
+    source = SOURCE_HEADER + request.get("code", "")
+    timeout = float(request.get("timeout", 5.0))
+    batch = "stdins" in request
+    stdins = [stdin or "" for stdin in request["stdins"]] if batch else [request.get("stdin", "")]
+    on_result = None
+    if request.get("stream") and send is not None:
+        def on_result(index, result):
+            send({"index": index, "result": result})
+    code_obj, syntax_error = _compile_solution(source)
+    if syntax_error is not None:
+        results = [
+            {
+                "stdout": "",
+                "stderr": syntax_error,
+                "returncode": 1,
+                "timed_out": False,
+                "limit": None,
+                "cpu_ms": 0,
+                "peak_memory_kb": None,
+            }
+            for _ in stdins
+        ]
+        if on_result is not None:
+            for index, result in enumerate(results):
+                on_result(index, result)
+    else:
+        parallelism = int(request.get("parallelism", 1))
+        results = execute_many(
+            source, code_obj, stdins, timeout, parallelism, slots, on_result, request.get("limits")
+        )
+    if on_result is not None:
+        return {"done": True}
+    if batch:
+        return {"results": results}
+    return results[0]
+
+
+def main() -> None:
+    # Канал с родителем уводим с 0/1, чтобы stdin/stdout дочерних процессов были свободны
+    # и код ученика не мог писать в протокол.
+    cmd_fd = os.dup(0)
+    reply_fd = os.dup(1)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+    slots = host_slots_from_env()
+    while True:
+        try:
+            request = _recv(cmd_fd)
+        except EOFError:
+            break
+        try:
+            reply = handle_request(request, slots, send=lambda message: _send(reply_fd, message))
+        except Exception as e:
+            reply = {"error": str(e)}
+        _send(reply_fd, reply)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,7 @@ class TaskSerializer(serializers.Serializer):
     title = serializers.CharField(max_length=500)
     description = serializers.CharField(required=False, allow_blank=True, default="")
     starter_code = serializers.CharField(required=False, allow_blank=True, default="")
+    language = serializers.ChoiceField(choices=["python", "javascript", "cpp"], required=False, default="python")
     track_id = serializers.CharField(required=False, allow_null=True, default=None)
     test_cases = TestCaseSerializer(many=True, required=False, default=list)
     hard = serializers.BooleanField(required=False, default=False)
@@ -61,6 +62,7 @@ class TaskSerializer(serializers.Serializer):
             title=validated_data["title"],
             description=validated_data.get("description", ""),
             starter_code=validated_data.get("starter_code", ""),
+            language=validated_data.get("language", "python"),
             track_id=validated_data.get("track_id") or "",
             hard=hard,
             visible_group_ids=visible_group_ids,
@@ -95,7 +97,7 @@ class TaskSerializer(serializers.Serializer):
 
     def update(self, instance, validated_data):
         tcs = validated_data.pop("test_cases", None)
-        for attr in ("title", "description", "starter_code", "hard", "visible_group_ids",
+        for attr in ("title", "description", "starter_code", "language", "hard", "visible_group_ids",
                      "hints", "reward_achievement_ids", "max_attempts"):
             if attr in validated_data:
                 setattr(instance, attr, validated_data[attr])
@@ -117,6 +119,16 @@ class RunCodeSerializer(serializers.Serializer):
     code = serializers.CharField(required=True)
 
 
+class RunRequestSerializer(RunCodeSerializer):
+    # public — только открытые тест-кейсы (кнопка «Запустить»), all — все
+    mode = serializers.ChoiceField(choices=["all", "public"], required=False, default="all")
+
+
+class SubmitRequestSerializer(RunCodeSerializer):
+    # Остановить проверку на первом непройденном тесте (оставшиеся помечаются skipped)
+    fail_fast = serializers.BooleanField(required=False, default=False)
+
+
 class SubmitResultSerializer(serializers.Serializer):
     passed = serializers.BooleanField()
     results = serializers.ListField(child=serializers.DictField())
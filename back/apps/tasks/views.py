@@ -1,3 +1,7 @@
+import json
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from rest_framework import status
 from rest_framework.viewsets import GenericViewSet
 from rest_framework.mixins import RetrieveModelMixin, CreateModelMixin, UpdateModelMixin, DestroyModelMixin
@@ -6,13 +10,22 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 
 from common.db_utils import get_doc_by_pk
+from common.http_cache import conditional_get
 from .documents import Task, TaskCaseEmbed
-from .serializers import TaskSerializer, RunCodeSerializer
-from .runner import run_tests
+from .serializers import TaskSerializer, RunCodeSerializer, RunRequestSerializer, SubmitRequestSerializer
+from .runner import iter_tests, run_tests
+from .grading import (
+    complete_job,
+    fail_job,
+    finalize_partial_submission,
+    finalize_submission,
+    grade_submission,
+    pending_job_count,
+)
 from apps.users.permissions import IsTeacher
 from apps.users.teacher_utils import validate_visible_group_ids_for_teacher
-from apps.submissions.documents import Submission, TaskDraft
-from apps.submissions.progress import save_lesson_progress
+from apps.submissions.documents import Submission, SubmissionJob, TaskDraft
+from apps.submissions.tasks import run_code_check
 
 
 def _can_edit_task(request, task):
@@ -25,6 +38,39 @@ def _can_edit_task(request, task):
     return creator and str(creator) == str(request.user.id)
 
 
+_STREAM_FORMATS = {
+    "sse": "text/event-stream",
+    "jsonl": "application/x-ndjson",
+}
+
+
+def _stream_format(request):
+    """?stream=sse|jsonl — отдавать результаты кейсов по мере готовности."""
+    fmt = request.query_params.get("stream")
+    return fmt if fmt in _STREAM_FORMATS else None
+
+
+def _streaming_response(events, fmt):
+    """
+    Оборачивает генератор событий (event, data) в потоковый ответ: SSE или JSON Lines.
+    Когда клиент отключается, сервер закрывает генератор и оставшиеся кейсы не выполняются.
+    """
+    def body():
+        try:
+            for event, data in events:
+                if fmt == "sse":
+                    yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+                else:
+                    yield json.dumps({"type": event, **data}, ensure_ascii=False) + "\n"
+        finally:
+            events.close()
+
+    response = StreamingHttpResponse(body(), content_type=_STREAM_FORMATS[fmt])
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx не буферизует поток
+    return response
+
+
 def _is_visible_group_only_patch(data):
     keys = set(data.keys())
     return bool(keys) and not (keys - {"visible_group_ids"})
@@ -53,8 +99,7 @@ class TaskViewSet(GenericViewSet, RetrieveModelMixin, CreateModelMixin, UpdateMo
             instance = self.get_object()
         except Task.DoesNotExist:
             return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
-        ser = self.get_serializer(instance)
-        return Response(ser.data)
+        return conditional_get(request, ("lessons",), lambda: Response(self.get_serializer(instance).data))
 
     def create(self, request, *args, **kwargs):
         visible_group_ids = request.data.get("visible_group_ids") or []
@@ -110,68 +155,112 @@ class TaskViewSet(GenericViewSet, RetrieveModelMixin, CreateModelMixin, UpdateMo
 
     @action(detail=True, methods=["post"])
     def run(self, request, pk=None):
-        """Run code against test cases."""
-        ser = RunCodeSerializer(data=request.data)
+        """
+        Run code against test cases (mode=public — only public ones).
+        ?stream=sse|jsonl streams each case result as it completes.
+        """
+        ser = RunRequestSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
         try:
             task = self.get_object()
         except Task.DoesNotExist:
             return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
         code = ser.validated_data["code"]
-        results = run_tests(task, code)
+        public_only = ser.validated_data["mode"] == "public"
+        fmt = _stream_format(request)
+        if fmt:
+            def events():
+                for index, result in iter_tests(task, code, public_only=public_only):
+                    yield "case", {"index": index, **result}
+                yield "done", {}
+            return _streaming_response(events(), fmt)
+        results = run_tests(task, code, public_only=public_only)
         return Response({"results": results})
 
     @action(detail=True, methods=["post"])
     def submit(self, request, pk=None):
-        """Submit solution, run tests, save submission."""
-        ser = RunCodeSerializer(data=request.data)
+        """
+        Submit solution, run tests, save submission.
+        With TASK_SUBMIT_ASYNC the check is queued to Celery: 202 {job_id, status},
+        result via GET jobs/<job_id>/. fail_fast=true stops at the first failed case.
+        ?stream=sse|jsonl streams each case result as it completes, then the submit payload.
+        """
+        ser = SubmitRequestSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
         try:
             task = self.get_object()
         except Task.DoesNotExist:
             return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
         code = ser.validated_data["code"]
+        fail_fast = ser.validated_data["fail_fast"]
         user_id = str(request.user.id)
         max_attempts = getattr(task, "max_attempts", None)
         if max_attempts is not None:
             count = Submission.objects(user_id=user_id, task_id=str(task.id)).count()
+            # Отправки в очереди ещё не стали Submission, но попытку уже расходуют
+            count += pending_job_count(user_id, str(task.id))
             if count >= max_attempts:
                 return Response(
                     {"detail": "Превышено максимальное число попыток для этого задания."},
                     status=status.HTTP_403_FORBIDDEN,
                 )
-        results = run_tests(task, code)
-        passed = all(r.get("passed", False) for r in results)
-        Submission(
-            task_id=str(task.id),
-            user_id=user_id,
-            code=code,
-            passed=passed,
-            results=results,
-        ).save()
-        lesson_id = str(getattr(task, "public_id", None) or task.id)
-        track_title = ""
-        if task.track_id:
-            try:
-                from bson import ObjectId
-                from apps.tracks.documents import Track
-                t = Track.objects(id=ObjectId(task.track_id)).first()
-                if t:
-                    track_title = t.title
-            except Exception:
-                pass
-        unlocked_achievements = save_lesson_progress(
-            user_id, lesson_id, "task", passed,
-            lesson_title=task.title, track_id=task.track_id or "", track_title=track_title,
-            available_until=getattr(task, "available_until", None),
-        )
-        message = "Все тесты пройдены." if passed else "Часть тестов не пройдена."
-        return Response({
-            "passed": passed,
-            "results": results,
-            "message": message,
-            "unlocked_achievements": unlocked_achievements,
-        })
+        fmt = _stream_format(request)
+        if fmt:
+            # Потоковая проверка всегда идёт в этом процессе (даже при TASK_SUBMIT_ASYNC).
+            # Попытка резервируется SubmissionJob до первого вердикта кейса и засчитывается,
+            # даже если клиент отключится до конца: иначе отключением можно обойти max_attempts.
+            job = SubmissionJob(task_id=str(task.id), user_id=user_id, status="running")
+            job.save()
+
+            def events():
+                results = [None] * len(task.test_cases)
+                try:
+                    for index, result in iter_tests(task, code, fail_fast=fail_fast):
+                        results[index] = result
+                        yield "case", {"index": index, **result}
+                except GeneratorExit:
+                    complete_job(job, finalize_partial_submission(task, user_id, code, results))
+                    raise
+                except Exception as e:
+                    fail_job(job, e)
+                    raise
+                payload = finalize_submission(task, user_id, code, results)
+                complete_job(job, payload)
+                yield "done", payload
+            return _streaming_response(events(), fmt)
+        if getattr(settings, "TASK_SUBMIT_ASYNC", False):
+            job = SubmissionJob(task_id=str(task.id), user_id=user_id)
+            job.save()
+            run_code_check.delay(str(task.id), user_id, code, job_id=str(job.id), fail_fast=fail_fast)
+            return Response(
+                {"job_id": str(job.id), "status": job.status},
+                status=status.HTTP_202_ACCEPTED,
+            )
+        return Response(grade_submission(task, user_id, code, fail_fast=fail_fast))
+
+    @action(detail=True, methods=["get"], url_path=r"jobs/(?P<job_id>[0-9a-f]{24})")
+    def job(self, request, pk=None, job_id=None):
+        """Статус и результат отправки, поставленной в очередь (TASK_SUBMIT_ASYNC)."""
+        try:
+            task = self.get_object()
+        except Task.DoesNotExist:
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        job = SubmissionJob.objects(
+            id=job_id, task_id=str(task.id), user_id=str(request.user.id)
+        ).first()
+        if not job:
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        data = {"job_id": str(job.id), "status": job.status}
+        if job.status == "done":
+            data.update({
+                "passed": job.passed,
+                "results": job.results,
+                "message": job.message,
+                "unlocked_achievements": job.unlocked_achievements,
+            })
+        elif job.status == "failed":
+            data["detail"] = "Не удалось проверить решение."
+        return Response(data)
 
     @action(detail=True, methods=["get", "put", "patch"], url_path="draft")
     def draft(self, request, pk=None):
@@ -222,6 +311,7 @@ class TaskViewSet(GenericViewSet, RetrieveModelMixin, CreateModelMixin, UpdateMo
             track_id="",
             description=instance.description,
             starter_code=instance.starter_code,
+            language=instance.language,
             test_cases=instance.test_cases,
             hard=instance.hard,
             visible_group_ids=[],
@@ -6,3 +6,17 @@ class TracksConfig(AppConfig):
     name = "apps.tracks"
     label = "tracks"
     verbose_name = "Tracks"
+
+    def ready(self):
+        from common.http_cache import connect_signals as connect_http_cache_signals
+        from common.lesson_registry import connect_signals
+
+        from .lesson_index import connect_signals as connect_lesson_index_signals
+        from .membership import connect_signals as connect_membership_signals
+        from .progress import connect_signals as connect_progress_signals
+
+        connect_signals()
+        connect_membership_signals()
+        connect_progress_signals()
+        connect_lesson_index_signals()
+        connect_http_cache_signals()
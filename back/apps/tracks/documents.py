@@ -1,4 +1,16 @@
-from mongoengine import Document, StringField, IntField, ListField, EmbeddedDocumentField, EmbeddedDocument
+from datetime import datetime
+
+from mongoengine import (
+    BooleanField,
+    DateTimeField,
+    DictField,
+    Document,
+    EmbeddedDocument,
+    EmbeddedDocumentField,
+    IntField,
+    ListField,
+    StringField,
+)
 
 
 class LessonRef(EmbeddedDocument):
@@ -24,3 +36,59 @@ class Track(Document):
     # List of group ids (strings) that may see this track. Empty list = visible to all.
     visible_group_ids = ListField(StringField(), default=list)
     created_by_id = StringField(default="")
+
+
+class TrackProgress(Document):
+    """
+    Прогресс пользователя по треку (денормализованно, см. tracks/progress.py).
+    Обновляется при save_lesson_progress; rebuild_track_progress пересчитывает из истории.
+    """
+    meta = {
+        "collection": "track_progress",
+        "indexes": [
+            {"fields": ["user_id", "track_id"], "unique": True},
+            "track_id",
+        ],
+    }
+    user_id = StringField(required=True)
+    track_id = StringField(required=True)  # ObjectId трека
+    # id уроков трека (LessonRef.id) на момент расчёта: если трек изменился, запись пересчитывается
+    lesson_refs = ListField(StringField(), default=list)
+    # {LessonRef.id: {"id": display_id, "type", "status", "late_by_seconds"}}
+    lessons = DictField(default=dict)
+    total = IntField(default=0)
+    completed = IntField(default=0)  # включая completed_late
+    started = IntField(default=0)
+    late = IntField(default=0)
+    version = IntField(default=0)  # для оптимистичной блокировки при инкрементальном обновлении
+    updated_at = DateTimeField(default=datetime.utcnow)
+
+
+class LessonIndex(Document):
+    """
+    Каталог уроков всех типов (см. tracks/lesson_index.py): одна запись на урок с полями для
+    списков — id, название, видимость, сроки, автор и треки. Обновляется сигналами сохранения
+    и удаления уроков и треков; rebuild_lesson_index пересобирает из коллекций уроков.
+    """
+    meta = {
+        "collection": "lesson_index",
+        "indexes": [
+            {"fields": ["lesson_type", "lesson_id"], "unique": True},
+            {"fields": ["in_track", "available_until"], "name": "in_track_until"},
+            "created_by_id",
+        ],
+        "index_background": True,
+    }
+    lesson_type = StringField(required=True)
+    lesson_id = StringField(required=True)  # ObjectId урока
+    public_id = StringField(default="")
+    title = StringField(default="")
+    hard = BooleanField(default=False)
+    visible_group_ids = ListField(StringField(), default=list)
+    available_from = DateTimeField(default=None)
+    available_until = DateTimeField(default=None)
+    created_by_id = StringField(default="")
+    copied_from_id = StringField(default="")
+    track_ids = ListField(StringField(), default=list)  # ObjectId треков, в которые входит урок
+    in_track = BooleanField(default=False)
+    updated_at = DateTimeField(default=datetime.utcnow)
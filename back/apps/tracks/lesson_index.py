@@ -0,0 +1,228 @@
+"""
+Каталог уроков (LessonIndex): одна коллекция для списков по всем типам уроков —
+одиночные и просроченные уроки главной страницы, материалы и одиночные задания учителя.
+
+Запись урока обновляется сигналами mongoengine при сохранении и удалении урока,
+track_ids / in_track — при изменении уроков трека или удалении трека.
+Если записей в каталоге меньше, чем уроков (база старше каталога), первое чтение в процессе
+пересобирает его (ensure_lesson_index). Проверяется только число записей: устаревшие записи
+(ошибка в сигнале, изменение урока в обход mongoengine) исправляет только полная пересборка:
+python manage.py rebuild_lesson_index.
+"""
+import logging
+import threading
+from datetime import datetime
+
+from pymongo import DeleteOne, UpdateOne
+
+from common import lesson_registry
+
+from .documents import LessonIndex, Track
+
+logger = logging.getLogger(__name__)
+
+# Каталог уже сверен с коллекциями уроков в этом процессе
+_checked = False
+_check_lock = threading.Lock()
+
+INDEX_FIELDS = (
+    "public_id",
+    "title",
+    "hard",
+    "visible_group_ids",
+    "available_from",
+    "available_until",
+    "created_by_id",
+    "copied_from_id",
+)
+
+
+def index_fields(lesson_type: str, raw: dict) -> dict:
+    """Поля записи каталога из сырого документа урока (as_pymongo / to_mongo)."""
+    return {
+        "public_id": raw.get("public_id") or "",
+        "title": raw.get("title") or "",
+        "hard": bool(lesson_type == "task" and raw.get("hard")),
+        "visible_group_ids": [str(g) for g in raw.get("visible_group_ids") or []],
+        "available_from": raw.get("available_from"),
+        "available_until": raw.get("available_until"),
+        "created_by_id": raw.get("created_by_id") or "",
+        "copied_from_id": raw.get("copied_from_id") or "",
+    }
+
+
+def _track_memberships() -> dict:
+    """{(lesson_type, ObjectId урока): [id треков]} по ссылкам всех треков."""
+    memberships = {}
+    for raw in Track.objects.only("lessons").as_pymongo():
+        for ref in raw.get("lessons") or []:
+            if not ref.get("id"):
+                continue
+            entry = lesson_registry.get_lesson(ref.get("type"), ref["id"])
+            key = (ref.get("type"), entry["id"] if entry else str(ref["id"]))
+            track_ids = memberships.setdefault(key, [])
+            if str(raw["_id"]) not in track_ids:
+                track_ids.append(str(raw["_id"]))
+    return memberships
+
+
+def index_lesson(lesson_type: str, document) -> None:
+    """Создаёт или обновляет запись урока; треки новой записи берутся из ссылок треков."""
+    raw = document.to_mongo()
+    lesson_id = str(document.id)
+    ids = [lesson_id] + ([raw["public_id"]] if raw.get("public_id") else [])
+    track_ids = [str(t) for t in Track.objects(lessons__id__in=ids).distinct("id")]
+    LessonIndex._get_collection().update_one(
+        {"lesson_type": lesson_type, "lesson_id": lesson_id},
+        {
+            "$set": {**index_fields(lesson_type, raw), "updated_at": datetime.utcnow()},
+            "$setOnInsert": {"track_ids": track_ids, "in_track": bool(track_ids)},
+        },
+        upsert=True,
+    )
+
+
+def remove_lesson(lesson_type: str, lesson_id) -> None:
+    LessonIndex._get_collection().delete_one({"lesson_type": lesson_type, "lesson_id": str(lesson_id)})
+
+
+def sync_track_membership() -> int:
+    """Пересчитывает track_ids / in_track по текущим трекам; пишутся только изменившиеся записи."""
+    memberships = _track_memberships()
+    requests = []
+    query = {"$or": [{"in_track": True}, {"lesson_id": {"$in": [oid for _, oid in memberships]}}]}
+    for row in LessonIndex.objects(__raw__=query).only("lesson_type", "lesson_id", "track_ids").as_pymongo():
+        track_ids = memberships.get((row["lesson_type"], row["lesson_id"]), [])
+        if sorted(row.get("track_ids") or []) != sorted(track_ids):
+            requests.append(
+                UpdateOne({"_id": row["_id"]}, {"$set": {"track_ids": track_ids, "in_track": bool(track_ids)}})
+            )
+    if requests:
+        LessonIndex._get_collection().bulk_write(requests, ordered=False)
+    return len(requests)
+
+
+def rebuild_lesson_index() -> tuple:
+    """Пересобирает каталог из коллекций уроков. Возвращает (записано, удалено)."""
+    collection = LessonIndex._get_collection()
+    existing = {
+        (row["lesson_type"], row["lesson_id"]): row["_id"]
+        for row in LessonIndex.objects.only("lesson_type", "lesson_id").as_pymongo()
+    }
+    now = datetime.utcnow()
+    written = 0
+    for lesson_type in lesson_registry.LESSON_TYPES:
+        model = lesson_registry.lesson_model(lesson_type)
+        requests = []
+        for raw in model.objects.only(*[f for f in INDEX_FIELDS if f in model._fields]).as_pymongo():
+            existing.pop((lesson_type, str(raw["_id"])), None)
+            requests.append(UpdateOne(
+                {"lesson_type": lesson_type, "lesson_id": str(raw["_id"])},
+                {"$set": {**index_fields(lesson_type, raw), "updated_at": now},
+                 "$setOnInsert": {"track_ids": [], "in_track": False}},
+                upsert=True,
+            ))
+        if requests:
+            collection.bulk_write(requests, ordered=False)
+            written += len(requests)
+    if existing:
+        collection.bulk_write([DeleteOne({"_id": _id}) for _id in existing.values()], ordered=False)
+    sync_track_membership()
+    return written, len(existing)
+
+
+def _counts() -> tuple:
+    """(записей в каталоге, уроков во всех коллекциях) по метаданным коллекций."""
+    total = sum(
+        lesson_registry.lesson_model(t)._get_collection().estimated_document_count()
+        for t in lesson_registry.LESSON_TYPES
+    )
+    return LessonIndex._get_collection().estimated_document_count(), total
+
+
+def ensure_lesson_index() -> None:
+    """
+    Пересобирает каталог, если в нём меньше записей, чем уроков; проверка — один раз на процесс.
+    Содержимое записей не сверяется.
+    """
+    global _checked
+    if _checked:
+        return
+    with _check_lock:
+        if _checked:
+            return
+        indexed, total = _counts()
+        if indexed < total:
+            logger.warning("lesson_index has %d of %d lessons, rebuilding", indexed, total)
+            rebuild_lesson_index()
+        _checked = True
+
+
+def lesson_index_ids(row) -> list:
+    """id записи каталога, под которыми мог сохраниться прогресс: display id, затем ObjectId."""
+    return list(dict.fromkeys(i for i in (row.get("public_id"), row["lesson_id"]) if i))
+
+
+def list_lessons(query: dict | None = None) -> list:
+    """Записи каталога (dict) по фильтру Mongo: по типам в порядке LESSON_TYPES, внутри — по ObjectId."""
+    ensure_lesson_index()
+    order = {t: i for i, t in enumerate(lesson_registry.LESSON_TYPES)}
+    rows = LessonIndex.objects(__raw__=query or {}).exclude("id", "updated_at").as_pymongo()
+    return sorted(rows, key=lambda row: (order.get(row["lesson_type"], len(order)), row["lesson_id"]))
+
+
+def connect_signals() -> None:
+    """Обновлять каталог при сохранении и удалении уроков и треков (нужен blinker)."""
+    from mongoengine import signals
+
+    from .membership import track_lessons_changed
+
+    if not signals.signals_available:
+        return
+
+    # Ошибка каталога не прерывает сохранение: она пишется в лог, запись восстановит rebuild_lesson_index
+    def track_saved(sender, document=None, created=False, **kwargs):
+        if track_lessons_changed(document, created):
+            try:
+                sync_track_membership()
+            except Exception:
+                logger.exception(
+                    "lesson_index: track membership sync failed after saving track %s; "
+                    "run manage.py rebuild_lesson_index --membership-only",
+                    document.id,
+                )
+
+    def track_deleted(sender, document=None, **kwargs):
+        if document.lessons:
+            try:
+                sync_track_membership()
+            except Exception:
+                logger.exception(
+                    "lesson_index: track membership sync failed after deleting track %s; "
+                    "run manage.py rebuild_lesson_index --membership-only",
+                    document.id,
+                )
+
+    signals.post_save.connect(track_saved, sender=Track, weak=False)
+    signals.post_delete.connect(track_deleted, sender=Track, weak=False)
+    for lesson_type in lesson_registry.LESSON_TYPES:
+        model = lesson_registry.lesson_model(lesson_type)
+
+        def lesson_saved(sender, document=None, _lesson_type=lesson_type, **kwargs):
+            try:
+                index_lesson(_lesson_type, document)
+            except Exception:
+                logger.exception(
+                    "lesson_index: failed to index %s %s; run manage.py rebuild_lesson_index", _lesson_type, document.id
+                )
+
+        def lesson_deleted(sender, document=None, _lesson_type=lesson_type, **kwargs):
+            try:
+                remove_lesson(_lesson_type, document.id)
+            except Exception:
+                logger.exception(
+                    "lesson_index: failed to remove %s %s; run manage.py rebuild_lesson_index", _lesson_type, document.id
+                )
+
+        signals.post_save.connect(lesson_saved, sender=model, weak=False)
+        signals.post_delete.connect(lesson_deleted, sender=model, weak=False)
@@ -0,0 +1,60 @@
+"""
+Пакетная загрузка уроков на время одного запроса (DataLoader).
+
+Сериализатор треков заранее отдаёт загрузчику все ссылки на уроки всех треков
+ответа (prime), а при первом обращении загрузчик одним запросом id__in с
+проекцией на тип получает их все. Дальше LessonRefSerializer берёт display id,
+окно доступности и hard из памяти; весь ответ видит один и тот же снимок уроков.
+Записи — в формате реестра (common/lesson_registry.py).
+"""
+from bson import ObjectId
+
+from common.lesson_registry import LESSON_TYPES, entry_fields, lesson_model, make_entry
+
+CONTEXT_KEY = "lesson_loader"
+
+
+class LessonLoader:
+    def __init__(self):
+        self._pending = {}  # type -> set(oid)
+        self._loaded = {}  # (type, oid) -> entry или None, если урока нет
+
+    def prime(self, lesson_refs) -> None:
+        """Запоминает ссылки, которые понадобятся; загрузка — при первом load()."""
+        for ref in lesson_refs:
+            self._want(getattr(ref, "type", None), getattr(ref, "id", None))
+
+    def _want(self, lesson_type, lesson_id) -> None:
+        key = (lesson_type, str(lesson_id or ""))
+        if lesson_type in LESSON_TYPES and key not in self._loaded:
+            self._pending.setdefault(lesson_type, set()).add(key[1])
+
+    def load(self, lesson_type, lesson_id) -> dict | None:
+        """Запись урока по ObjectId из LessonRef или None."""
+        key = (lesson_type, str(lesson_id or ""))
+        if key not in self._loaded:
+            self._want(lesson_type, lesson_id)
+            self.dispatch()
+        return self._loaded.get(key)
+
+    def dispatch(self) -> None:
+        """Загружает все ожидающие уроки: один запрос на тип."""
+        pending, self._pending = self._pending, {}
+        for lesson_type, ids in pending.items():
+            for sid in ids:
+                self._loaded[(lesson_type, sid)] = None
+            oids = [ObjectId(sid) for sid in ids if ObjectId.is_valid(sid)]
+            if not oids:
+                continue
+            qs = lesson_model(lesson_type).objects(id__in=oids).only(*entry_fields(lesson_type)).as_pymongo()
+            for raw in qs:
+                entry = make_entry(raw)
+                self._loaded[(lesson_type, entry["id"])] = entry
+
+
+def get_lesson_loader(context: dict) -> LessonLoader:
+    """Загрузчик текущего запроса (живёт в context сериализатора)."""
+    loader = context.get(CONTEXT_KEY)
+    if loader is None:
+        loader = context[CONTEXT_KEY] = LessonLoader()
+    return loader
@@ -0,0 +1,23 @@
+"""
+Пересборка каталога уроков (LessonIndex) из коллекций уроков и треков.
+Нужна при первом развёртывании каталога и после изменений уроков в обход mongoengine.
+Запуск: python manage.py rebuild_lesson_index [--membership-only]
+"""
+from django.core.management.base import BaseCommand
+
+from apps.tracks.lesson_index import rebuild_lesson_index, sync_track_membership
+
+
+class Command(BaseCommand):
+    help = "Rebuild the lesson_index collection from lesson collections and track lessons."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--membership-only", action="store_true", help="Only recompute track_ids / in_track")
+
+    def handle(self, *args, **options):
+        if options["membership_only"]:
+            changed = sync_track_membership()
+            self.stdout.write(self.style.SUCCESS(f"Updated track membership of {changed} lesson(s)."))
+            return
+        written, deleted = rebuild_lesson_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {written} lesson(s), removed {deleted} stale record(s)."))
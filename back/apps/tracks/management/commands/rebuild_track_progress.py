@@ -0,0 +1,35 @@
+"""
+Пересчёт денормализованного прогресса по трекам (TrackProgress) из истории
+LessonProgress и Submission.
+Запуск: python manage.py rebuild_track_progress [--user USER_ID] [--track TRACK_ID]
+"""
+from django.core.management.base import BaseCommand
+
+from apps.submissions.documents import LessonProgress, Submission
+from apps.tracks.documents import Track
+from apps.tracks.progress import refresh_track_progress
+from common.db_utils import get_doc_by_pk
+
+
+class Command(BaseCommand):
+    help = "Recompute TrackProgress documents from LessonProgress and Submission history."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", action="append", default=[], help="Only this user id (repeatable)")
+        parser.add_argument("--track", action="append", default=[], help="Only this track (ObjectId or public_id, repeatable)")
+
+    def handle(self, *args, **options):
+        if options["track"]:
+            tracks = [get_doc_by_pk(Track, pk) for pk in options["track"]]
+        else:
+            tracks = list(Track.objects.only("id", "lessons"))
+        user_ids = options["user"] or sorted(
+            set(LessonProgress.objects.distinct("user_id")) | set(Submission.objects.distinct("user_id"))
+        )
+        for i, user_id in enumerate(user_ids, 1):
+            refresh_track_progress(str(user_id), tracks)
+            if i % 100 == 0:
+                self.stdout.write(f"{i}/{len(user_ids)} users...")
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt track progress: {len(user_ids)} user(s) x {len(tracks)} track(s).")
+        )
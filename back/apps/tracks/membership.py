@@ -0,0 +1,90 @@
+"""
+Множество id уроков, входящих в треки (ObjectId и public_id): по нему одиночные уроки
+отделяются от уроков треков (главная страница, профиль, панели учителя).
+
+Хранится как снимок реестра уроков (common.lesson_registry.LessonRegistry): память процесса
+и Redis с версией, общие для всех воркеров. Версия увеличивается, когда у трека меняется
+список уроков, трек удаляется, урок удаляется или меняет public_id.
+"""
+from bson import ObjectId
+
+from common import lesson_registry
+
+_KEY = "in-track"
+
+
+def _build_ids(_key) -> list:
+    """id уроков из ссылок треков: ссылка даёт ObjectId или public_id, второй id — из коллекции типа."""
+    from .documents import Track
+
+    refs = {}
+    for raw in Track.objects.only("lessons").as_pymongo():
+        for ref in raw.get("lessons") or []:
+            if ref.get("id"):
+                refs.setdefault(ref.get("type"), set()).add(str(ref["id"]))
+
+    ids = set()
+    for lesson_type, type_ids in refs.items():
+        ids.update(type_ids)
+        model = lesson_registry.lesson_model(lesson_type)
+        if model is None:
+            continue
+        oids = [ObjectId(i) for i in type_ids if ObjectId.is_valid(i)]
+        query = {"$or": [{"_id": {"$in": oids}}, {"public_id": {"$in": list(type_ids)}}]}
+        for doc in model.objects(__raw__=query).only("public_id").as_pymongo():
+            ids.add(str(doc["_id"]))
+            if doc.get("public_id"):
+                ids.add(str(doc["public_id"]))
+    return sorted(ids)
+
+
+_cache = lesson_registry.LessonRegistry(build=_build_ids, load=frozenset)
+
+
+def in_track_lesson_ids() -> frozenset:
+    """Все id уроков, входящих в какой-либо трек (ObjectId и public_id)."""
+    return _cache.snapshot(_KEY)
+
+
+def invalidate() -> None:
+    """Сбрасывает множество во всех процессах."""
+    _cache.invalidate(_KEY)
+
+
+def track_lessons_changed(track, created: bool) -> bool:
+    """Изменился ли при сохранении трека список его уроков (для post_save)."""
+    changed = {name.split(".")[0] for name in track._get_changed_fields()}
+    return bool(created and track.lessons) or "lessons" in changed
+
+
+def connect_signals() -> None:
+    """Сбрасывать множество при изменении уроков трека и удалении уроков (нужен blinker)."""
+    from mongoengine import signals
+
+    from .documents import Track
+
+    if not signals.signals_available:
+        return
+
+    def track_saved(sender, document=None, created=False, **kwargs):
+        if track_lessons_changed(document, created):
+            invalidate()
+
+    def track_deleted(sender, document=None, **kwargs):
+        if document.lessons:
+            invalidate()
+
+    def lesson_saved(sender, document=None, created=False, **kwargs):
+        if not created and "public_id" in document._get_changed_fields():
+            invalidate()
+
+    def lesson_deleted(sender, document=None, **kwargs):
+        if str(document.id) in in_track_lesson_ids():
+            invalidate()
+
+    signals.post_save.connect(track_saved, sender=Track, weak=False)
+    signals.post_delete.connect(track_deleted, sender=Track, weak=False)
+    for lesson_type in lesson_registry.LESSON_TYPES:
+        model = lesson_registry.lesson_model(lesson_type)
+        signals.post_save.connect(lesson_saved, sender=model, weak=False)
+        signals.post_delete.connect(lesson_deleted, sender=model, weak=False)
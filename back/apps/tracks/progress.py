@@ -0,0 +1,399 @@
+"""
+Статусы уроков пользователя по трекам.
+
+resolve_track_statuses — пакетный расчёт из LessonProgress / Submission: результат
+совпадает с get_lesson_status_for_user для каждого урока, но считается несколькими
+запросами $in на все треки сразу (блоки вопросов лекций, LessonProgress по всем
+возможным id, включая блоки вопросов, последние Submission по задачам).
+Display id уроков берутся из реестра (common/lesson_registry.py).
+
+TrackProgress — тот же результат, сохранённый на пару (пользователь, трек): чтение —
+один запрос по индексу, update_lesson_progress обновляет его при записи прогресса.
+Смена public_id или блоков-вопросов урока и удаление урока удаляют TrackProgress треков
+с этим уроком (connect_signals) — следующее чтение пересчитывает их.
+"""
+from datetime import datetime
+from types import SimpleNamespace
+
+from mongoengine.errors import NotUniqueError
+
+from common import lesson_registry
+from common.lesson_registry import LESSON_TYPES
+
+# Сколько раз повторить инкрементальное обновление TrackProgress при конкурентной записи
+_UPDATE_RETRIES = 3
+
+def load_lecture_question_blocks(lesson_refs) -> dict:
+    """{ObjectId-строка лекции: id блоков-вопросов} для лекций из ссылок, одним запросом."""
+    from apps.lectures.documents import load_question_block_ids
+
+    return load_question_block_ids(ref.id for ref in lesson_refs if getattr(ref, "type", None) == "lecture")
+
+
+def _format_status_late(lp) -> tuple:
+    """(status, late_by_seconds) — completed_late даёт status='completed_late'."""
+    if not lp:
+        return ("not_started", 0)
+    st = lp.status
+    late = getattr(lp, "late_by_seconds", 0) or 0
+    if st == "completed" and getattr(lp, "completed_late", False):
+        return ("completed_late", late)
+    return (st, 0)
+
+
+def _latest_submissions_by_user(user_ids: list, task_ids: list) -> dict:
+    """{user_id: {task_id: passed последней отправки}} одним агрегирующим запросом."""
+    from apps.submissions.documents import Submission
+
+    if not user_ids or not task_ids:
+        return {}
+    # Сортировка в порядке индекса user_task_latest: агрегация покрывается индексом
+    pipeline = [
+        {"$sort": {"user_id": 1, "task_id": 1, "created_at": -1}},
+        {"$group": {"_id": {"user_id": "$user_id", "task_id": "$task_id"}, "passed": {"$first": "$passed"}}},
+    ]
+    result = {}
+    for row in Submission.objects(user_id__in=user_ids, task_id__in=task_ids).aggregate(pipeline):
+        result.setdefault(row["_id"]["user_id"], {})[row["_id"]["task_id"]] = bool(row["passed"])
+    return result
+
+
+def _latest_submissions(user_id: str, task_ids: list) -> dict:
+    """{task_id: passed последней отправки} одним агрегирующим запросом."""
+    return _latest_submissions_by_user([user_id], task_ids).get(user_id, {})
+
+
+def _lesson_columns(tracks, lesson_types=LESSON_TYPES) -> tuple:
+    """
+    ([(track_key, LessonRef, display_id, candidates, block_ids)], lookup_ids) для уроков треков.
+    candidates — id, под которыми мог сохраниться прогресс урока (display id, ObjectId из ссылки);
+    block_ids — "<display_id>::<block_id>" блоков вопросов лекции.
+    """
+    question_blocks = load_lecture_question_blocks(
+        ref for track in tracks for ref in (getattr(track, "lessons", None) or [])
+    )
+    lookup_ids = set()
+    lessons = []
+    for track in tracks:
+        for ref in getattr(track, "lessons", None) or []:
+            if getattr(ref, "type", None) not in lesson_types:
+                continue
+            display_id = lesson_registry.display_id(ref.type, ref.id)
+            candidates = [i for i in dict.fromkeys([display_id, str(ref.id)]) if i]
+            block_ids = [f"{display_id}::{qid}" for qid in question_blocks.get(str(ref.id), [])]
+            lookup_ids.update(candidates)
+            lookup_ids.update(block_ids)
+            lessons.append((str(track.id), ref, display_id, candidates, block_ids))
+    return lessons, lookup_ids
+
+
+def _lesson_status(ref, candidates, block_ids, progress: dict, submissions: dict) -> tuple:
+    """(status, late_by_seconds) урока по прогрессу пользователя {lesson_id: lp} и {task_id: passed}."""
+    lp = next((progress[i] for i in candidates if i in progress), None)
+    if ref.type == "lecture" and block_ids:
+        block_progress = [progress.get(bid) for bid in block_ids]
+        if all(p is not None and p.status == "completed" for p in block_progress):
+            return _format_status_late(lp)
+        any_progress = any(p is not None for p in block_progress)
+        return ("started" if (lp or any_progress) else "not_started", 0)
+    if lp:
+        return _format_status_late(lp)
+    if ref.type == "task" and str(ref.id) in submissions:
+        return ("completed" if submissions[str(ref.id)] else "started", 0)
+    return ("not_started", 0)
+
+
+def _load_progress(user_ids: list, lookup_ids) -> dict:
+    """{user_id: {lesson_id: LessonProgress}} одним запросом $in."""
+    from apps.submissions.documents import LessonProgress
+
+    progress = {}
+    if not user_ids or not lookup_ids:
+        return progress
+    qs = LessonProgress.objects(user_id__in=list(user_ids), lesson_id__in=list(lookup_ids)).only(
+        "user_id", "lesson_id", "status", "completed_late", "late_by_seconds"
+    )
+    for lp in qs:
+        progress.setdefault(lp.user_id, {}).setdefault(lp.lesson_id, lp)
+    return progress
+
+
+def _resolve_lessons(user_id: str, tracks) -> list:
+    """[(track_key, LessonRef, display_id, (status, late_by_seconds))] для всех уроков треков."""
+    lessons, lookup_ids = _lesson_columns(list(tracks))
+    progress = _load_progress([user_id], lookup_ids).get(user_id, {})
+    task_ids = [
+        str(ref.id)
+        for _, ref, _, candidates, _ in lessons
+        if ref.type == "task" and not any(i in progress for i in candidates)
+    ]
+    submissions = _latest_submissions(user_id, task_ids)
+    return [
+        (track_key, ref, display_id, _lesson_status(ref, candidates, block_ids, progress, submissions))
+        for track_key, ref, display_id, candidates, block_ids in lessons
+    ]
+
+
+def resolve_track_statuses(user_id: str, tracks) -> dict:
+    """
+    Статусы всех уроков треков для пользователя:
+    {str(track.id): {display_id: (status, late_by_seconds)}}.
+    status: 'completed', 'completed_late', 'started', 'not_started'.
+    """
+    tracks = list(tracks)
+    result = {str(track.id): {} for track in tracks}
+    for track_key, _, display_id, status in _resolve_lessons(user_id, tracks):
+        result[track_key][display_id] = status
+    return result
+
+
+# --- Материализованный прогресс (TrackProgress) ---
+
+def _lesson_entry(ref, display_id: str, status: tuple) -> dict:
+    return {"id": display_id, "type": ref.type, "status": status[0], "late_by_seconds": status[1]}
+
+
+def _track_lesson_refs(track) -> list:
+    return [str(ref.id) for ref in getattr(track, "lessons", None) or [] if getattr(ref, "type", None) in LESSON_TYPES]
+
+
+def _counts(lessons: dict) -> dict:
+    statuses = [entry["status"] for entry in lessons.values()]
+    return {
+        "total": len(statuses),
+        "completed": sum(1 for s in statuses if s in ("completed", "completed_late")),
+        "started": statuses.count("started"),
+        "late": statuses.count("completed_late"),
+    }
+
+
+def _write_track_progress(user_id: str, key: str, version, fields: dict) -> bool:
+    """
+    Сохраняет пересчитанный TrackProgress, только если запись не менялась с чтения её version
+    (None — записи не было). False — запись изменили или создали параллельно.
+    """
+    from apps.tracks.documents import TrackProgress
+
+    if version is None:
+        try:
+            TrackProgress(user_id=user_id, track_id=key, version=1, **fields).save(force_insert=True)
+        except NotUniqueError:
+            return False
+        return True
+    return bool(TrackProgress.objects(user_id=user_id, track_id=key, version=version).update_one(
+        inc__version=1, **{f"set__{name}": value for name, value in fields.items()}
+    ))
+
+
+def refresh_track_progress(user_id: str, tracks) -> dict:
+    """
+    Пересчитывает и сохраняет TrackProgress пользователя по трекам; {str(track.id): TrackProgress}.
+    Запись сохраняется, только если её version не изменилась с начала пересчёта: иначе пересчёт
+    повторяется, а если запись так и не удалось записать — она удаляется (следующее чтение пересчитает).
+    """
+    from apps.tracks.documents import TrackProgress
+
+    result = {}
+    pending = list(tracks)
+    fields_by_track = {}
+    for _ in range(_UPDATE_RETRIES):
+        # Версии читаются до статусов: запись, обновлённая после чтения, не будет перезаписана старыми данными
+        versions = {
+            row["track_id"]: row.get("version", 0)
+            for row in TrackProgress.objects(user_id=user_id, track_id__in=[str(t.id) for t in pending])
+            .only("track_id", "version").as_pymongo()
+        }
+        lessons_by_track = {str(track.id): {} for track in pending}
+        for track_key, ref, display_id, status in _resolve_lessons(user_id, pending):
+            lessons_by_track[track_key][str(ref.id)] = _lesson_entry(ref, display_id, status)
+        now = datetime.utcnow()
+        conflicts = []
+        for track in pending:
+            key = str(track.id)
+            lessons = lessons_by_track[key]
+            fields_by_track[key] = {
+                "lesson_refs": _track_lesson_refs(track),
+                "lessons": lessons,
+                **_counts(lessons),
+                "updated_at": now,
+            }
+            if _write_track_progress(user_id, key, versions.get(key), fields_by_track[key]):
+                result[key] = TrackProgress(user_id=user_id, track_id=key, **fields_by_track[key])
+            else:
+                conflicts.append(track)
+        pending = conflicts
+        if not pending:
+            break
+    if pending:
+        keys = [str(track.id) for track in pending]
+        TrackProgress.objects(user_id=user_id, track_id__in=keys).delete()
+        for key in keys:
+            result[key] = TrackProgress(user_id=user_id, track_id=key, **fields_by_track[key])
+    return result
+
+
+def get_track_progress(user_id: str, tracks) -> dict:
+    """
+    TrackProgress пользователя по трекам одним запросом: {str(track.id): TrackProgress}.
+    Отсутствующие записи и записи, посчитанные для другого состава трека, пересчитываются.
+    """
+    from apps.tracks.documents import TrackProgress
+
+    tracks = list(tracks)
+    if not tracks:
+        return {}
+    stored = {
+        tp.track_id: tp
+        for tp in TrackProgress.objects(user_id=user_id, track_id__in=[str(t.id) for t in tracks])
+    }
+    result = {}
+    stale = []
+    for track in tracks:
+        tp = stored.get(str(track.id))
+        if tp is None or list(tp.lesson_refs) != _track_lesson_refs(track):
+            stale.append(track)
+        else:
+            result[str(track.id)] = tp
+    if stale:
+        result.update(refresh_track_progress(user_id, stale))
+    return result
+
+
+def track_statuses(track_progress) -> dict:
+    """{display_id: (status, late_by_seconds)} из TrackProgress — как resolve_track_statuses для одного трека."""
+    return {
+        entry["id"]: (entry["status"], entry.get("late_by_seconds", 0))
+        for entry in (track_progress.lessons or {}).values()
+    }
+
+
+def _lesson_for_progress_id(lesson_id: str, lesson_type: str):
+    """(тип, ObjectId-строка) урока трека по lesson_id из LessonProgress; блок вопроса — его лекция."""
+    if "::" in lesson_id:
+        lesson_id, lesson_type = lesson_id.split("::", 1)[0], "lecture"
+    entry = lesson_registry.get_lesson(lesson_type, lesson_id)
+    if entry is None:
+        return None, None
+    return lesson_type, entry["id"]
+
+
+def update_lesson_progress(user_id: str, lesson_id: str, lesson_type: str) -> None:
+    """
+    Инкрементально обновляет TrackProgress после изменения LessonProgress урока:
+    пересчитывается статус одного урока во всех треках, где он есть.
+    """
+    from apps.tracks.documents import Track, TrackProgress
+
+    lesson_type, ref_id = _lesson_for_progress_id(lesson_id, lesson_type)
+    if not ref_id:
+        return
+    for track in Track.objects(__raw__={"lessons": {"$elemMatch": {"id": ref_id, "type": lesson_type}}}):
+        key = str(track.id)
+        ref = next(r for r in track.lessons if str(r.id) == ref_id and r.type == lesson_type)
+        for _ in range(_UPDATE_RETRIES):
+            tp = TrackProgress.objects(user_id=user_id, track_id=key).first()
+            if tp is None or list(tp.lesson_refs) != _track_lesson_refs(track):
+                refresh_track_progress(user_id, [track])
+                break
+            (_, _, display_id, status), = _resolve_lessons(user_id, [SimpleNamespace(id=track.id, lessons=[ref])])
+            lessons = dict(tp.lessons or {})
+            lessons[ref_id] = _lesson_entry(ref, display_id, status)
+            updated = TrackProgress.objects(id=tp.id, version=tp.version).update_one(
+                set__lessons=lessons,
+                inc__version=1,
+                set__updated_at=datetime.utcnow(),
+                **{f"set__{name}": value for name, value in _counts(lessons).items()},
+            )
+            if updated:
+                break
+        else:
+            # Запись всё время меняется параллельно — пересчитываем трек целиком
+            refresh_track_progress(user_id, [track])
+
+
+def invalidate_lesson_tracks(lesson_type: str, document) -> int:
+    """Удаляет TrackProgress всех пользователей по трекам, где есть урок. Возвращает число записей."""
+    from apps.tracks.documents import Track, TrackProgress
+
+    ids = [i for i in (str(document.id), getattr(document, "public_id", None)) if i]
+    query = {"lessons": {"$elemMatch": {"id": {"$in": ids}, "type": lesson_type}}}
+    track_ids = [str(t) for t in Track.objects(__raw__=query).distinct("id")]
+    if not track_ids:
+        return 0
+    return TrackProgress.objects(track_id__in=track_ids).delete()
+
+
+def connect_signals() -> None:
+    """Сбрасывать TrackProgress при смене public_id / блоков-вопросов и удалении урока (нужен blinker)."""
+    from mongoengine import signals
+
+    if not signals.signals_available:
+        return
+    for lesson_type in LESSON_TYPES:
+        model = lesson_registry.lesson_model(lesson_type)
+
+        def lesson_saved(sender, document=None, created=False, _lesson_type=lesson_type, **kwargs):
+            if not created and {"public_id", "question_block_ids"} & set(document._get_changed_fields()):
+                invalidate_lesson_tracks(_lesson_type, document)
+
+        def lesson_deleted(sender, document=None, _lesson_type=lesson_type, **kwargs):
+            invalidate_lesson_tracks(_lesson_type, document)
+
+        signals.post_save.connect(lesson_saved, sender=model, weak=False)
+        signals.post_delete.connect(lesson_deleted, sender=model, weak=False)
+
+
+# --- Матрица прогресса учеников (панели учителя) ---
+
+STATUS_CODES = {"not_started": 0, "started": 1, "completed": 2, "completed_late": 3}
+
+
+class ProgressMatrix:
+    """
+    Статусы уроков группы учеников: на ученика — bytearray с кодом статуса (STATUS_CODES)
+    на каждый урок, столбцы сгруппированы по трекам. Счётчики считаются bytes.count
+    по строке или срезу трека, без цикла по урокам в Python.
+    """
+
+    def __init__(self, lessons: list, rows: dict):
+        self.lessons = lessons  # [(track_key, LessonRef, display_id)]
+        self.rows = rows  # {student_id: bytearray}
+        self.track_slices = {}
+        for i, (track_key, _, _) in enumerate(lessons):
+            start = self.track_slices.get(track_key, (i, i))[0]
+            self.track_slices[track_key] = (start, i + 1)
+
+    def counts(self, student_id: str, track_key: str | None = None) -> dict:
+        """{total, completed, started, late} ученика по треку или по всем трекам матрицы."""
+        row = self.rows.get(str(student_id), bytearray(len(self.lessons)))
+        if track_key is not None:
+            start, stop = self.track_slices.get(str(track_key), (0, 0))
+            row = row[start:stop]
+        late = row.count(STATUS_CODES["completed_late"])
+        return {
+            "total": len(row),
+            "completed": row.count(STATUS_CODES["completed"]) + late,
+            "started": row.count(STATUS_CODES["started"]),
+            "late": late,
+        }
+
+
+def build_progress_matrix(student_ids, tracks, lesson_types=LESSON_TYPES) -> ProgressMatrix:
+    """
+    ProgressMatrix учеников по урокам треков: LessonProgress всех учеников — одним запросом $in,
+    последние отправки по задачам — одной агрегацией; статусы — как в resolve_track_statuses.
+    """
+    student_ids = [str(s) for s in student_ids]
+    lessons, lookup_ids = _lesson_columns(list(tracks), lesson_types)
+    progress = _load_progress(student_ids, lookup_ids)
+    task_ids = list({str(ref.id) for _, ref, _, _, _ in lessons if ref.type == "task"})
+    submissions = _latest_submissions_by_user(student_ids, task_ids)
+    rows = {}
+    for student_id in student_ids:
+        user_progress = progress.get(student_id, {})
+        user_submissions = submissions.get(student_id, {})
+        rows[student_id] = bytearray(
+            STATUS_CODES[_lesson_status(ref, candidates, block_ids, user_progress, user_submissions)[0]]
+            for _, ref, _, candidates, block_ids in lessons
+        )
+    return ProgressMatrix([(track_key, ref, display_id) for track_key, ref, display_id, _, _ in lessons], rows)
@@ -1,5 +1,8 @@
 from rest_framework import serializers
 from .documents import Track, LessonRef
+from .loaders import CONTEXT_KEY as LESSON_LOADER_KEY, get_lesson_loader
+from .progress import _format_status_late, get_track_progress, load_lecture_question_blocks, track_statuses
+from common import lesson_registry
 from common.db_utils import get_doc_by_pk, datetime_to_iso_utc
 
 
@@ -32,155 +35,27 @@ def _resolve_lesson_id(lesson_type: str, lesson_id: str) -> str:
 
 def _get_lesson_display_id(lesson_ref) -> str:
     """Возвращает id урока для API (public_id или ObjectId) — совпадает с LessonRefSerializer.get_id."""
-    try:
-        from bson import ObjectId
-        if getattr(lesson_ref, "type", None) == "lecture":
-            from apps.lectures.documents import Lecture
-            try:
-                lec = Lecture.objects.get(id=ObjectId(lesson_ref.id))
-                return str(getattr(lec, "public_id", None) or str(lec.id))
-            except Exception:
-                return str(lesson_ref.id)
-        if getattr(lesson_ref, "type", None) == "task":
-            from apps.tasks.documents import Task
-            try:
-                task = Task.objects.get(id=ObjectId(lesson_ref.id))
-                return str(getattr(task, "public_id", None) or str(task.id))
-            except Exception:
-                return str(lesson_ref.id)
-        if getattr(lesson_ref, "type", None) == "puzzle":
-            from apps.puzzles.documents import Puzzle
-            try:
-                p = Puzzle.objects.get(id=ObjectId(lesson_ref.id))
-                return str(getattr(p, "public_id", None) or str(p.id))
-            except Exception:
-                return str(lesson_ref.id)
-        if getattr(lesson_ref, "type", None) == "question":
-            from apps.questions.documents import Question
-            try:
-                q = Question.objects.get(id=ObjectId(lesson_ref.id))
-                return str(getattr(q, "public_id", None) or str(q.id))
-            except Exception:
-                return str(lesson_ref.id)
-        if getattr(lesson_ref, "type", None) == "survey":
-            from apps.surveys.documents import Survey
-            try:
-                s = Survey.objects.get(id=ObjectId(lesson_ref.id))
-                return str(getattr(s, "public_id", None) or str(s.id))
-            except Exception:
-                return str(lesson_ref.id)
-        if getattr(lesson_ref, "type", None) == "layout":
-            from apps.layouts.documents import LayoutLesson
-            try:
-                lay = LayoutLesson.objects.get(id=ObjectId(lesson_ref.id))
-                return str(getattr(lay, "public_id", None) or str(lay.id))
-            except Exception:
-                return str(lesson_ref.id)
-    except Exception:
-        pass
-    return str(getattr(lesson_ref, "id", ""))
+    return lesson_registry.display_id(getattr(lesson_ref, "type", None), getattr(lesson_ref, "id", ""))
 
 
 def _get_lesson_availability(lesson_ref):
     """Return (available_from, available_until) as isoformat strings or None."""
-    try:
-        from bson import ObjectId
-        if getattr(lesson_ref, "type", None) == "lecture":
-            from apps.lectures.documents import Lecture
-            doc = Lecture.objects.get(id=ObjectId(lesson_ref.id))
-        elif getattr(lesson_ref, "type", None) == "task":
-            from apps.tasks.documents import Task
-            doc = Task.objects.get(id=ObjectId(lesson_ref.id))
-        elif getattr(lesson_ref, "type", None) == "puzzle":
-            from apps.puzzles.documents import Puzzle
-            doc = Puzzle.objects.get(id=ObjectId(lesson_ref.id))
-        elif getattr(lesson_ref, "type", None) == "question":
-            from apps.questions.documents import Question
-            doc = Question.objects.get(id=ObjectId(lesson_ref.id))
-        elif getattr(lesson_ref, "type", None) == "survey":
-            from apps.surveys.documents import Survey
-            doc = Survey.objects.get(id=ObjectId(lesson_ref.id))
-        elif getattr(lesson_ref, "type", None) == "layout":
-            from apps.layouts.documents import LayoutLesson
-            doc = LayoutLesson.objects.get(id=ObjectId(lesson_ref.id))
-        else:
-            return None, None
-        af = getattr(doc, "available_from", None)
-        au = getattr(doc, "available_until", None)
-        return (datetime_to_iso_utc(af), datetime_to_iso_utc(au))
-    except Exception:
+    entry = lesson_registry.get_lesson(getattr(lesson_ref, "type", None), getattr(lesson_ref, "id", None))
+    if entry is None:
         return None, None
+    return entry["available_from"], entry["available_until"]
 
 
-def _get_lecture_for_lesson(lesson_ref):
-    """Возвращает Lecture для lesson_ref типа lecture, либо None."""
+def _get_lecture_question_block_ids(lesson_ref) -> list:
+    """id блоков-вопросов лекции из lesson_ref (по индексу лекции, без загрузки blocks)."""
     if getattr(lesson_ref, "type", None) != "lecture":
-        return None
-    try:
-        from common.db_utils import get_doc_by_pk
-        from apps.lectures.documents import Lecture
-        return get_doc_by_pk(Lecture, str(lesson_ref.id))
-    except Exception:
-        return None
+        return []
+    return load_lecture_question_blocks([lesson_ref]).get(str(lesson_ref.id), [])
 
 
 def _get_all_lesson_ids_for_lookup(lesson_ref) -> list:
     """Все возможные lesson_id, под которыми мог сохраниться прогресс."""
-    ids = set()
-    ids.add(str(lesson_ref.id))
-    ids.add(_get_lesson_display_id(lesson_ref))
-    try:
-        from bson import ObjectId
-        if getattr(lesson_ref, "type", None) == "lecture":
-            from apps.lectures.documents import Lecture
-            lec = Lecture.objects.get(id=ObjectId(lesson_ref.id))
-            if getattr(lec, "public_id", None):
-                ids.add(str(lec.public_id))
-            ids.add(str(lec.id))
-        elif getattr(lesson_ref, "type", None) == "task":
-            from apps.tasks.documents import Task
-            task = Task.objects.get(id=ObjectId(lesson_ref.id))
-            if getattr(task, "public_id", None):
-                ids.add(str(task.public_id))
-            ids.add(str(task.id))
-        elif getattr(lesson_ref, "type", None) == "puzzle":
-            from apps.puzzles.documents import Puzzle
-            p = Puzzle.objects.get(id=ObjectId(lesson_ref.id))
-            if getattr(p, "public_id", None):
-                ids.add(str(p.public_id))
-            ids.add(str(p.id))
-        elif getattr(lesson_ref, "type", None) == "question":
-            from apps.questions.documents import Question
-            q = Question.objects.get(id=ObjectId(lesson_ref.id))
-            if getattr(q, "public_id", None):
-                ids.add(str(q.public_id))
-            ids.add(str(q.id))
-        elif getattr(lesson_ref, "type", None) == "survey":
-            from apps.surveys.documents import Survey
-            s = Survey.objects.get(id=ObjectId(lesson_ref.id))
-            if getattr(s, "public_id", None):
-                ids.add(str(s.public_id))
-            ids.add(str(s.id))
-        elif getattr(lesson_ref, "type", None) == "layout":
-            from apps.layouts.documents import LayoutLesson
-            lay = LayoutLesson.objects.get(id=ObjectId(lesson_ref.id))
-            if getattr(lay, "public_id", None):
-                ids.add(str(lay.public_id))
-            ids.add(str(lay.id))
-    except Exception:
-        pass
-    return [i for i in ids if i]
-
-
-def _format_status_late(lp) -> tuple:
-    """(status, late_by_seconds) — completed_late даёт status='completed_late'."""
-    if not lp:
-        return ("not_started", 0)
-    st = lp.status
-    late = getattr(lp, "late_by_seconds", 0) or 0
-    if st == "completed" and getattr(lp, "completed_late", False):
-        return ("completed_late", late)
-    return (st, 0)
+    return lesson_registry.lesson_ids(getattr(lesson_ref, "type", None), getattr(lesson_ref, "id", ""))
 
 
 def _format_status_late_with_time(lp, completed_at=None):
@@ -202,37 +77,20 @@ def get_lesson_status_for_user(user_id: str, lesson_ref, display_id: str):
     """
     from apps.submissions.documents import LessonProgress, Submission
 
-    lp = None
-    for lid in _get_all_lesson_ids_for_lookup(lesson_ref):
-        lp = LessonProgress.objects(user_id=user_id, lesson_id=lid).first()
-        if lp:
-            break
+    lookup_ids = _get_all_lesson_ids_for_lookup(lesson_ref)
+    # Прогресс урока и блоков-вопросов лекции ("<display_id>::<block_id>") — одним запросом $in
+    q_block_ids = _get_lecture_question_block_ids(lesson_ref)
+    block_keys = [f"{display_id}::{qid}" for qid in q_block_ids]
+    found = {}
+    for row in LessonProgress.objects(user_id=user_id, lesson_id__in=lookup_ids + block_keys):
+        found.setdefault(row.lesson_id, row)
+    lp = next((found[i] for i in lookup_ids if i in found), None)
 
     if getattr(lesson_ref, "type", None) == "lecture":
-        lecture = _get_lecture_for_lesson(lesson_ref)
-        blocks = getattr(lecture, "blocks", None) or []
-        q_block_ids = []
-        for b in blocks:
-            if not isinstance(b, dict):
-                continue
-            if b.get("type") == "question" and b.get("id"):
-                q_block_ids.append(b.get("id"))
-            elif b.get("type") == "video" and b.get("id"):
-                for pp in b.get("pause_points", []):
-                    if pp.get("id"):
-                        q_block_ids.append(f"{b.get('id')}::{pp.get('id')}")
-        if lecture and q_block_ids:
-            all_completed = True
-            any_progress = False
-            for qid in q_block_ids:
-                block_lesson_id = f"{display_id}::{qid}"
-                q_lp = LessonProgress.objects(user_id=user_id, lesson_id=block_lesson_id).first()
-                if q_lp:
-                    any_progress = True
-                    if q_lp.status != "completed":
-                        all_completed = False
-                else:
-                    all_completed = False
+        if q_block_ids:
+            block_progress = [found.get(key) for key in block_keys]
+            all_completed = all(p is not None and p.status == "completed" for p in block_progress)
+            any_progress = any(p is not None for p in block_progress)
             if all_completed:
                 return _format_status_late(lp)
             return ("started" if (lp or any_progress) else "not_started", 0)
@@ -243,8 +101,11 @@ def get_lesson_status_for_user(user_id: str, lesson_ref, display_id: str):
     if getattr(lesson_ref, "type", None) == "task":
         if lp:
             return _format_status_late(lp)
+        # Покрывается индексом user_task_latest (без чтения документа)
         last = (
             Submission.objects(user_id=user_id, task_id=lesson_ref.id)
+            .only("passed")
+            .exclude("id")
             .order_by("-created_at")
             .first()
         )
@@ -257,35 +118,80 @@ def get_lesson_status_for_user(user_id: str, lesson_ref, display_id: str):
     return ("not_started", 0)
 
 
-def get_standalone_status_for_user(user_id: str, lesson_type: str, lesson_ids: list) -> tuple:
+def get_standalone_statuses_for_users(user_ids: list, lessons: list) -> dict:
     """
-    Статус по одиночному заданию (без lesson_ref). lesson_ids — список id (objectid, public_id).
-    Возвращает (status, late_by_seconds, completed_at_iso).
+    Статусы одиночных заданий группы пользователей пакетом: lessons — [(lesson_type, [id, ...])].
+    Один запрос LessonProgress $in по всем пользователям и id и одна агрегация последних отправок
+    по задачам без прогресса. Возвращает {user_id: [(status, late_by_seconds, completed_at_iso)]}
+    со списками в порядке lessons.
     """
     from apps.submissions.documents import LessonProgress, Submission
 
-    lp = None
-    for lid in lesson_ids:
-        if not lid:
-            continue
-        lp = LessonProgress.objects(user_id=user_id, lesson_id=lid).first()
-        if lp:
-            break
-    if lesson_type == "task":
-        if lp:
-            return _format_status_late_with_time(lp)
-        for tid in lesson_ids:
-            if not tid:
+    user_ids = [str(u) for u in user_ids]
+    candidates = []
+    for lesson_type, lesson_ids in lessons:
+        ids = []
+        for lid in lesson_ids:
+            ids.extend(lesson_registry.lesson_ids(lesson_type, lid) if lid else [])
+        candidates.append(list(dict.fromkeys(ids)))
+
+    all_ids = list({i for ids in candidates for i in ids})
+    found = {}
+    if all_ids and user_ids:
+        for lp in LessonProgress.objects(user_id__in=user_ids, lesson_id__in=all_ids):
+            found.setdefault((lp.user_id, lp.lesson_id), lp)
+    progress = {
+        user_id: [next((found[(user_id, i)] for i in ids if (user_id, i) in found), None) for ids in candidates]
+        for user_id in user_ids
+    }
+
+    task_ids = list({
+        i for user_progress in progress.values()
+        for (lesson_type, _), ids, lp in zip(lessons, candidates, user_progress)
+        if lesson_type == "task" and lp is None for i in ids
+    })
+    latest = {}
+    if task_ids:
+        # Последняя отправка по каждой паре (пользователь, задача) в порядке индекса user_task_latest
+        pipeline = [
+            {"$sort": {"user_id": 1, "task_id": 1, "created_at": -1}},
+            {"$group": {
+                "_id": {"user_id": "$user_id", "task_id": "$task_id"},
+                "passed": {"$first": "$passed"},
+                "created_at": {"$first": "$created_at"},
+            }},
+        ]
+        for row in Submission.objects(user_id__in=user_ids, task_id__in=task_ids).aggregate(pipeline):
+            latest[(row["_id"]["user_id"], row["_id"]["task_id"])] = row
+
+    result = {}
+    for user_id in user_ids:
+        statuses = result[user_id] = []
+        for (lesson_type, _), ids, lp in zip(lessons, candidates, progress[user_id]):
+            if lp is not None:
+                statuses.append(_format_status_late_with_time(lp))
                 continue
-            last = Submission.objects(user_id=user_id, task_id=tid).order_by("-created_at").first()
-            if last:
-                st = "completed" if last.passed else "started"
-                completed_at = datetime_to_iso_utc(last.created_at) if last.passed else None
-                return (st, 0, completed_at)
-        return ("not_started", 0, None)
-    if lp:
-        return _format_status_late_with_time(lp)
-    return ("not_started", 0, None)
+            rows = [latest[(user_id, i)] for i in ids if (user_id, i) in latest] if lesson_type == "task" else []
+            if not rows:
+                statuses.append(("not_started", 0, None))
+                continue
+            last = max(rows, key=lambda row: row["created_at"])
+            completed_at = datetime_to_iso_utc(last["created_at"]) if last["passed"] else None
+            statuses.append(("completed" if last["passed"] else "started", 0, completed_at))
+    return result
+
+
+def get_standalone_statuses_for_user(user_id: str, lessons: list) -> list:
+    """Статусы одиночных заданий одного пользователя: [(status, late_by_seconds, completed_at_iso)] в порядке lessons."""
+    return get_standalone_statuses_for_users([user_id], lessons)[str(user_id)]
+
+
+def get_standalone_status_for_user(user_id: str, lesson_type: str, lesson_ids: list) -> tuple:
+    """
+    Статус по одиночному заданию (без lesson_ref). lesson_ids — список id (objectid, public_id).
+    Возвращает (status, late_by_seconds, completed_at_iso).
+    """
+    return get_standalone_statuses_for_user(user_id, [(lesson_type, lesson_ids)])[0]
 
 
 class LessonRefSerializer(serializers.Serializer):
@@ -295,30 +201,32 @@ class LessonRefSerializer(serializers.Serializer):
     order = serializers.IntegerField()
     hard = serializers.SerializerMethodField()
 
+    def _lesson_entry(self, lesson_ref):
+        """Запись урока: из загрузчика запроса (его готовит TrackSerializer), иначе из реестра."""
+        lesson_type, lesson_id = getattr(lesson_ref, "type", None), getattr(lesson_ref, "id", None)
+        if LESSON_LOADER_KEY in self.context:
+            return self.context[LESSON_LOADER_KEY].load(lesson_type, lesson_id)
+        return lesson_registry.get_lesson(lesson_type, lesson_id)
+
     def to_representation(self, instance):
         """Output display id (public_id) when serializing; instance is LessonRef."""
-        available_from, available_until = _get_lesson_availability(instance)
+        entry = self._lesson_entry(instance)
         return {
-            "id": _get_lesson_display_id(instance),
+            "id": str(entry["public_id"] or entry["id"]) if entry else str(instance.id or ""),
             "type": instance.type,
             "title": instance.title,
             "order": instance.order,
-            "hard": self.get_hard(instance),
-            "available_from": available_from,
-            "available_until": available_until,
+            "hard": bool(instance.type == "task" and entry and entry["hard"]),
+            "available_from": entry["available_from"] if entry else None,
+            "available_until": entry["available_until"] if entry else None,
         }
 
     def get_hard(self, obj):
         """Повышенная сложность (звёздочка) — только для задач."""
         if getattr(obj, "type", None) != "task":
             return False
-        try:
-            from bson import ObjectId
-            from apps.tasks.documents import Task
-            task = Task.objects.get(id=ObjectId(obj.id))
-            return bool(getattr(task, "hard", False))
-        except Exception:
-            return False
+        entry = self._lesson_entry(obj)
+        return bool(entry and entry["hard"])
 
 
 class TrackSerializer(serializers.Serializer):
@@ -346,35 +254,47 @@ class TrackSerializer(serializers.Serializer):
         creator = getattr(obj, "created_by_id", None) or ""
         return creator and str(creator) == str(request.user.id)
 
-    def get_progress(self, obj):
+    def to_representation(self, instance):
+        # Уроки всех треков ответа загружаются пакетно: один запрос на тип урока
+        loader = get_lesson_loader(self.context)
+        if not self.context.get("_lessons_primed"):
+            self.context["_lessons_primed"] = True
+            if isinstance(self.parent, serializers.ListSerializer) and self.parent.instance is not None:
+                loader.prime(ref for track in self.parent.instance for ref in (getattr(track, "lessons", None) or []))
+        loader.prime(getattr(instance, "lessons", None) or [])
+        return super().to_representation(instance)
+
+    def _lesson_statuses(self, obj) -> dict:
+        """
+        {display_id: (status, late_by_seconds)} для уроков трека.
+        Читается из TrackProgress одним запросом на все треки ответа (get_track_progress)
+        и хранится в context, так что get_progress и get_progress_late не повторяют запросы.
+        """
         request = self.context.get("request")
         if not request or not getattr(request, "user", None) or not getattr(request.user, "id", None):
             return {}
-        user_id = str(request.user.id)
-        result = {}
-        for lesson in obj.lessons:
-            if lesson.type not in ("lecture", "task", "puzzle", "question", "survey", "layout"):
-                continue
-            display_id = _get_lesson_display_id(lesson)
-            status_val, _ = get_lesson_status_for_user(user_id, lesson, display_id)
-            result[display_id] = status_val
-        return result
+        statuses = self.context.setdefault("_track_statuses", {})
+        key = str(obj.id)
+        if key not in statuses:
+            tracks = [obj]
+            if isinstance(self.parent, serializers.ListSerializer) and self.parent.instance is not None:
+                tracks = [t for t in self.parent.instance if str(t.id) not in statuses]
+                if all(str(t.id) != key for t in tracks):
+                    tracks.append(obj)
+            for track_key, tp in get_track_progress(str(request.user.id), tracks).items():
+                statuses[track_key] = track_statuses(tp)
+        return statuses.get(key, {})
+
+    def get_progress(self, obj):
+        return {display_id: status_val for display_id, (status_val, _) in self._lesson_statuses(obj).items()}
 
     def get_progress_late(self, obj):
         """Просрочка в секундах для уроков со статусом completed_late."""
-        request = self.context.get("request")
-        if not request or not getattr(request, "user", None) or not getattr(request.user, "id", None):
-            return {}
-        user_id = str(request.user.id)
-        result = {}
-        for lesson in obj.lessons:
-            if lesson.type not in ("lecture", "task", "puzzle", "question", "survey", "layout"):
-                continue
-            display_id = _get_lesson_display_id(lesson)
-            status_val, late_by = get_lesson_status_for_user(user_id, lesson, display_id)
-            if status_val == "completed_late" and late_by:
-                result[display_id] = late_by
-        return result
+        return {
+            display_id: late_by
+            for display_id, (status_val, late_by) in self._lesson_statuses(obj).items()
+            if status_val == "completed_late" and late_by
+        }
 
     def _normalize_lessons(self, lessons_data):
         """Resolve each lesson id (public_id or ObjectId) to MongoDB ObjectId for storage."""
@@ -6,8 +6,11 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 
+from common import lesson_registry
 from common.db_utils import get_doc_by_pk, datetime_to_iso_utc
+from common.http_cache import conditional_get
 from .documents import Track
+from .lesson_index import lesson_index_ids, list_lessons
 from .serializers import TrackSerializer
 from apps.users.permissions import IsTeacher, IsTeacherOrSuperuser
 from apps.users.teacher_utils import validate_visible_group_ids_for_teacher
@@ -42,354 +45,70 @@ def _visible_to_user(doc, user_group_ids, is_anonymous, is_teacher=False):
     return bool(set(vg) & set(user_group_ids))
 
 
-def _get_lesson_ids_from_tracks(tracks_qs):
-    """Собирает все id уроков из треков (ObjectId и public_id), чтобы ни один урок из трека не попал в одиночные."""
-    from bson import ObjectId
-    from apps.lectures.documents import Lecture
-    from apps.tasks.documents import Task
-    from apps.puzzles.documents import Puzzle
-    from apps.questions.documents import Question
-    from apps.surveys.documents import Survey
-    from apps.layouts.documents import LayoutLesson
-
-    ids = set()
-    by_type = {"lecture": [], "task": [], "puzzle": [], "question": [], "survey": [], "layout": []}
-    for track in tracks_qs:
-        for lesson in getattr(track, "lessons", []) or []:
-            lid = getattr(lesson, "id", None)
-            if not lid:
-                continue
-            sid = str(lid)
-            ids.add(sid)
-            t = getattr(lesson, "type", None)
-            if t in by_type:
-                by_type[t].append(sid)
-
-    # Добавляем public_id всех уроков, чтобы исключать и по 12-символьному id (на случай разного формата в ref)
-    for model, key in [(Lecture, "lecture"), (Task, "task"), (Puzzle, "puzzle"), (Question, "question"), (Survey, "survey"), (LayoutLesson, "layout")]:
-        ref_ids = by_type[key]
-        if not ref_ids:
-            continue
-        oids = []
-        for s in ref_ids:
-            if len(s) == 24 and ObjectId.is_valid(s):
-                try:
-                    oids.append(ObjectId(s))
-                except Exception:
-                    pass
-        if oids:
-            for doc in model.objects(id__in=oids).only("public_id"):
-                pid = getattr(doc, "public_id", None)
-                if pid:
-                    ids.add(str(pid))
-    return ids
-
-
-def _dt_utc_for_compare(dt):
-    """Приводит datetime к timezone-aware UTC для сравнения с now_utc."""
-    if dt is None:
-        return None
-    if not hasattr(dt, "tzinfo"):
-        return None
-    if dt.tzinfo is None:
-        return dt.replace(tzinfo=timezone.utc)
-    return dt.astimezone(timezone.utc)
-
-
-def _get_orphan_lessons(tracks_qs, user_group_ids, is_anonymous, is_teacher=False):
+def _orphan_query(user_group_ids, is_anonymous, is_teacher, availability) -> dict:
+    """
+    Фильтр каталога уроков (LessonIndex) для одиночных уроков: не входят ни в один трек,
+    видны пользователю (visible_group_ids) и подходят по сроку (availability).
+    """
+    conditions = [{"in_track": False}, availability]
+    if not is_teacher:
+        visible = [{"visible_group_ids": None}, {"visible_group_ids": []}]
+        if not is_anonymous and user_group_ids:
+            visible.append({"visible_group_ids": {"$in": list(user_group_ids)}})
+        conditions.append({"$or": visible})
+    return {"$and": conditions}
+
+
+def _orphan_item(row) -> dict:
+    """Одиночный урок для ответа: id, название, сроки (и hard для задачи)."""
+    item = {
+        "id": row.get("public_id") or row["lesson_id"],
+        "title": row.get("title") or "",
+        "available_from": datetime_to_iso_utc(row.get("available_from")),
+        "available_until": datetime_to_iso_utc(row.get("available_until")),
+    }
+    if row["lesson_type"] == "task":
+        item["hard"] = bool(row.get("hard", False))
+    return item
+
+
+def _by_type(rows) -> tuple:
+    """Шесть списков уроков в порядке LESSON_TYPES."""
+    return tuple(
+        [_orphan_item(row) for row in rows if row["lesson_type"] == lesson_type]
+        for lesson_type in lesson_registry.LESSON_TYPES
+    )
+
+
+def _get_orphan_lessons(user_group_ids, is_anonymous, is_teacher=False):
     """Лекции, задания, пазлы и вопросы, не входящие ни в один трек. С учётом видимости.
     Истёкшие (available_until < now UTC) не включаются."""
-    from apps.lectures.documents import Lecture
-    from apps.tasks.documents import Task
-    from apps.puzzles.documents import Puzzle
-    from apps.questions.documents import Question
-    from apps.surveys.documents import Survey
-    from apps.layouts.documents import LayoutLesson
-
     now_utc = datetime.now(timezone.utc)
-    all_tracks = Track.objects.all()
-    in_track_ids = _get_lesson_ids_from_tracks(all_tracks)
-    orphan_lectures = []
-    orphan_tasks = []
-    orphan_puzzles = []
-    orphan_questions = []
-    orphan_surveys = []
-    orphan_layouts = []
-
-    for lec in Lecture.objects.all():
-        lid = str(getattr(lec, "public_id", None) or lec.id)
-        oid = str(lec.id)
-        if oid in in_track_ids or lid in in_track_ids:
-            continue
-        if not _visible_to_user(lec, user_group_ids, is_anonymous, is_teacher=is_teacher):
-            continue
-        af = getattr(lec, "available_from", None)
-        au = getattr(lec, "available_until", None)
-        au_utc = _dt_utc_for_compare(au)
-        if au_utc is not None and au_utc < now_utc:
-            continue
-        orphan_lectures.append({
-            "id": lid,
-            "title": lec.title,
-            "available_from": datetime_to_iso_utc(af),
-            "available_until": datetime_to_iso_utc(au),
-        })
-
-    for task in Task.objects.all():
-        lid = str(getattr(task, "public_id", None) or task.id)
-        oid = str(task.id)
-        if oid in in_track_ids or lid in in_track_ids:
-            continue
-        if not _visible_to_user(task, user_group_ids, is_anonymous, is_teacher=is_teacher):
-            continue
-        af = getattr(task, "available_from", None)
-        au = getattr(task, "available_until", None)
-        au_utc = _dt_utc_for_compare(au)
-        if au_utc is not None and au_utc < now_utc:
-            continue
-        orphan_tasks.append({
-            "id": lid,
-            "title": task.title,
-            "hard": bool(getattr(task, "hard", False)),
-            "available_from": datetime_to_iso_utc(af),
-            "available_until": datetime_to_iso_utc(au),
-        })
-
-    for puzzle in Puzzle.objects.all():
-        lid = str(getattr(puzzle, "public_id", None) or puzzle.id)
-        oid = str(puzzle.id)
-        if oid in in_track_ids or lid in in_track_ids:
-            continue
-        if not _visible_to_user(puzzle, user_group_ids, is_anonymous, is_teacher=is_teacher):
-            continue
-        af = getattr(puzzle, "available_from", None)
-        au = getattr(puzzle, "available_until", None)
-        au_utc = _dt_utc_for_compare(au)
-        if au_utc is not None and au_utc < now_utc:
-            continue
-        orphan_puzzles.append({
-            "id": lid,
-            "title": puzzle.title,
-            "available_from": datetime_to_iso_utc(af),
-            "available_until": datetime_to_iso_utc(au),
-        })
-
-    for question in Question.objects.all():
-        lid = str(getattr(question, "public_id", None) or question.id)
-        oid = str(question.id)
-        if oid in in_track_ids or lid in in_track_ids:
-            continue
-        if not _visible_to_user(question, user_group_ids, is_anonymous, is_teacher=is_teacher):
-            continue
-        af = getattr(question, "available_from", None)
-        au = getattr(question, "available_until", None)
-        au_utc = _dt_utc_for_compare(au)
-        if au_utc is not None and au_utc < now_utc:
-            continue
-        orphan_questions.append({
-            "id": lid,
-            "title": question.title,
-            "available_from": datetime_to_iso_utc(af),
-            "available_until": datetime_to_iso_utc(au),
-        })
-
-    for survey in Survey.objects.all():
-        lid = str(getattr(survey, "public_id", None) or survey.id)
-        oid = str(survey.id)
-        if oid in in_track_ids or lid in in_track_ids:
-            continue
-        if not _visible_to_user(survey, user_group_ids, is_anonymous, is_teacher=is_teacher):
-            continue
-        af = getattr(survey, "available_from", None)
-        au = getattr(survey, "available_until", None)
-        au_utc = _dt_utc_for_compare(au)
-        if au_utc is not None and au_utc < now_utc:
-            continue
-        orphan_surveys.append({
-            "id": lid,
-            "title": survey.title,
-            "available_from": datetime_to_iso_utc(af),
-            "available_until": datetime_to_iso_utc(au),
-        })
-
-    for layout in LayoutLesson.objects.all():
-        lid = str(getattr(layout, "public_id", None) or layout.id)
-        oid = str(layout.id)
-        if oid in in_track_ids or lid in in_track_ids:
-            continue
-        if not _visible_to_user(layout, user_group_ids, is_anonymous, is_teacher=is_teacher):
-            continue
-        af = getattr(layout, "available_from", None)
-        au = getattr(layout, "available_until", None)
-        au_utc = _dt_utc_for_compare(au)
-        if au_utc is not None and au_utc < now_utc:
-            continue
-        orphan_layouts.append({
-            "id": lid,
-            "title": layout.title,
-            "available_from": datetime_to_iso_utc(af),
-            "available_until": datetime_to_iso_utc(au),
-        })
+    query = _orphan_query(
+        user_group_ids, is_anonymous, is_teacher,
+        {"$or": [{"available_until": None}, {"available_until": {"$gte": now_utc}}]},
+    )
+    return _by_type(list_lessons(query))
 
-    return orphan_lectures, orphan_tasks, orphan_puzzles, orphan_questions, orphan_surveys, orphan_layouts
 
-
-def _get_overdue_orphan_lessons(tracks_qs, user_group_ids, is_anonymous, user_id=None, is_teacher=False):
+def _get_overdue_orphan_lessons(user_group_ids, is_anonymous, user_id=None, is_teacher=False):
     """Орфаны с истёкшим сроком (available_until < now UTC). Только для авторизованных."""
     if is_anonymous:
         return [], [], [], [], [], []
-    from apps.lectures.documents import Lecture
-    from apps.tasks.documents import Task
-    from apps.puzzles.documents import Puzzle
-    from apps.questions.documents import Question
-    from apps.surveys.documents import Survey
-    from apps.layouts.documents import LayoutLesson
+    from .serializers import get_standalone_statuses_for_user
 
     now_utc = datetime.now(timezone.utc)
-    all_tracks = Track.objects.all()
-    in_track_ids = _get_lesson_ids_from_tracks(all_tracks)
-    overdue_lectures = []
-    overdue_tasks = []
-    overdue_puzzles = []
-    overdue_questions = []
-    overdue_surveys = []
-    overdue_layouts = []
-    from .serializers import get_standalone_status_for_user
-
-    for lec in Lecture.objects.all():
-        lid = str(getattr(lec, "public_id", None) or lec.id)
-        oid = str(lec.id)
-        if oid in in_track_ids or lid in in_track_ids:
-            continue
-        if not _visible_to_user(lec, user_group_ids, is_anonymous, is_teacher=is_teacher):
-            continue
-        au = getattr(lec, "available_until", None)
-        au_utc = _dt_utc_for_compare(au)
-        if au_utc is None or au_utc >= now_utc:
-            continue
-        if user_id:
-            status_val, _, _ = get_standalone_status_for_user(str(user_id), "lecture", [lid, oid] if lid != oid else [lid])
-            if status_val in ("completed", "completed_late"):
-                continue
-        overdue_lectures.append({
-            "id": lid,
-            "title": lec.title,
-            "available_from": datetime_to_iso_utc(getattr(lec, "available_from", None)),
-            "available_until": datetime_to_iso_utc(au),
-        })
-
-    for task in Task.objects.all():
-        lid = str(getattr(task, "public_id", None) or task.id)
-        oid = str(task.id)
-        if oid in in_track_ids or lid in in_track_ids:
-            continue
-        if not _visible_to_user(task, user_group_ids, is_anonymous, is_teacher=is_teacher):
-            continue
-        au = getattr(task, "available_until", None)
-        au_utc = _dt_utc_for_compare(au)
-        if au_utc is None or au_utc >= now_utc:
-            continue
-        if user_id:
-            status_val, _, _ = get_standalone_status_for_user(str(user_id), "task", [lid, oid] if lid != oid else [lid])
-            if status_val in ("completed", "completed_late"):
-                continue
-        overdue_tasks.append({
-            "id": lid,
-            "title": task.title,
-            "hard": bool(getattr(task, "hard", False)),
-            "available_from": datetime_to_iso_utc(getattr(task, "available_from", None)),
-            "available_until": datetime_to_iso_utc(au),
-        })
-
-    for puzzle in Puzzle.objects.all():
-        lid = str(getattr(puzzle, "public_id", None) or puzzle.id)
-        oid = str(puzzle.id)
-        if oid in in_track_ids or lid in in_track_ids:
-            continue
-        if not _visible_to_user(puzzle, user_group_ids, is_anonymous, is_teacher=is_teacher):
-            continue
-        au = getattr(puzzle, "available_until", None)
-        au_utc = _dt_utc_for_compare(au)
-        if au_utc is None or au_utc >= now_utc:
-            continue
-        if user_id:
-            status_val, _, _ = get_standalone_status_for_user(str(user_id), "puzzle", [lid, oid] if lid != oid else [lid])
-            if status_val in ("completed", "completed_late"):
-                continue
-        overdue_puzzles.append({
-            "id": lid,
-            "title": puzzle.title,
-            "available_from": datetime_to_iso_utc(getattr(puzzle, "available_from", None)),
-            "available_until": datetime_to_iso_utc(au),
-        })
-
-    for question in Question.objects.all():
-        lid = str(getattr(question, "public_id", None) or question.id)
-        oid = str(question.id)
-        if oid in in_track_ids or lid in in_track_ids:
-            continue
-        if not _visible_to_user(question, user_group_ids, is_anonymous, is_teacher=is_teacher):
-            continue
-        au = getattr(question, "available_until", None)
-        au_utc = _dt_utc_for_compare(au)
-        if au_utc is None or au_utc >= now_utc:
-            continue
-        if user_id:
-            status_val, _, _ = get_standalone_status_for_user(str(user_id), "question", [lid, oid] if lid != oid else [lid])
-            if status_val in ("completed", "completed_late"):
-                continue
-        overdue_questions.append({
-            "id": lid,
-            "title": question.title,
-            "available_from": datetime_to_iso_utc(getattr(question, "available_from", None)),
-            "available_until": datetime_to_iso_utc(au),
-        })
-
-    for survey in Survey.objects.all():
-        lid = str(getattr(survey, "public_id", None) or survey.id)
-        oid = str(survey.id)
-        if oid in in_track_ids or lid in in_track_ids:
-            continue
-        if not _visible_to_user(survey, user_group_ids, is_anonymous, is_teacher=is_teacher):
-            continue
-        au = getattr(survey, "available_until", None)
-        au_utc = _dt_utc_for_compare(au)
-        if au_utc is None or au_utc >= now_utc:
-            continue
-        if user_id:
-            status_val, _, _ = get_standalone_status_for_user(str(user_id), "survey", [lid, oid] if lid != oid else [lid])
-            if status_val in ("completed", "completed_late"):
-                continue
-        overdue_surveys.append({
-            "id": lid,
-            "title": survey.title,
-            "available_from": datetime_to_iso_utc(getattr(survey, "available_from", None)),
-            "available_until": datetime_to_iso_utc(au),
-        })
-
-    for layout in LayoutLesson.objects.all():
-        lid = str(getattr(layout, "public_id", None) or layout.id)
-        oid = str(layout.id)
-        if oid in in_track_ids or lid in in_track_ids:
-            continue
-        if not _visible_to_user(layout, user_group_ids, is_anonymous, is_teacher=is_teacher):
-            continue
-        au = getattr(layout, "available_until", None)
-        au_utc = _dt_utc_for_compare(au)
-        if au_utc is None or au_utc >= now_utc:
-            continue
-        if user_id:
-            status_val, _, _ = get_standalone_status_for_user(str(user_id), "layout", [lid, oid] if lid != oid else [lid])
-            if status_val in ("completed", "completed_late"):
-                continue
-        overdue_layouts.append({
-            "id": lid,
-            "title": layout.title,
-            "available_from": datetime_to_iso_utc(getattr(layout, "available_from", None)),
-            "available_until": datetime_to_iso_utc(au),
-        })
-
-    return overdue_lectures, overdue_tasks, overdue_puzzles, overdue_questions, overdue_surveys, overdue_layouts
+    rows = list_lessons(_orphan_query(user_group_ids, is_anonymous, is_teacher, {"available_until": {"$lt": now_utc}}))
+    if user_id:
+        # Выполненные пропускаем: статусы всех просроченных уроков пользователя — одним пакетом
+        statuses = get_standalone_statuses_for_user(
+            str(user_id), [(row["lesson_type"], lesson_index_ids(row)) for row in rows]
+        )
+        rows = [
+            row for row, (status_val, _, _) in zip(rows, statuses)
+            if status_val not in ("completed", "completed_late")
+        ]
+    return _by_type(rows)
 
 
 class TrackViewSet(ModelViewSet):
@@ -444,6 +163,9 @@ class TrackViewSet(ModelViewSet):
         return get_doc_by_pk(Track, pk)
 
     def list(self, request, *args, **kwargs):
+        return conditional_get(request, ("tracks", "lessons"), lambda: self._list(request))
+
+    def _list(self, request):
         qs = self.get_queryset()
         ser = self.get_serializer(qs, many=True, context={"request": request})
         user = getattr(request, "user", None)
@@ -451,7 +173,7 @@ class TrackViewSet(ModelViewSet):
         is_teacher = _is_teacher_like(user) if user else False
         user_group_ids = _get_user_group_ids(user)
         orphan_lectures, orphan_tasks, orphan_puzzles, orphan_questions, orphan_surveys, orphan_layouts = _get_orphan_lessons(
-            qs, user_group_ids, is_anonymous, is_teacher=is_teacher
+            user_group_ids, is_anonymous, is_teacher=is_teacher
         )
         data = {
             "tracks": ser.data,
@@ -464,7 +186,7 @@ class TrackViewSet(ModelViewSet):
         }
         if not is_anonymous:
             od_lec, od_task, od_puz, od_q, od_s, od_layout = _get_overdue_orphan_lessons(
-                qs, user_group_ids, is_anonymous, user_id=str(user.id), is_teacher=is_teacher
+                user_group_ids, is_anonymous, user_id=str(user.id), is_teacher=is_teacher
             )
             data["orphan_overdue_lectures"] = od_lec
             data["orphan_overdue_tasks"] = od_task
@@ -484,8 +206,11 @@ class TrackViewSet(ModelViewSet):
         is_teacher = _is_teacher_like(user) if user else False
         if not _visible_to_user(instance, _get_user_group_ids(user), is_anonymous, is_teacher=is_teacher):
             return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
-        ser = self.get_serializer(instance, context={"request": request})
-        return Response(ser.data)
+        return conditional_get(
+            request,
+            ("tracks", "lessons"),
+            lambda: Response(self.get_serializer(instance, context={"request": request}).data),
+        )
 
     def create(self, request, *args, **kwargs):
         visible_group_ids = request.data.get("visible_group_ids") or []
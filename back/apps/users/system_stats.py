@@ -15,6 +15,7 @@ from .documents import User, UserRole
 from apps.groups.documents import Group
 from apps.tracks.documents import Track
 from apps.submissions.documents import Submission, LessonProgress
+from apps.tasks.result_cache import get_result_cache
 
 
 class SystemStatsView(APIView):
@@ -100,6 +101,10 @@ class SystemStatsView(APIView):
                 "updated_at": lp.updated_at.isoformat() if lp.updated_at else None,
             })
 
+        # Кэш результатов проверки решений (счётчики текущего процесса gunicorn)
+        result_cache = get_result_cache()
+        task_result_cache = result_cache.stats() if result_cache is not None else None
+
         app = {
             "users_by_role": users_by_role,
             "total_groups": total_groups,
@@ -108,6 +113,7 @@ class SystemStatsView(APIView):
             "submissions_week": submissions_week,
             "active_users_today": active_users_today,
             "recent_activity": recent_activity,
+            "task_result_cache": task_result_cache,
         }
 
         return Response({
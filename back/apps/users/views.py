@@ -7,6 +7,8 @@ from rest_framework_simplejwt.tokens import AccessToken
 from bson import ObjectId
 
 from apps.groups.documents import Group
+from apps.tracks.progress import build_progress_matrix
+from apps.tracks.membership import in_track_lesson_ids
 from .documents import User, UserRole
 from .serializers import (
     LoginSerializer,
@@ -120,21 +122,21 @@ class ProfileView(APIView):
             })
 
         progress_summary = []
-        from apps.tracks.serializers import _get_lesson_display_id, get_lesson_status_for_user
-        for track in tracks_qs:
+        from apps.tracks.progress import get_track_progress
+        tracks = list(tracks_qs)
+        track_progress = get_track_progress(user_id, tracks)
+        for track in tracks:
             total = sum(1 for l in track.lessons if l.type in ("lecture", "task", "puzzle", "question", "layout"))
             if total == 0:
                 continue
             completed = 0
             started = 0
-            for lesson in track.lessons:
-                if lesson.type not in ("lecture", "task", "puzzle", "question", "layout"):
+            for entry in track_progress[str(track.id)].lessons.values():
+                if entry["type"] not in ("lecture", "task", "puzzle", "question", "layout"):
                     continue
-                display_id = _get_lesson_display_id(lesson)
-                status, _ = get_lesson_status_for_user(user_id, lesson, display_id)
-                if status in ("completed", "completed_late"):
+                if entry["status"] in ("completed", "completed_late"):
                     completed += 1
-                elif status == "started":
+                elif entry["status"] == "started":
                     started += 1
             progress_summary.append({
                 "track_id": str(getattr(track, "public_id", None) or track.id),
@@ -209,7 +211,7 @@ class PlatformCompletedAssignmentsView(APIView):
         from apps.submissions.documents import LessonProgress
 
         user_id = str(request.user.id)
-        in_track_ids = _get_in_track_lesson_ids()
+        in_track_ids = in_track_lesson_ids()
         qs = (
             LessonProgress.objects(
                 user_id=user_id,
@@ -247,13 +249,29 @@ class AchievementsCatalogView(APIView):
         return Response({"items": serialize_achievements(ids)})
 
 
+# Типы уроков, которые учитываются в прогрессе учеников на панелях учителя (без опросов)
+_GROUP_PROGRESS_TYPES = ("lecture", "task", "puzzle", "question", "layout")
+
+
+def _teacher_visible_tracks(teacher_group_ids) -> list:
+    """Треки, видимые группам учителя (или всем), по порядку."""
+    from apps.tracks.documents import Track
+
+    return list(Track.objects.order_by("order").filter(__raw__={
+        "$or": [
+            {"visible_group_ids": {"$exists": False}},
+            {"visible_group_ids": []},
+            {"visible_group_ids": {"$in": teacher_group_ids}},
+        ]
+    }))
+
+
 class TeacherGroupsProgressView(APIView):
     """Прогресс учеников по группам (для учителей). Учитель видит только свои группы; superuser — все."""
     permission_classes = [IsAuthenticated, IsTeacherOrSuperuser]
 
     def get(self, request):
         from apps.groups.documents import Group
-        from apps.tracks.documents import Track
 
         user = request.user
         is_superuser = getattr(user, "role", None) == UserRole.SUPERUSER.value
@@ -273,35 +291,19 @@ class TeacherGroupsProgressView(APIView):
             return Response({"groups": []})
 
         groups_qs = Group.objects.filter(id__in=group_object_ids).order_by("order", "title")
-        students_qs = User.objects(role="student", group_id__in=teacher_group_ids).order_by("first_name", "last_name")
+        students_qs = list(
+            User.objects(role="student", group_id__in=teacher_group_ids).order_by("first_name", "last_name")
+        )
+        tracks = _teacher_visible_tracks(teacher_group_ids)
+        matrix = build_progress_matrix([s.id for s in students_qs], tracks, _GROUP_PROGRESS_TYPES)
 
         def get_student_progress(student_id: str):
-            from apps.tracks.serializers import _get_lesson_display_id, get_lesson_status_for_user
-
-            user_id = str(student_id)
             progress_list = []
-            tracks_qs = Track.objects.order_by("order").filter(__raw__={
-                "$or": [
-                    {"visible_group_ids": {"$exists": False}},
-                    {"visible_group_ids": []},
-                    {"visible_group_ids": {"$in": teacher_group_ids}},
-                ]
-            })
-            for track in tracks_qs:
-                total = sum(1 for l in track.lessons if l.type in ("lecture", "task", "puzzle", "question", "layout"))
+            for track in tracks:
+                counts = matrix.counts(student_id, track.id)
+                total, completed, started = counts["total"], counts["completed"], counts["started"]
                 if total == 0:
                     continue
-                completed = 0
-                started = 0
-                for lesson in track.lessons:
-                    if lesson.type not in ("lecture", "task", "puzzle", "question", "layout"):
-                        continue
-                    display_id = _get_lesson_display_id(lesson)
-                    status, _ = get_lesson_status_for_user(user_id, lesson, display_id)
-                    if status in ("completed", "completed_late"):
-                        completed += 1
-                    elif status == "started":
-                        started += 1
                 progress_list.append({
                     "track_id": str(getattr(track, "public_id", None) or track.id),
                     "track_title": track.title,
@@ -345,8 +347,6 @@ class TeacherAnalyticsView(APIView):
 
     def get(self, request):
         from apps.submissions.documents import LessonProgress
-        from apps.tracks.documents import Track
-        from apps.tracks.serializers import _get_lesson_display_id, get_lesson_status_for_user
         from datetime import timedelta
         from django.utils import timezone
 
@@ -365,30 +365,13 @@ class TeacherAnalyticsView(APIView):
 
         group_object_ids = [ObjectId(g) for g in teacher_group_ids if g and ObjectId.is_valid(g)]
         groups_qs = Group.objects.filter(id__in=group_object_ids).order_by("order", "title")
-        students_qs = User.objects(role="student", group_id__in=teacher_group_ids)
+        students_qs = list(User.objects(role="student", group_id__in=teacher_group_ids))
         student_ids = [str(s.id) for s in students_qs]
+        matrix = build_progress_matrix(student_ids, _teacher_visible_tracks(teacher_group_ids), _GROUP_PROGRESS_TYPES)
 
         def get_student_avg_percent_and_completed_all(sid):
-            from apps.tracks.serializers import _get_lesson_display_id, get_lesson_status_for_user
-            user_id = str(sid)
-            tracks_qs = Track.objects.order_by("order").filter(__raw__={
-                "$or": [
-                    {"visible_group_ids": {"$exists": False}},
-                    {"visible_group_ids": []},
-                    {"visible_group_ids": {"$in": teacher_group_ids}},
-                ]
-            })
-            total_lessons = 0
-            completed = 0
-            for track in tracks_qs:
-                for lesson in track.lessons:
-                    if lesson.type not in ("lecture", "task", "puzzle", "question", "layout"):
-                        continue
-                    total_lessons += 1
-                    display_id = _get_lesson_display_id(lesson)
-                    status, _ = get_lesson_status_for_user(user_id, lesson, display_id)
-                    if status in ("completed", "completed_late"):
-                        completed += 1
+            counts = matrix.counts(sid)
+            total_lessons, completed = counts["total"], counts["completed"]
             if total_lessons == 0:
                 return 0, False
             return (100 * completed // total_lessons), (completed == total_lessons)
@@ -442,7 +425,7 @@ class TeacherAnalyticsView(APIView):
             user_id__in=student_ids,
             status="completed",
             updated_at__gte=start_30,
-        ).only("updated_at"):
+        ).only("updated_at").exclude("id"):
             if lp.updated_at:
                 d = lp.updated_at.date() if hasattr(lp.updated_at, "date") else lp.updated_at
                 if hasattr(d, "isoformat"):
@@ -462,7 +445,7 @@ class TeacherAnalyticsView(APIView):
 
         # Lesson type breakdown: completed counts by type
         breakdown = {"lectures": 0, "tasks": 0, "puzzles": 0, "questions": 0, "surveys": 0, "layouts": 0}
-        for lp in LessonProgress.objects(user_id__in=student_ids, status="completed").only("lesson_type"):
+        for lp in LessonProgress.objects(user_id__in=student_ids, status="completed").only("lesson_type").exclude("id"):
             t = getattr(lp, "lesson_type", None)
             if t == "layout":
                 breakdown["layouts"] = breakdown.get("layouts", 0) + 1
@@ -597,59 +580,14 @@ def _standalone_visible_to_user(doc, group_ids):
     return bool(set(vg) & set(group_ids))
 
 
-def _get_in_track_lesson_ids():
-    """Все id уроков, входящих в какой-либо трек (ObjectId и public_id)."""
-    from apps.tracks.documents import Track
-    from apps.lectures.documents import Lecture
-    from apps.tasks.documents import Task
-    from apps.puzzles.documents import Puzzle
-    from apps.questions.documents import Question
-    from apps.surveys.documents import Survey
-    from apps.layouts.documents import LayoutLesson
-
-    ids = set()
-    by_type = {"lecture": [], "task": [], "puzzle": [], "question": [], "survey": [], "layout": []}
-    for track in Track.objects.all():
-        for lesson in getattr(track, "lessons", []) or []:
-            lid = getattr(lesson, "id", None)
-            if not lid:
-                continue
-            sid = str(lid)
-            ids.add(sid)
-            t = getattr(lesson, "type", None)
-            if t in by_type:
-                by_type[t].append(sid)
-    for model, key in [(Lecture, "lecture"), (Task, "task"), (Puzzle, "puzzle"), (Question, "question"), (Survey, "survey"), (LayoutLesson, "layout")]:
-        ref_ids = by_type[key]
-        if not ref_ids:
-            continue
-        oids = []
-        for s in ref_ids:
-            if len(s) == 24 and ObjectId.is_valid(s):
-                try:
-                    oids.append(ObjectId(s))
-                except Exception:
-                    pass
-        if oids:
-            for doc in model.objects(id__in=oids).only("public_id"):
-                pid = getattr(doc, "public_id", None)
-                if pid:
-                    ids.add(str(pid))
-    return ids
-
-
 class TeacherStandaloneProgressView(APIView):
     """Детализация по одиночным и временным заданиям: кто из учеников выполнил."""
     permission_classes = [IsAuthenticated, IsTeacherOrSuperuser]
 
     def get(self, request):
-        from apps.lectures.documents import Lecture
-        from apps.tasks.documents import Task
-        from apps.puzzles.documents import Puzzle
-        from apps.questions.documents import Question
-        from apps.surveys.documents import Survey, SurveyResponse
-        from apps.layouts.documents import LayoutLesson
-        from apps.tracks.serializers import get_standalone_status_for_user
+        from apps.surveys.documents import SurveyResponse
+        from apps.tracks.lesson_index import lesson_index_ids, list_lessons
+        from apps.tracks.serializers import get_standalone_statuses_for_users
 
         user = request.user
         is_superuser = getattr(user, "role", None) == UserRole.SUPERUSER.value
@@ -661,146 +599,27 @@ class TeacherStandaloneProgressView(APIView):
         group_object_ids = [ObjectId(g) for g in teacher_group_ids if g and ObjectId.is_valid(g)]
         groups_qs = Group.objects.filter(id__in=group_object_ids).order_by("order", "title")
         group_titles = {str(g.id): g.title for g in groups_qs}
-        students_qs = User.objects(role="student", group_id__in=teacher_group_ids).order_by("first_name", "last_name")
-        in_track_ids = _get_in_track_lesson_ids()
-
-        assignments = []
-
-        for lec in Lecture.objects.all():
-            lid = str(getattr(lec, "public_id", None) or lec.id)
-            oid = str(lec.id)
-            if oid in in_track_ids or lid in in_track_ids:
-                continue
-            lesson_ids = [lid, oid] if lid != oid else [lid]
-            students = []
-            for s in students_qs:
-                status, late_by, completed_at = get_standalone_status_for_user(str(s.id), "lecture", lesson_ids)
-                students.append({
-                    "user_id": str(s.id),
-                    "full_name": s.full_name,
-                    "group_id": str(s.group_id) if s.group_id else "",
-                    "group_title": group_titles.get(str(s.group_id), ""),
-                    "status": status,
-                    "late_by_seconds": late_by,
-                    "completed_at": completed_at,
-                })
-            au = getattr(lec, "available_until", None)
-            assignments.append({
-                "id": lid, "title": lec.title, "type": "lecture", "students": students,
-                "available_until": datetime_to_iso_utc(au),
-            })
-
-        for task in Task.objects.all():
-            lid = str(getattr(task, "public_id", None) or task.id)
-            oid = str(task.id)
-            if oid in in_track_ids or lid in in_track_ids:
-                continue
-            lesson_ids = [lid, oid] if lid != oid else [lid]
-            students = []
-            for s in students_qs:
-                status, late_by, completed_at = get_standalone_status_for_user(str(s.id), "task", lesson_ids)
-                students.append({
-                    "user_id": str(s.id),
-                    "full_name": s.full_name,
-                    "group_id": str(s.group_id) if s.group_id else "",
-                    "group_title": group_titles.get(str(s.group_id), ""),
-                    "status": status,
-                    "late_by_seconds": late_by,
-                    "completed_at": completed_at,
-                })
-            au = getattr(task, "available_until", None)
-            assignments.append({
-                "id": lid, "title": task.title, "type": "task", "students": students,
-                "available_until": datetime_to_iso_utc(au),
-            })
-
-        for puzzle in Puzzle.objects.all():
-            lid = str(getattr(puzzle, "public_id", None) or puzzle.id)
-            oid = str(puzzle.id)
-            if oid in in_track_ids or lid in in_track_ids:
-                continue
-            lesson_ids = [lid, oid] if lid != oid else [lid]
-            students = []
-            for s in students_qs:
-                status, late_by, completed_at = get_standalone_status_for_user(str(s.id), "puzzle", lesson_ids)
-                students.append({
-                    "user_id": str(s.id),
-                    "full_name": s.full_name,
-                    "group_id": str(s.group_id) if s.group_id else "",
-                    "group_title": group_titles.get(str(s.group_id), ""),
-                    "status": status,
-                    "late_by_seconds": late_by,
-                    "completed_at": completed_at,
-                })
-            au = getattr(puzzle, "available_until", None)
-            assignments.append({
-                "id": lid, "title": puzzle.title, "type": "puzzle", "students": students,
-                "available_until": datetime_to_iso_utc(au),
-            })
-
-        for question in Question.objects.all():
-            lid = str(getattr(question, "public_id", None) or question.id)
-            oid = str(question.id)
-            if oid in in_track_ids or lid in in_track_ids:
-                continue
-            lesson_ids = [lid, oid] if lid != oid else [lid]
-            students = []
-            for s in students_qs:
-                status, late_by, completed_at = get_standalone_status_for_user(str(s.id), "question", lesson_ids)
-                students.append({
-                    "user_id": str(s.id),
-                    "full_name": s.full_name,
-                    "group_id": str(s.group_id) if s.group_id else "",
-                    "group_title": group_titles.get(str(s.group_id), ""),
-                    "status": status,
-                    "late_by_seconds": late_by,
-                    "completed_at": completed_at,
-                })
-            au = getattr(question, "available_until", None)
-            assignments.append({
-                "id": lid, "title": question.title, "type": "question", "students": students,
-                "available_until": datetime_to_iso_utc(au),
-            })
+        students = list(
+            User.objects(role="student", group_id__in=teacher_group_ids).order_by("first_name", "last_name")
+        )
 
-        for survey in Survey.objects.all():
-            lid = str(getattr(survey, "public_id", None) or survey.id)
-            oid = str(survey.id)
-            if oid in in_track_ids or lid in in_track_ids:
-                continue
-            lesson_ids = [lid, oid] if lid != oid else [lid]
-            responses_by_user = {
-                r.user_id: r.answer
-                for r in SurveyResponse.objects(survey_id=oid)
-            }
-            students = []
-            for s in students_qs:
-                status, late_by, completed_at = get_standalone_status_for_user(str(s.id), "survey", lesson_ids)
-                students.append({
-                    "user_id": str(s.id),
-                    "full_name": s.full_name,
-                    "group_id": str(s.group_id) if s.group_id else "",
-                    "group_title": group_titles.get(str(s.group_id), ""),
-                    "status": status,
-                    "late_by_seconds": late_by,
-                    "completed_at": completed_at,
-                    "response_text": responses_by_user.get(str(s.id)),
-                })
-            au = getattr(survey, "available_until", None)
-            assignments.append({
-                "id": lid, "title": survey.title, "type": "survey", "students": students,
-                "available_until": datetime_to_iso_utc(au),
-            })
+        # Одиночные уроки всех типов — одним запросом к каталогу; статусы — пакетом на всю группу
+        rows = list_lessons({"in_track": False})
+        lessons = [(row["lesson_type"], lesson_index_ids(row)) for row in rows]
+        statuses = get_standalone_statuses_for_users([str(s.id) for s in students], lessons)
+        survey_ids = [row["lesson_id"] for row in rows if row["lesson_type"] == "survey"]
+        responses = {
+            (r.survey_id, r.user_id): r.answer
+            for r in SurveyResponse.objects(survey_id__in=survey_ids).only("survey_id", "user_id", "answer")
+        } if survey_ids else {}
 
-        for layout in LayoutLesson.objects.all():
-            lid = str(getattr(layout, "public_id", None) or layout.id)
-            oid = str(layout.id)
-            if oid in in_track_ids or lid in in_track_ids:
-                continue
-            lesson_ids = [lid, oid] if lid != oid else [lid]
-            students = []
-            for s in students_qs:
-                status, late_by, completed_at = get_standalone_status_for_user(str(s.id), "layout", lesson_ids)
-                students.append({
+        assignments = []
+        for i, row in enumerate(rows):
+            lesson_type = row["lesson_type"]
+            students_out = []
+            for s in students:
+                status, late_by, completed_at = statuses[str(s.id)][i]
+                item = {
                     "user_id": str(s.id),
                     "full_name": s.full_name,
                     "group_id": str(s.group_id) if s.group_id else "",
@@ -808,11 +627,16 @@ class TeacherStandaloneProgressView(APIView):
                     "status": status,
                     "late_by_seconds": late_by,
                     "completed_at": completed_at,
-                })
-            au = getattr(layout, "available_until", None)
+                }
+                if lesson_type == "survey":
+                    item["response_text"] = responses.get((row["lesson_id"], str(s.id)))
+                students_out.append(item)
             assignments.append({
-                "id": lid, "title": layout.title, "type": "layout", "students": students,
-                "available_until": datetime_to_iso_utc(au),
+                "id": row.get("public_id") or row["lesson_id"],
+                "title": row.get("title") or "",
+                "type": lesson_type,
+                "students": students_out,
+                "available_until": datetime_to_iso_utc(row.get("available_until")),
             })
 
         return Response({
@@ -921,43 +745,28 @@ class TeacherMaterialsView(APIView):
     permission_classes = [IsAuthenticated, IsTeacherOrSuperuser]
 
     def get(self, request):
-        from apps.lectures.documents import Lecture
-        from apps.tasks.documents import Task
-        from apps.puzzles.documents import Puzzle
-        from apps.questions.documents import Question
-        from apps.surveys.documents import Survey
-        from apps.layouts.documents import LayoutLesson
+        from apps.tracks.lesson_index import list_lessons
+        from common.lesson_registry import LESSON_TYPES
 
         user = request.user
         is_superuser = getattr(user, "role", None) == "superuser"
         user_id = str(user.id)
 
-        def serialize_doc(doc, doc_type):
-            doc_id = str(getattr(doc, "public_id", None) or doc.id)
-            creator = getattr(doc, "created_by_id", None) or ""
+        def serialize_row(row):
+            creator = row.get("created_by_id") or ""
             can_edit = is_superuser or (creator and str(creator) == user_id)
             return {
-                "id": doc_id,
-                "type": doc_type,
-                "title": doc.title,
+                "id": row.get("public_id") or row["lesson_id"],
+                "type": row["lesson_type"],
+                "title": row.get("title") or "",
                 "created_by_id": creator,
                 "can_edit": can_edit,
-                "copied_from_id": getattr(doc, "copied_from_id", "") or "",
-                "visible_group_ids": getattr(doc, "visible_group_ids", []) or [],
+                "copied_from_id": row.get("copied_from_id") or "",
+                "visible_group_ids": row.get("visible_group_ids") or [],
             }
 
-        lectures = [serialize_doc(lec, "lecture") for lec in Lecture.objects.all()]
-        tasks = [serialize_doc(t, "task") for t in Task.objects.all()]
-        puzzles = [serialize_doc(p, "puzzle") for p in Puzzle.objects.all()]
-        questions = [serialize_doc(q, "question") for q in Question.objects.all()]
-        surveys = [serialize_doc(s, "survey") for s in Survey.objects.all()]
-        layouts = [serialize_doc(l, "layout") for l in LayoutLesson.objects.all()]
-
-        return Response({
-            "lectures": lectures,
-            "tasks": tasks,
-            "puzzles": puzzles,
-            "questions": questions,
-            "surveys": surveys,
-            "layouts": layouts,
-        })
+        # Все материалы — одним запросом к каталогу уроков
+        materials = {f"{t}s": [] for t in LESSON_TYPES}
+        for row in list_lessons():
+            materials[f"{row['lesson_type']}s"].append(serialize_row(row))
+        return Response(materials)
@@ -0,0 +1,182 @@
+"""
+Условные GET для чтения треков и уроков: ETag / Last-Modified по счётчикам версий контента.
+
+Счётчики лежат в Redis (HTTP_CACHE_REDIS_URL) и общие для всех воркеров:
+- "lessons" — сохранение или удаление урока любого типа;
+- "tracks" — сохранение или удаление трека;
+- "progress:<user_id>" — прогресс, отправки, попытки и ответы на опросы пользователя.
+
+ETag ответа — хэш пути, пользователя (id, роль, группы), версий нужных счётчиков и окна
+HTTP_CACHE_WINDOW_SEC (уроки открываются и закрываются по времени без записи в базу).
+Совпал If-None-Match (для анонимных ответов и If-Modified-Since) — ответ 304 без сериализаторов.
+Last-Modified общий для всех пользователей, поэтому авторизованным он не отдаётся и не
+проверяется: их 304 — только по ETag, в который входит пользователь. Анонимные ответы
+помечаются public с max-age HTTP_CACHE_ANON_MAX_AGE, чтобы их мог кэшировать nginx.
+Без Redis (или при его недоступности) ответы отдаются как обычно, без валидаторов.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+_KEY_PREFIX = "kavnt:content-version"
+# После ошибки Redis не обращаться к нему столько секунд
+_REDIS_RETRY_SEC = 30.0
+
+
+class ContentVersions:
+    """Счётчики версий в Redis: hash на область с полями v (версия) и t (время изменения, unix)."""
+
+    def __init__(self):
+        self._redis = None
+        self._redis_url = None
+        self._redis_down_until = 0.0
+
+    def _client(self):
+        url = getattr(settings, "HTTP_CACHE_REDIS_URL", "")
+        if not url or time.monotonic() < self._redis_down_until:
+            return None
+        if self._redis is None or self._redis_url != url:
+            import redis
+
+            self._redis = redis.Redis.from_url(url, socket_connect_timeout=0.2, socket_timeout=0.5)
+            self._redis_url = url
+        return self._redis
+
+    def _redis_call(self, fn):
+        """Результат fn(client) или None, если Redis не настроен или недоступен."""
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            return fn(client)
+        except Exception:
+            self._redis_down_until = time.monotonic() + _REDIS_RETRY_SEC
+            return None
+
+    def bump(self, *scopes) -> None:
+        now = int(time.time())
+
+        def run(client):
+            pipe = client.pipeline(transaction=False)
+            for scope in scopes:
+                pipe.hincrby(f"{_KEY_PREFIX}:{scope}", "v", 1)
+                pipe.hset(f"{_KEY_PREFIX}:{scope}", "t", now)
+            return pipe.execute()
+
+        self._redis_call(run)
+
+    def read(self, scopes) -> list | None:
+        """[(версия, время изменения)] по областям или None без Redis."""
+        def run(client):
+            pipe = client.pipeline(transaction=False)
+            for scope in scopes:
+                pipe.hmget(f"{_KEY_PREFIX}:{scope}", "v", "t")
+            return pipe.execute()
+
+        rows = self._redis_call(run)
+        if rows is None:
+            return None
+        return [(int(v or 0), int(t or 0)) for v, t in rows]
+
+
+_versions = ContentVersions()
+
+
+def bump(*scopes) -> None:
+    """Увеличивает версии областей (например "lessons", f"progress:{user_id}")."""
+    _versions.bump(*scopes)
+
+
+def progress_scope(user_id) -> str:
+    return f"progress:{user_id}"
+
+
+def _user_key(user) -> tuple:
+    if not user or not getattr(user, "id", None):
+        return ("anon",)
+    groups = {str(g) for g in getattr(user, "group_ids", None) or []}
+    if getattr(user, "group_id", None):
+        groups.add(str(user.group_id))
+    return (str(user.id), getattr(user, "role", "") or "", ",".join(sorted(groups)))
+
+
+def validators(request, scopes) -> tuple | None:
+    """
+    (etag, last_modified) для запроса по областям контента; None — без условных ответов.
+    last_modified — только для анонимного запроса (у авторизованного None).
+    """
+    user = getattr(request, "user", None)
+    is_anonymous = not user or not getattr(user, "id", None)
+    scopes = list(scopes) + ([] if is_anonymous else [progress_scope(user.id)])
+    versions = _versions.read(scopes)
+    if versions is None:
+        return None
+    window_sec = max(1, getattr(settings, "HTTP_CACHE_WINDOW_SEC", 60))
+    window = int(time.time()) // window_sec
+    parts = [request.get_full_path(), *_user_key(user), str(window)]
+    parts += [f"{scope}={version}" for scope, (version, _) in zip(scopes, versions)]
+    etag = quote_etag(hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest())
+    if not is_anonymous:
+        return etag, None
+    last_modified = max([window * window_sec] + [t for _, t in versions])
+    return etag, last_modified
+
+
+def conditional_get(request, scopes, build):
+    """
+    Ответ build() с ETag / Last-Modified / Cache-Control по областям scopes
+    (для авторизованного пользователя добавляется его прогресс).
+    Если клиент уже получил эту версию — 304 без вызова build().
+    """
+    found = validators(request, scopes)
+    if found is None:
+        return build()
+    etag, last_modified = found
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = build()
+        if response.status_code != 200:
+            return response
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    user = getattr(request, "user", None)
+    if user and getattr(user, "id", None):
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, public=True, max_age=getattr(settings, "HTTP_CACHE_ANON_MAX_AGE", 30))
+    patch_vary_headers(response, ["Authorization"])
+    return response
+
+
+def connect_signals() -> None:
+    """Увеличивать версии при записи уроков, треков и данных прогресса (нужен blinker)."""
+    from mongoengine import signals
+
+    from apps.submissions.documents import AssignmentAttempt, Submission
+    from apps.surveys.documents import SurveyResponse
+    from apps.tracks.documents import Track
+    from common.lesson_registry import LESSON_TYPES, lesson_model
+
+    if not signals.signals_available:
+        return
+
+    def lessons_changed(sender, **kwargs):
+        bump("lessons")
+
+    def tracks_changed(sender, **kwargs):
+        bump("tracks")
+
+    def progress_changed(sender, document=None, **kwargs):
+        bump(progress_scope(document.user_id))
+
+    for lesson_type in LESSON_TYPES:
+        signals.post_save.connect(lessons_changed, sender=lesson_model(lesson_type), weak=False)
+        signals.post_delete.connect(lessons_changed, sender=lesson_model(lesson_type), weak=False)
+    signals.post_save.connect(tracks_changed, sender=Track, weak=False)
+    signals.post_delete.connect(tracks_changed, sender=Track, weak=False)
+    for model in (Submission, AssignmentAttempt, SurveyResponse):
+        signals.post_save.connect(progress_changed, sender=model, weak=False)
@@ -0,0 +1,214 @@
+"""
+Реестр уроков: для каждого типа — соответствие ObjectId ↔ public_id, название,
+окно доступности и флаг hard.
+
+Прогресс хранится то под public_id, то под ObjectId, поэтому хелперам постоянно
+нужен «второй» id урока. Вместо загрузки документа они читают снимок реестра.
+
+Снимок типа живёт в памяти процесса и в Redis (LESSON_REGISTRY_REDIS_URL):
+- сохранение или удаление урока (сигналы mongoengine) сбрасывает снимок процесса
+  и увеличивает версию типа в Redis;
+- процессы сверяют версию не чаще раза в LESSON_REGISTRY_CHECK_SEC и при
+  расхождении берут снимок из Redis, а если его там нет — строят из Mongo.
+Без Redis снимок процесса перестраивается раз в LESSON_REGISTRY_CHECK_SEC.
+"""
+import json
+import threading
+import time
+from importlib import import_module
+
+from django.conf import settings
+
+from common.db_utils import datetime_to_iso_utc
+
+LESSON_TYPES = ("lecture", "task", "puzzle", "question", "survey", "layout")
+
+_LESSON_MODELS = {
+    "lecture": ("apps.lectures.documents", "Lecture"),
+    "task": ("apps.tasks.documents", "Task"),
+    "puzzle": ("apps.puzzles.documents", "Puzzle"),
+    "question": ("apps.questions.documents", "Question"),
+    "survey": ("apps.surveys.documents", "Survey"),
+    "layout": ("apps.layouts.documents", "LayoutLesson"),
+}
+
+_KEY_PREFIX = "kavnt:lesson-registry"
+# После ошибки Redis не обращаться к нему столько секунд (работаем только с памятью процесса)
+_REDIS_RETRY_SEC = 30.0
+
+
+def lesson_model(lesson_type: str):
+    """Класс документа для типа урока или None."""
+    mod_name, cls_name = _LESSON_MODELS.get(lesson_type, (None, None))
+    if not mod_name:
+        return None
+    return getattr(import_module(mod_name), cls_name)
+
+
+def entry_fields(lesson_type: str) -> list:
+    """Поля документа урока, из которых строится запись реестра (проекция запроса)."""
+    fields = ["public_id", "title", "available_from", "available_until"]
+    if lesson_type == "task":
+        fields.append("hard")
+    return fields
+
+
+def make_entry(raw: dict) -> dict:
+    """Запись реестра из сырого документа урока (as_pymongo)."""
+    return {
+        "id": str(raw["_id"]),
+        "public_id": raw.get("public_id") or None,
+        "title": raw.get("title") or "",
+        "available_from": datetime_to_iso_utc(raw.get("available_from")),
+        "available_until": datetime_to_iso_utc(raw.get("available_until")),
+        "hard": bool(raw.get("hard", False)),
+    }
+
+
+def _build_snapshot(lesson_type: str) -> dict:
+    """{"by_oid": {oid: entry}, "by_public": {public_id: oid}} одним запросом к коллекции типа."""
+    by_oid, by_public = {}, {}
+    for raw in lesson_model(lesson_type).objects.only(*entry_fields(lesson_type)).as_pymongo():
+        entry = make_entry(raw)
+        by_oid[entry["id"]] = entry
+        if entry["public_id"]:
+            by_public[str(entry["public_id"])] = entry["id"]
+    return {"by_oid": by_oid, "by_public": by_public}
+
+
+class LessonRegistry:
+    """
+    Снимки реестра по типам: память процесса + Redis с версией на тип.
+
+    build(key) строит JSON-совместимый снимок ключа (по умолчанию — снимок типа урока),
+    load(snapshot) приводит его к виду, в котором он хранится в памяти процесса.
+    """
+
+    def __init__(self, build=None, load=None):
+        self._build = build
+        self._load = load or (lambda snapshot: snapshot)
+        self._local = {}  # key -> [version, checked_at, snapshot]
+        self._lock = threading.Lock()
+        self._redis = None
+        self._redis_url = None
+        self._redis_down_until = 0.0
+
+    def _client(self):
+        url = getattr(settings, "LESSON_REGISTRY_REDIS_URL", "")
+        if not url or time.monotonic() < self._redis_down_until:
+            return None
+        if self._redis is None or self._redis_url != url:
+            import redis
+
+            self._redis = redis.Redis.from_url(url, socket_connect_timeout=0.2, socket_timeout=0.5)
+            self._redis_url = url
+        return self._redis
+
+    def _redis_call(self, fn):
+        """Результат fn(client) или None, если Redis не настроен или недоступен."""
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            return fn(client)
+        except Exception:
+            self._redis_down_until = time.monotonic() + _REDIS_RETRY_SEC
+            return None
+
+    def snapshot(self, key: str):
+        local = self._local.get(key)
+        check_sec = getattr(settings, "LESSON_REGISTRY_CHECK_SEC", 1.0)
+        if local is not None and time.monotonic() - local[1] < check_sec:
+            return local[2]
+        build = self._build or _build_snapshot
+        with self._lock:
+            local = self._local.get(key)
+            if local is not None and time.monotonic() - local[1] < check_sec:
+                return local[2]
+            version_key = f"{_KEY_PREFIX}:{key}:version"
+            data_key = f"{_KEY_PREFIX}:{key}:data"
+            raw_version = self._redis_call(lambda r: r.get(version_key) or b"0")
+            if raw_version is None:
+                # Без Redis версий нет — снимок процесса просто устаревает по времени
+                self._local[key] = [None, time.monotonic(), self._load(build(key))]
+                return self._local[key][2]
+            version = int(raw_version)
+            if local is not None and local[0] == version:
+                local[1] = time.monotonic()
+                return local[2]
+            snapshot = None
+            raw = self._redis_call(lambda r: r.get(data_key))
+            if raw:
+                payload = json.loads(raw)
+                if payload.get("version") == version:
+                    snapshot = payload["snapshot"]
+            if snapshot is None:
+                snapshot = build(key)
+                payload = json.dumps({"version": version, "snapshot": snapshot})
+                self._redis_call(lambda r: r.set(data_key, payload))
+            self._local[key] = [version, time.monotonic(), self._load(snapshot)]
+            return self._local[key][2]
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._local.pop(key, None)
+        self._redis_call(lambda r: r.incr(f"{_KEY_PREFIX}:{key}:version"))
+
+
+_registry = LessonRegistry()
+
+
+def get_lesson(lesson_type: str, lesson_id) -> dict | None:
+    """Запись реестра {id, public_id, title, available_from, available_until, hard} по ObjectId или public_id."""
+    if lesson_type not in _LESSON_MODELS or not lesson_id:
+        return None
+    snap = _registry.snapshot(lesson_type)
+    sid = str(lesson_id)
+    oid = sid if sid in snap["by_oid"] else snap["by_public"].get(sid)
+    return snap["by_oid"].get(oid) if oid else None
+
+
+def get_lessons(lesson_type: str) -> list:
+    """Все записи реестра для типа урока."""
+    if lesson_type not in _LESSON_MODELS:
+        return []
+    return list(_registry.snapshot(lesson_type)["by_oid"].values())
+
+
+def display_id(lesson_type: str, lesson_id) -> str:
+    """id урока для API (public_id или ObjectId); для неизвестного урока — lesson_id как есть."""
+    entry = get_lesson(lesson_type, lesson_id)
+    if entry is None:
+        return str(lesson_id or "")
+    return str(entry["public_id"] or entry["id"])
+
+
+def lesson_ids(lesson_type: str, lesson_id) -> list:
+    """Все id урока (display id первым, затем ObjectId), под которыми мог сохраниться прогресс."""
+    entry = get_lesson(lesson_type, lesson_id)
+    ids = [str(lesson_id)] if lesson_id else []
+    if entry is not None:
+        ids = [entry["public_id"], entry["id"], *ids]
+    return [i for i in dict.fromkeys(ids) if i]
+
+
+def invalidate(lesson_type: str | None = None) -> None:
+    """Сбрасывает снимок типа (или всех типов) во всех процессах."""
+    for t in [lesson_type] if lesson_type else LESSON_TYPES:
+        _registry.invalidate(t)
+
+
+def connect_signals() -> None:
+    """Сбрасывать реестр при сохранении и удалении уроков (нужен blinker)."""
+    from mongoengine import signals
+
+    if not signals.signals_available:
+        return
+    for lesson_type in LESSON_TYPES:
+        model = lesson_model(lesson_type)
+
+        def handler(sender, document=None, _lesson_type=lesson_type, **kwargs):
+            invalidate(_lesson_type)
+
+        signals.post_save.connect(handler, sender=model, weak=False)
+        signals.post_delete.connect(handler, sender=model, weak=False)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 
@@ -17,6 +18,20 @@ env = environ.Env(
     MONGODB_NAME=(str, "kavnt"),
     MONGODB_HOST=(str, "mongodb://127.0.0.1:27017"),
     REDIS_URL=(str, "redis://127.0.0.1:6379/0"),
+    TASK_RUNNER_POOL_SIZE=(int, 2),
+    TASK_RUNNER_PARALLELISM=(int, 4),
+    TASK_RUNNER_HOST_CONCURRENCY=(int, os.cpu_count() or 1),
+    TASK_RUNNER_SLOT_TIMEOUT_SEC=(float, 30.0),
+    TASK_SUBMIT_ASYNC=(bool, False),
+    TASK_SUBMIT_JOB_TIMEOUT_SEC=(int, 600),
+    TASK_RESULT_CACHE_SIZE=(int, 1024),
+    TASK_RUNNER_CPU_LIMIT_SEC=(float, 5.0),
+    TASK_RUNNER_MEMORY_LIMIT_MB=(int, 256),
+    TASK_RUNNER_OUTPUT_LIMIT_KB=(int, 1024),
+    TASK_RUNNER_BUILD_CACHE_SIZE=(int, 512),
+    LESSON_REGISTRY_CHECK_SEC=(float, 1.0),
+    HTTP_CACHE_WINDOW_SEC=(int, 60),
+    HTTP_CACHE_ANON_MAX_AGE=(int, 30),
 )
 
 _env_path = os.path.join(BASE_DIR, ".env")
@@ -147,3 +162,37 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
+
+# Запуск кода задач: число заранее запущенных воркеров песочницы на процесс (0 — без пула)
+TASK_RUNNER_POOL_SIZE = env("TASK_RUNNER_POOL_SIZE")
+# Сколько тест-кейсов одного запроса выполняются одновременно
+TASK_RUNNER_PARALLELISM = env("TASK_RUNNER_PARALLELISM")
+# Общий лимит одновременных запусков на хосте (все процессы gunicorn; 0 — без лимита)
+TASK_RUNNER_HOST_CONCURRENCY = env("TASK_RUNNER_HOST_CONCURRENCY")
+TASK_RUNNER_SLOTS_DIR = os.path.join(tempfile.gettempdir(), "kavnt-runner-slots")
+# Сколько секунд запуск ждёт свободный слот хоста, потом отвечает «сервер перегружен» (0 — без ограничения)
+TASK_RUNNER_SLOT_TIMEOUT_SEC = env("TASK_RUNNER_SLOT_TIMEOUT_SEC")
+# Проверять отправленные решения в Celery (submit отвечает 202 с job_id) вместо воркера gunicorn
+TASK_SUBMIT_ASYNC = env("TASK_SUBMIT_ASYNC")
+# Через сколько секунд отправка, застрявшая в queued / running, считается потерянной и не занимает попытку
+TASK_SUBMIT_JOB_TIMEOUT_SEC = env("TASK_SUBMIT_JOB_TIMEOUT_SEC")
+# Сколько результатов проверки (код + набор тестов) хранить в LRU-кэше процесса (0 — без кэша)
+TASK_RESULT_CACHE_SIZE = env("TASK_RESULT_CACHE_SIZE")
+# Лимиты на один запуск решения (0 — без лимита): процессорное время, адресное пространство, объём stdout/stderr
+TASK_RUNNER_CPU_LIMIT_SEC = env("TASK_RUNNER_CPU_LIMIT_SEC")
+TASK_RUNNER_MEMORY_LIMIT_MB = env("TASK_RUNNER_MEMORY_LIMIT_MB")
+TASK_RUNNER_OUTPUT_LIMIT_KB = env("TASK_RUNNER_OUTPUT_LIMIT_KB")
+# Кэш скомпилированных решений (C++): сколько бинарников хранить на диске (0 — без вытеснения)
+TASK_RUNNER_BUILD_CACHE_SIZE = env("TASK_RUNNER_BUILD_CACHE_SIZE")
+TASK_RUNNER_BUILD_CACHE_DIR = os.path.join(tempfile.gettempdir(), "kavnt-build-cache")
+
+# Реестр уроков (common/lesson_registry.py): общий снимок в Redis ("" — только память процесса)
+# и как часто процесс сверяет версию снимка
+LESSON_REGISTRY_REDIS_URL = env("LESSON_REGISTRY_REDIS_URL", default=env("REDIS_URL"))
+LESSON_REGISTRY_CHECK_SEC = env("LESSON_REGISTRY_CHECK_SEC")
+
+# Условные GET треков и уроков (common/http_cache.py): счётчики версий в Redis ("" — без ETag),
+# окно времени в ETag (сроки доступности уроков) и max-age ответов анонимам для nginx
+HTTP_CACHE_REDIS_URL = env("HTTP_CACHE_REDIS_URL", default=env("REDIS_URL"))
+HTTP_CACHE_WINDOW_SEC = env("HTTP_CACHE_WINDOW_SEC")
+HTTP_CACHE_ANON_MAX_AGE = env("HTTP_CACHE_ANON_MAX_AGE")
@@ -6,3 +6,13 @@ MONGODB_NAME = "test_kavnt"
 REST_FRAMEWORK["DEFAULT_PERMISSION_CLASSES"] = [
     "rest_framework.permissions.AllowAny",
 ]
+
+# Задачи Celery выполняются синхронно, без брокера
+CELERY_TASK_ALWAYS_EAGER = True
+
+# Реестр уроков без Redis и без задержки: тесты сразу видят изменения уроков
+LESSON_REGISTRY_REDIS_URL = ""
+LESSON_REGISTRY_CHECK_SEC = 0
+
+# Без счётчиков версий: ответы без ETag, тесты всегда получают полное тело
+HTTP_CACHE_REDIS_URL = ""
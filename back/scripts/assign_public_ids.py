@@ -28,5 +28,6 @@ def main():
     client.close()
     print(f"Done. Updated: {updated}")
 
+
 if __name__ == '__main__':
     main()
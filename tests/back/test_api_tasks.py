@@ -121,6 +121,28 @@ def test_tasks_submit_max_attempts_403(auth_client, test_task, test_user):
     assert "попыток" in r2.json().get("detail", "")
 
 
+@pytest.mark.django_db
+def test_tasks_submit_stale_job_does_not_use_attempt(auth_client, test_task, test_user, settings):
+    """A job stuck in queued/running past TASK_SUBMIT_JOB_TIMEOUT_SEC is failed and frees the attempt."""
+    from datetime import datetime, timedelta
+    from apps.submissions.documents import SubmissionJob
+    from apps.tasks.documents import Task
+    task = Task.objects.get(id=test_task.id)
+    task.max_attempts = 1
+    task.save()
+    settings.TASK_SUBMIT_JOB_TIMEOUT_SEC = 60
+    job = SubmissionJob(
+        task_id=str(task.id), user_id=str(test_user.id), status="running",
+        created_at=datetime.utcnow() - timedelta(seconds=120),
+    )
+    job.save()
+    code = "a = int(input())\nb = int(input())\nprint(a + b)"
+    response = auth_client.post(f"/api/tasks/{task.id}/submit/", {"code": code}, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    job.reload()
+    assert job.status == "failed"
+
+
 @pytest.mark.django_db
 def test_tasks_draft_get_unauth_returns_none(api_client, test_task):
     r = api_client.get(f"/api/tasks/{test_task.id}/draft/")
@@ -193,3 +215,76 @@ def test_teacher_can_patch_foreign_task_only_visible_groups(teacher_client, test
     r_allowed = teacher_client.patch(f"/api/tasks/{tid}/", {"visible_group_ids": [str(g1.id)]}, format="json")
     assert r_allowed.status_code == status.HTTP_200_OK
     assert r_allowed.json()["visible_group_ids"] == [str(g1.id)]
+
+
+@pytest.mark.django_db
+def test_tasks_submit_async_returns_job(auth_client, test_task, test_user, settings):
+    """With TASK_SUBMIT_ASYNC submit returns 202 + job_id; the job endpoint returns the result."""
+    settings.TASK_SUBMIT_ASYNC = True
+    code = "a = int(input())\nb = int(input())\nprint(a + b)"
+    response = auth_client.post(f"/api/tasks/{test_task.id}/submit/", {"code": code}, format="json")
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job_id = response.json()["job_id"]
+
+    poll = auth_client.get(f"/api/tasks/{test_task.id}/jobs/{job_id}/")
+    assert poll.status_code == status.HTTP_200_OK
+    data = poll.json()
+    assert data["status"] == "done"
+    assert data["passed"] is True
+    assert data["results"][0]["passed"] is True
+    assert Submission.objects(user_id=str(test_user.id), task_id=str(test_task.id)).count() == 1
+
+
+@pytest.mark.django_db
+def test_tasks_run_public_mode_skips_hidden_cases(auth_client, test_task):
+    from apps.tasks.documents import TaskCaseEmbed
+    test_task.test_cases.append(TaskCaseEmbed(id="hidden", input="1\n1", expected_output="2\n", is_public=False))
+    test_task.save()
+    code = "a = int(input())\nb = int(input())\nprint(a + b)"
+    response = auth_client.post(
+        f"/api/tasks/{test_task.id}/run/",
+        {"code": code, "mode": "public"},
+        format="json",
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert [r["caseId"] for r in response.json()["results"]] == ["c1"]
+
+
+@pytest.mark.django_db
+def test_tasks_submit_stream_jsonl(auth_client, test_task, test_user):
+    """?stream=jsonl: one line per case, then the submit payload; submission is saved."""
+    import json
+    code = "a = int(input())\nb = int(input())\nprint(a + b)"
+    response = auth_client.post(
+        f"/api/tasks/{test_task.id}/submit/?stream=jsonl",
+        {"code": code},
+        format="json",
+    )
+    assert response.status_code == status.HTTP_200_OK
+    lines = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+    assert [line["type"] for line in lines] == ["case", "done"]
+    assert lines[0]["caseId"] == "c1" and lines[0]["passed"] is True
+    assert lines[-1]["passed"] is True
+    assert Submission.objects(user_id=str(test_user.id), task_id=str(test_task.id)).count() == 1
+
+
+@pytest.mark.django_db
+def test_tasks_submit_stream_disconnect_uses_attempt(auth_client, test_task, test_user):
+    """A client that drops the stream after the first verdict still spends the attempt."""
+    from apps.submissions.documents import SubmissionJob
+    from apps.tasks.documents import Task, TaskCaseEmbed
+    task = Task.objects.get(id=test_task.id)
+    task.max_attempts = 1
+    task.test_cases.append(TaskCaseEmbed(id="c2", input="2\n3", expected_output="5\n"))
+    task.save()
+    code = "a = int(input())\nb = int(input())\nprint(a + b)"
+    response = auth_client.post(f"/api/tasks/{task.id}/submit/?stream=jsonl", {"code": code}, format="json")
+    next(iter(response.streaming_content))
+    response.close()
+
+    submission = Submission.objects.get(user_id=str(test_user.id), task_id=str(task.id))
+    assert submission.passed is False
+    assert any(r.get("skipped") for r in submission.results)
+    assert SubmissionJob.objects.get(user_id=str(test_user.id), task_id=str(task.id)).status == "done"
+    r2 = auth_client.post(f"/api/tasks/{task.id}/submit/", {"code": code}, format="json")
+    assert r2.status_code == status.HTTP_403_FORBIDDEN
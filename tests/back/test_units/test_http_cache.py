@@ -0,0 +1,93 @@
+"""Unit tests: common.http_cache (ETag / 304 для чтения треков и уроков)."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+from django.test import RequestFactory
+from rest_framework.response import Response
+
+
+class _FakeVersions:
+    def __init__(self):
+        self.versions = {}
+
+    def read(self, scopes):
+        return [(self.versions.get(scope, 0), 1_700_000_000) for scope in scopes]
+
+    def bump(self, *scopes):
+        for scope in scopes:
+            self.versions[scope] = self.versions.get(scope, 0) + 1
+
+
+@pytest.fixture
+def http_cache(monkeypatch):
+    from common import http_cache
+
+    versions = _FakeVersions()
+    monkeypatch.setattr(http_cache, "_versions", versions)
+    return http_cache
+
+
+def _get(headers=None, user=None):
+    request = RequestFactory().get("/api/tracks/", **(headers or {}))
+    request.user = user
+    return request
+
+
+def test_not_modified_skips_build(http_cache):
+    builds = []
+
+    def build():
+        builds.append(1)
+        return Response({"tracks": []})
+
+    first = http_cache.conditional_get(_get(), ("tracks",), build)
+    assert first.status_code == 200 and first["ETag"]
+    assert "public" in first["Cache-Control"]
+
+    second = http_cache.conditional_get(_get({"HTTP_IF_NONE_MATCH": first["ETag"]}), ("tracks",), build)
+    assert second.status_code == 304 and second["ETag"] == first["ETag"]
+    assert builds == [1]
+
+    http_cache.bump("tracks")
+    third = http_cache.conditional_get(_get({"HTTP_IF_NONE_MATCH": first["ETag"]}), ("tracks",), build)
+    assert third.status_code == 200 and third["ETag"] != first["ETag"]
+    assert builds == [1, 1]
+
+
+def test_user_progress_changes_etag_and_response_is_private(http_cache):
+    user = SimpleNamespace(id="u1", role="student", group_id="g1", group_ids=[])
+    build = lambda: Response({})  # noqa: E731
+
+    first = http_cache.conditional_get(_get(user=user), ("lessons",), build)
+    assert "private" in first["Cache-Control"] and "no-cache" in first["Cache-Control"]
+
+    other = SimpleNamespace(id="u2", role="student", group_id="g1", group_ids=[])
+    assert http_cache.conditional_get(_get(user=other), ("lessons",), build)["ETag"] != first["ETag"]
+
+    http_cache.bump(http_cache.progress_scope("u1"))
+    assert http_cache.conditional_get(_get(user=user), ("lessons",), build)["ETag"] != first["ETag"]
+
+
+def test_authenticated_response_ignores_if_modified_since(http_cache):
+    user = SimpleNamespace(id="u1", role="student", group_id="g1", group_ids=[])
+    build = lambda: Response({})  # noqa: E731
+
+    anon = http_cache.conditional_get(_get(), ("lessons",), build)
+    assert anon.has_header("Last-Modified")
+
+    first = http_cache.conditional_get(_get(user=user), ("lessons",), build)
+    assert not first.has_header("Last-Modified")
+    since = {"HTTP_IF_MODIFIED_SINCE": anon["Last-Modified"]}
+    other = SimpleNamespace(id="u2", role="student", group_id="g1", group_ids=[])
+    assert http_cache.conditional_get(_get(since, user=other), ("lessons",), build).status_code == 200
+
+
+def test_without_redis_responses_have_no_validators(settings):
+    from common import http_cache
+
+    settings.HTTP_CACHE_REDIS_URL = ""
+    response = http_cache.conditional_get(_get(), ("tracks",), lambda: Response({}))
+    assert response.status_code == 200 and not response.has_header("ETag")
@@ -0,0 +1,89 @@
+"""
+Unit tests: индексы горячих запросов Submission / LessonProgress.
+По explain() проверяется, что запрос идёт по нужному индексу, а покрытые запросы не читают документы.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+
+
+def _stages(plan: dict):
+    """Все стадии плана (winningPlan вместе с вложенными inputStage / inputStages)."""
+    yield plan
+    for child in [plan.get("inputStage"), *plan.get("inputStages", [])]:
+        if child:
+            yield from _stages(child)
+
+
+def _winning_plan(explain: dict) -> dict:
+    planner = explain.get("queryPlanner") or explain["stages"][0]["$cursor"]["queryPlanner"]
+    plan = planner["winningPlan"]
+    # Mongo 7+: план классического движка может быть вложен в queryPlan
+    return plan.get("queryPlan", plan)
+
+
+def _index_names(plan: dict) -> set:
+    return {s.get("indexName") for s in _stages(plan) if s.get("stage") in ("IXSCAN", "COUNT_SCAN")}
+
+
+def _is_covered(plan: dict) -> bool:
+    return not any(s.get("stage") == "FETCH" for s in _stages(plan))
+
+
+@pytest.fixture
+def submissions():
+    from apps.submissions.documents import LessonProgress, Submission
+
+    Submission.ensure_indexes()
+    LessonProgress.ensure_indexes()
+    now = datetime.utcnow()
+    docs = [
+        Submission(user_id="idx-user", task_id=f"t{i % 3}", code="print(1)", passed=bool(i % 2),
+                   created_at=now - timedelta(minutes=i))
+        for i in range(12)
+    ]
+    for i, lesson_type in enumerate(["lecture", "task", "puzzle"]):
+        docs.append(LessonProgress(user_id="idx-user", lesson_id=f"l{i}", lesson_type=lesson_type,
+                                   status="completed", updated_at=now - timedelta(days=i)))
+    for doc in docs:
+        doc.save()
+    yield
+    Submission.objects(user_id="idx-user").delete()
+    LessonProgress.objects(user_id="idx-user").delete()
+
+
+@pytest.mark.django_db
+def test_latest_submission_is_covered(submissions):
+    from apps.submissions.documents import Submission
+
+    qs = Submission.objects(user_id="idx-user", task_id="t1").only("passed").exclude("id").order_by("-created_at")
+    plan = _winning_plan(qs.limit(1).explain())
+    assert "user_task_latest" in _index_names(plan)
+    assert _is_covered(plan)
+
+
+@pytest.mark.django_db
+def test_attempts_count_uses_compound_index(submissions):
+    from apps.submissions.documents import Submission
+
+    qs = Submission.objects(user_id="idx-user", task_id="t1")
+    assert qs.count() == 4
+    assert "user_task_latest" in _index_names(_winning_plan(qs.explain()))
+
+
+@pytest.mark.django_db
+def test_completed_analytics_is_covered(submissions):
+    from apps.submissions.documents import LessonProgress
+
+    since = datetime.utcnow() - timedelta(days=30)
+    qs = LessonProgress.objects(user_id__in=["idx-user"], status="completed", updated_at__gte=since)
+    plan = _winning_plan(qs.only("updated_at").exclude("id").explain())
+    assert "user_status_updated" in _index_names(plan)
+    assert _is_covered(plan)
+    plan = _winning_plan(
+        LessonProgress.objects(user_id="idx-user", status="completed").only("lesson_type").exclude("id").explain()
+    )
+    assert _is_covered(plan)
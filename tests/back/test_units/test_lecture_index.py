@@ -0,0 +1,42 @@
+"""Unit tests: индекс вопросов лекции (apps.lectures.documents.build_question_index)."""
+
+from __future__ import annotations
+
+BLOCKS = [
+    {"type": "text", "id": "t1", "content": "intro"},
+    {
+        "type": "question", "id": "q1",
+        "choices": [{"id": "a", "is_correct": True}, {"id": "b"}, {"id": "c", "is_correct": True}],
+    },
+    {"type": "question", "id": "q2", "choices": []},
+    {"type": "question", "choices": [{"id": "a", "is_correct": True}]},
+    {
+        "type": "video", "id": "v1",
+        "pause_points": [
+            {"id": "p1", "question": {"choices": [{"id": 1, "is_correct": True}, {"id": 2}]}},
+            {"question": {"choices": [{"id": 3}]}},
+        ],
+    },
+]
+
+
+def test_build_question_index():
+    from apps.lectures.documents import build_question_index
+
+    ids, answers = build_question_index(BLOCKS)
+    assert ids == ["q1", "q2", "v1::p1"]
+    assert answers == {"q1": ["a", "c"], "v1::p1": ["1"]}
+    assert build_question_index(None) == ([], {})
+
+
+def test_lecture_index_is_built_on_clean():
+    from apps.lectures.documents import Lecture
+
+    lecture = Lecture(title="L", track_id="", blocks=BLOCKS)
+    # Без индекса (старая лекция) — разбор blocks
+    assert lecture.question_index_version == 0
+    assert lecture.get_question_block_ids() == ["q1", "q2", "v1::p1"]
+    lecture.clean()
+    lecture.blocks = []
+    assert lecture.get_question_block_ids() == ["q1", "q2", "v1::p1"]
+    assert lecture.get_question_answers()["q1"] == ["a", "c"]
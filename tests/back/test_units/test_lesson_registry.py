@@ -0,0 +1,73 @@
+"""Unit tests: common.lesson_registry."""
+
+from __future__ import annotations
+
+import pytest
+
+OID = "65f000000000000000000001"
+
+
+@pytest.fixture
+def registry(monkeypatch, settings):
+    from common import lesson_registry
+
+    builds = []
+
+    def build(lesson_type):
+        builds.append(lesson_type)
+        entry = {
+            "id": OID, "public_id": "abc123def456", "title": "T",
+            "available_from": None, "available_until": "2030-01-01T00:00:00Z", "hard": True,
+        }
+        return {"by_oid": {OID: entry}, "by_public": {"abc123def456": OID}}
+
+    settings.LESSON_REGISTRY_REDIS_URL = ""
+    settings.LESSON_REGISTRY_CHECK_SEC = 60
+    monkeypatch.setattr(lesson_registry, "_build_snapshot", build)
+    monkeypatch.setattr(lesson_registry, "_registry", lesson_registry.LessonRegistry())
+    return lesson_registry, builds
+
+
+def test_lookup_by_either_id(registry):
+    lesson_registry, builds = registry
+    assert lesson_registry.get_lesson("task", OID)["hard"] is True
+    assert lesson_registry.get_lesson("task", "abc123def456")["id"] == OID
+    assert lesson_registry.display_id("task", OID) == "abc123def456"
+    assert lesson_registry.lesson_ids("task", OID) == ["abc123def456", OID]
+    assert builds == ["task"]
+
+
+def test_unknown_lesson_falls_back_to_given_id(registry):
+    lesson_registry, _ = registry
+    assert lesson_registry.get_lesson("task", "missing") is None
+    assert lesson_registry.display_id("task", "missing") == "missing"
+    assert lesson_registry.lesson_ids("unknown-type", "x") == ["x"]
+
+
+def test_invalidate_rebuilds_snapshot(registry):
+    lesson_registry, builds = registry
+    lesson_registry.get_lesson("lecture", OID)
+    lesson_registry.get_lesson("lecture", OID)
+    lesson_registry.invalidate("lecture")
+    lesson_registry.get_lesson("lecture", OID)
+    assert builds == ["lecture", "lecture"]
+
+
+@pytest.mark.django_db
+def test_registry_follows_lesson_saves(settings, test_track):
+    from apps.tasks.documents import Task
+    from common import lesson_registry
+
+    settings.LESSON_REGISTRY_CHECK_SEC = 60
+    task = Task(title="Registry", track_id=str(test_track.id), public_id="regtest00001")
+    task.save()
+    try:
+        assert lesson_registry.display_id("task", str(task.id)) == "regtest00001"
+        task.public_id = "regtest00002"
+        task.hard = True
+        task.save()
+        assert lesson_registry.display_id("task", str(task.id)) == "regtest00002"
+        assert lesson_registry.get_lesson("task", "regtest00002")["hard"] is True
+    finally:
+        task.delete()
+    assert lesson_registry.get_lesson("task", str(task.id)) is None
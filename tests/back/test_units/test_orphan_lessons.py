@@ -0,0 +1,68 @@
+"""Unit tests: одиночные уроки по каталогу уроков (apps.tracks.views, apps.tracks.lesson_index)."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+OID = "65f000000000000000000001"
+
+
+def _conditions(query):
+    return query["$and"]
+
+
+def test_orphan_query_filters_track_lessons_and_availability():
+    from apps.tracks.views import _orphan_query
+
+    query = _orphan_query([], False, True, {"available_until": None})
+    assert _conditions(query) == [{"in_track": False}, {"available_until": None}]
+
+
+def test_orphan_query_visibility_by_groups():
+    from apps.tracks.views import _orphan_query
+
+    visible = _conditions(_orphan_query(["g1"], False, False, {}))[-1]["$or"]
+    assert {"visible_group_ids": {"$in": ["g1"]}} in visible
+    assert {"visible_group_ids": []} in visible and {"visible_group_ids": None} in visible
+
+    # Аноним и пользователь без групп видят только уроки без ограничений
+    for args in ((["g1"], True), ([], False)):
+        visible = _conditions(_orphan_query(*args, False, {}))[-1]["$or"]
+        assert visible == [{"visible_group_ids": None}, {"visible_group_ids": []}]
+
+
+def test_index_fields_and_items_by_type():
+    from apps.tracks.lesson_index import index_fields, lesson_index_ids
+    from apps.tracks.views import _by_type
+
+    until = datetime(2030, 1, 1)
+    fields = index_fields("puzzle", {"_id": OID, "title": "P", "hard": True, "available_until": until})
+    assert fields["hard"] is False and fields["public_id"] == "" and fields["visible_group_ids"] == []
+
+    rows = [
+        {"lesson_type": "task", "lesson_id": OID, "public_id": "abc", "title": "T", "hard": True},
+        {"lesson_type": "puzzle", "lesson_id": OID, **fields},
+    ]
+    lectures, tasks, puzzles, questions, surveys, layouts = _by_type(rows)
+    assert tasks == [{"id": "abc", "title": "T", "available_from": None, "available_until": None, "hard": True}]
+    assert puzzles[0]["id"] == OID and "hard" not in puzzles[0]
+    assert puzzles[0]["available_until"].startswith("2030-01-01")
+    assert lectures == questions == surveys == layouts == []
+    assert lesson_index_ids(rows[0]) == ["abc", OID]
+
+
+def test_ensure_lesson_index_backfills_once(monkeypatch):
+    from apps.tracks import lesson_index
+
+    rebuilds = []
+    monkeypatch.setattr(lesson_index, "_checked", False)
+    monkeypatch.setattr(lesson_index, "_counts", lambda: (0, 3))
+    monkeypatch.setattr(lesson_index, "rebuild_lesson_index", lambda: rebuilds.append(1))
+    lesson_index.ensure_lesson_index()
+    lesson_index.ensure_lesson_index()
+    assert rebuilds == [1]
+
+    monkeypatch.setattr(lesson_index, "_checked", False)
+    monkeypatch.setattr(lesson_index, "_counts", lambda: (3, 3))
+    lesson_index.ensure_lesson_index()
+    assert rebuilds == [1]
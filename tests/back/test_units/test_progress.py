@@ -51,3 +51,57 @@ def test_save_lesson_progress_marks_completed_late(monkeypatch):
     assert lp.completed_late is True
     assert lp.late_by_seconds >= 5
 
+
+@pytest.mark.django_db
+def test_load_block_progress_maps_block_ids():
+    from apps.submissions.progress import load_block_progress, save_lesson_progress
+
+    save_lesson_progress("u3", "lec1::q1", "question", True)
+    save_lesson_progress("u3", "lec1::v1::p1", "question", False)
+    save_lesson_progress("u3", "lec2::q1", "question", True)
+
+    progress = load_block_progress("u3", "lec1", ["q1", "q2", "v1::p1"])
+    assert {bid: lp.status for bid, lp in progress.items()} == {"q1": "completed", "v1::p1": "started"}
+    assert load_block_progress("u3", "lec1", []) == {}
+
+
+@pytest.mark.django_db
+def test_upsert_lesson_progress_reports_transitions():
+    from apps.submissions.documents import LessonProgress
+    from apps.submissions.progress import upsert_lesson_progress
+
+    assert upsert_lesson_progress("u4", "l4", "lecture", "started", lesson_title="T") is True
+    assert upsert_lesson_progress("u4", "l4", "lecture", "started") is False
+    assert upsert_lesson_progress("u4", "l4", "lecture", "completed") is True
+    assert upsert_lesson_progress("u4", "l4", "lecture", "completed", completed_late=True, late_by_seconds=5) is False
+    assert upsert_lesson_progress("u4", "l4", "lecture", "started", track_title="Track") is False
+
+    lp = LessonProgress.objects.get(user_id="u4", lesson_id="l4")
+    assert (lp.status, lp.completed_late, lp.late_by_seconds) == ("completed", True, 5)
+    assert (lp.lesson_type, lp.lesson_title, lp.track_title) == ("lecture", "T", "Track")
+    assert LessonProgress.objects(user_id="u4", lesson_id="l4").count() == 1
+
+
+@pytest.mark.django_db
+def test_standalone_statuses_batch_progress_and_submissions():
+    from apps.submissions.documents import Submission
+    from apps.submissions.progress import save_lesson_progress
+    from apps.tracks.serializers import (
+        get_standalone_status_for_user,
+        get_standalone_statuses_for_user,
+        get_standalone_statuses_for_users,
+    )
+
+    save_lesson_progress("u5", "lec5", "lecture", True)
+    Submission(user_id="u5", task_id="task5", code="", passed=False).save()
+    Submission(user_id="u5", task_id="task5", code="", passed=True).save()
+    Submission(user_id="u5", task_id="task6", code="", passed=False).save()
+
+    statuses = get_standalone_statuses_for_user(
+        "u5", [("lecture", ["lec5"]), ("task", ["task5"]), ("task", ["task6"]), ("puzzle", ["pz5"])]
+    )
+    assert [s[0] for s in statuses] == ["completed", "completed", "started", "not_started"]
+    assert statuses[1][2] is not None and statuses[2][2] is None
+    assert get_standalone_status_for_user("u5", "task", ["task5"]) == statuses[1]
+    both = get_standalone_statuses_for_users(["u5", "u6"], [("task", ["task5"])])
+    assert both == {"u5": [statuses[1]], "u6": [("not_started", 0, None)]}
@@ -0,0 +1,71 @@
+"""Unit tests: apps.submissions.rebuild.rebuild_user_progress (пересчёт LessonProgress без БД)."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+LECTURE = {"id": "a" * 24, "public_id": "lec-pub", "title": "Lecture", "available_until": None}
+TASK = {"id": "b" * 24, "public_id": None, "title": "Task", "available_until": "2026-01-01T00:00:00Z"}
+PUZZLE = {"id": "c" * 24, "public_id": "puz-pub", "title": "Puzzle", "available_until": None}
+LESSONS = {"lecture": LECTURE, "task": TASK, "puzzle": PUZZLE}
+
+
+def resolve(lesson_type, lesson_id):
+    entry = LESSONS.get(lesson_type)
+    if entry and lesson_id in (entry["id"], entry["public_id"]):
+        return entry
+    return None
+
+
+def row(_id, lesson_id, lesson_type, status, day=1):
+    return {
+        "_id": _id, "lesson_id": lesson_id, "lesson_type": lesson_type, "status": status,
+        "completed_late": False, "late_by_seconds": 0, "lesson_title": "", "track_id": "", "track_title": "",
+        "updated_at": datetime(2025, 12, day),
+    }
+
+
+def by_id(ops):
+    return {op[1]: op for op in ops if op[0] == "upsert"}, [op for op in ops if op[0] == "delete"]
+
+
+def _rebuild(rows, submissions=None, attempts=None):
+    from apps.submissions.rebuild import rebuild_user_progress
+
+    blocks = {LECTURE["id"]: ["q1", "q2"]}
+    return rebuild_user_progress(rows, submissions or {}, attempts or {}, resolve, blocks)
+
+
+def test_rekeys_lecture_blocks_and_completes_lecture():
+    oid = LECTURE["id"]
+    ops = _rebuild([
+        row(1, oid, "lecture", "started"),
+        row(2, f"{oid}::q1", "question", "completed", day=2),
+        row(3, "lec-pub::q2", "question", "completed", day=3),
+    ])
+    upserts, deletes = by_id(ops)
+    assert upserts["lec-pub"][2]["status"] == "completed"
+    assert upserts["lec-pub::q1"][2]["status"] == "completed"
+    assert "lec-pub::q2" not in upserts  # уже под верным id и без изменений
+    assert sorted(d[2] for d in deletes) == [oid, f"{oid}::q1"]
+
+
+def test_duplicate_keys_merge_keeping_completed():
+    ops = _rebuild([row(1, "c" * 24, "puzzle", "completed"), row(2, "puz-pub", "puzzle", "started")])
+    upserts, deletes = by_id(ops)
+    assert upserts["puz-pub"][2]["status"] == "completed"
+    assert [d[1] for d in deletes] == [1]
+
+
+def test_backfills_tasks_and_attempts():
+    submissions = {TASK["id"]: {"passed": True, "first_at": datetime(2025, 12, 30),
+                                "first_passed_at": datetime(2026, 1, 1, 0, 0, 10)}}
+    attempts = {("puzzle", PUZZLE["id"]): datetime(2025, 12, 5)}
+    upserts, _ = by_id(_rebuild([], submissions, attempts))
+    task = upserts[TASK["id"]][2]
+    assert (task["status"], task["completed_late"], task["late_by_seconds"]) == ("completed", True, 10)
+    assert upserts["puz-pub"][2]["status"] == "started"
+
+
+def test_unchanged_progress_yields_no_ops():
+    assert _rebuild([row(1, "puz-pub", "puzzle", "completed"), row(2, "unknown", "task", "started")]) == []
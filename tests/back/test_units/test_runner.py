@@ -1,5 +1,6 @@
 """Unit tests: tasks runner (run_python_code, run_tests)."""
 import pytest
+import shutil
 import sys
 
 # Ensure back is on path
@@ -70,3 +71,333 @@ def test_run_tests_failed():
     results = run_tests(task, "print(0)")
     assert len(results) == 1
     assert results[0]["passed"] is False
+
+
+def test_run_python_code_runtime_error_matches_subprocess():
+    from apps.tasks.runner import _run_python_subprocess
+    code = "x = 1\nprint(y)"
+    _, _, err = run_python_code(code, stdin="", timeout_sec=2.0)
+    expected_err = _run_python_subprocess(code, "", 2.0)["error"]
+    assert err == expected_err
+    assert "NameError" in err
+
+
+def test_run_python_code_pool_reuses_worker():
+    from apps.tasks.pool import get_pool
+    pool = get_pool()
+    assert pool is not None
+    for i in range(3):
+        stdout, _, err = run_python_code(f"print({i})", stdin="", timeout_sec=2.0)
+        assert err is None
+        assert _normalize_output(stdout) == str(i)
+    # Состояние одного запуска не видно в следующем
+    run_python_code("import math\nmath.pi = 0", stdin="", timeout_sec=2.0)
+    stdout, _, err = run_python_code("import math\nprint(math.pi > 3)", stdin="", timeout_sec=2.0)
+    assert _normalize_output(stdout) == "True"
+
+
+def test_run_python_code_without_pool(settings):
+    settings.TASK_RUNNER_POOL_SIZE = 0
+    stdout, _, err = run_python_code("print(input()[::-1])", stdin="abc", timeout_sec=2.0)
+    assert err is None
+    assert _normalize_output(stdout) == "cba"
+
+
+def test_run_python_batch_matches_single_runs():
+    from apps.tasks.runner import run_python_batch
+    code = "n = int(input())\nprint(10 // n)"
+    stdins = ["1", "5", "0", "x"]
+    batch = run_python_batch(code, stdins, timeout_sec=2.0)
+    single = [run_python_code(code, stdin=s, timeout_sec=2.0) for s in stdins]
+    assert [b[0] for b in batch] == [s[0] for s in single]
+    assert [b[2] for b in batch] == [s[2] for s in single]
+    assert batch[2][2] is not None and "ZeroDivisionError" in batch[2][2]
+
+
+def test_run_tests_many_cases_syntax_error():
+    task = Task(
+        title="T",
+        track_id="x",
+        test_cases=[
+            TaskCaseEmbed(id=f"c{i}", input=str(i), expected_output=str(i)) for i in range(5)
+        ],
+    )
+    results = run_tests(task, "print(input(")
+    assert [r["caseId"] for r in results] == [f"c{i}" for i in range(5)]
+    assert all(not r["passed"] and "SyntaxError" in r["error"] for r in results)
+    results = run_tests(task, "print(input())")
+    assert all(r["passed"] for r in results)
+
+
+def test_run_python_batch_parallel_keeps_case_order():
+    from apps.tasks.runner import run_python_batch
+    code = "import time\nn = int(input())\ntime.sleep((4 - n) * 0.05)\nprint(n)"
+    stdins = [str(i) for i in range(5)]
+    results = run_python_batch(code, stdins, timeout_sec=2.0, parallelism=4)
+    assert [_normalize_output(r[0]) for r in results] == stdins
+    assert all(r[2] is None for r in results)
+
+
+def test_host_slots_limit(tmp_path):
+    from apps.tasks.sandbox_worker import HostSlots
+    slots = HostSlots(str(tmp_path), 2)
+    a = slots.try_acquire()
+    b = slots.try_acquire()
+    assert a is not None and b is not None
+    assert slots.try_acquire() is None
+    HostSlots.release(a)
+    c = slots.try_acquire()
+    assert c is not None
+    HostSlots.release(b)
+    HostSlots.release(c)
+    assert HostSlots(str(tmp_path), 0).try_acquire() == -1
+
+
+def test_host_slots_acquire_times_out_and_busy_reply(tmp_path, settings):
+    from apps.tasks.runner import HOST_BUSY_ERROR, _reply_execution, _run_process
+    from apps.tasks.sandbox_worker import HostSlots, SlotTimeout, execute_many
+
+    slots = HostSlots(str(tmp_path), 1, timeout=0.05)
+    held = slots.acquire()
+    with pytest.raises(SlotTimeout):
+        slots.acquire()
+    results = execute_many("", compile("", "<solution>", "exec"), ["", ""], 1.0, 2, slots)
+    assert [r["limit"] for r in results] == ["slots", "slots"]
+
+    settings.TASK_RUNNER_SLOTS_DIR = str(tmp_path)
+    settings.TASK_RUNNER_HOST_CONCURRENCY = 1
+    settings.TASK_RUNNER_SLOT_TIMEOUT_SEC = 0.05
+    reply = _run_process(
+        [sys.executable, "-c", "print(1)"], "", 2.0, {"cpu_sec": 0, "memory_bytes": 0, "output_bytes": 0}
+    )
+    assert reply["limit"] == "slots"
+    assert _reply_execution(reply)["error"] == HOST_BUSY_ERROR
+    HostSlots.release(held)
+
+
+def test_python_batch_reruns_only_missing_cases_after_worker_timeout(monkeypatch):
+    import apps.tasks.runner as runner
+    from apps.tasks.pool import WorkerTimeout
+
+    class _Pool:
+        def iter_batch(self, code, stdins, timeout_sec, parallelism=1, limits=None):
+            yield 1, {"stdout": "b\n", "stderr": "", "returncode": 0}
+            raise WorkerTimeout("timeout")
+
+    rerun = []
+    monkeypatch.setattr(runner, "get_pool", lambda: _Pool())
+    monkeypatch.setattr(
+        runner, "_execute_python", lambda code, stdin, timeout_sec: rerun.append(stdin) or runner._execution(stdin, "", None)
+    )
+    results = runner.run_python_batch("print(input())", ["a", "b", "c"], timeout_sec=1.0, parallelism=2)
+    assert [r[0].strip() for r in results] == ["a", "b", "c"]
+    assert rerun == ["a", "c"]
+
+
+def test_run_tests_result_cache_hit_and_invalidation():
+    from apps.tasks.result_cache import get_result_cache
+    cache = get_result_cache()
+    cache.clear()
+    task = Task(
+        title="T",
+        track_id="x",
+        test_cases=[TaskCaseEmbed(id="c1", input="2", expected_output="4\n")],
+    )
+    first = run_tests(task, "print(int(input()) * 2)")
+    # Тот же код с другими переводами строк и хвостовыми пробелами — попадание в кэш
+    second = run_tests(task, "print(int(input()) * 2)   \r\n\r\n")
+    assert first == second
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    # Изменили тесты — старый результат не используется
+    task.test_cases[0].expected_output = "5\n"
+    third = run_tests(task, "print(int(input()) * 2)")
+    assert third[0]["passed"] is False
+    assert cache.stats()["misses"] == 2
+
+
+def test_result_cache_lru_eviction():
+    from apps.tasks.result_cache import ResultCache
+    cache = ResultCache(2)
+    cache.put("a", [{"passed": True}])
+    cache.put("b", [{"passed": True}])
+    assert cache.get("a") is not None
+    cache.put("c", [{"passed": False}])
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["size"] == 2
+
+
+def test_run_tests_public_only():
+    task = Task(
+        title="T",
+        track_id="x",
+        test_cases=[
+            TaskCaseEmbed(id="open", input="1", expected_output="1\n", is_public=True),
+            TaskCaseEmbed(id="hidden", input="2", expected_output="2\n", is_public=False),
+        ],
+    )
+    results = run_tests(task, "print(input())", public_only=True)
+    assert [r["caseId"] for r in results] == ["open"]
+
+
+def test_run_tests_fail_fast_skips_remaining_cases():
+    task = Task(
+        title="T",
+        track_id="x",
+        test_cases=[
+            TaskCaseEmbed(id=f"c{i}", input=str(i), expected_output=str(i)) for i in range(6)
+        ],
+    )
+    code = "n = int(input())\nprint(n if n != 1 else -1)"
+    results = run_tests(task, code, parallelism=2, fail_fast=True)
+    assert [r["caseId"] for r in results] == [f"c{i}" for i in range(6)]
+    assert results[0]["passed"] is True and results[1]["passed"] is False
+    assert all(r.get("skipped") for r in results[2:])
+
+
+def test_iter_tests_yields_every_case_with_index():
+    from apps.tasks.runner import iter_tests
+    task = Task(
+        title="T",
+        track_id="x",
+        test_cases=[
+            TaskCaseEmbed(id=f"c{i}", input=str(i), expected_output=str(i)) for i in range(4)
+        ],
+    )
+    code = "import time\nn = int(input())\ntime.sleep((3 - n) * 0.05)\nprint(n)"
+    streamed = dict(iter_tests(task, code, parallelism=4))
+    assert sorted(streamed) == [0, 1, 2, 3]
+    assert [streamed[i]["caseId"] for i in range(4)] == ["c0", "c1", "c2", "c3"]
+    assert all(r["passed"] for r in streamed.values())
+
+
+def test_iter_tests_close_stops_remaining_cases():
+    import time
+    from apps.tasks.runner import iter_tests
+    task = Task(
+        title="T",
+        track_id="x",
+        test_cases=[
+            TaskCaseEmbed(id=f"c{i}", input=str(i), expected_output=str(i)) for i in range(4)
+        ],
+    )
+    code = "import time\nn = int(input())\ntime.sleep(n)\nprint(n)"
+    started = time.monotonic()
+    stream = iter_tests(task, code, parallelism=1)
+    index, result = next(stream)
+    assert index == 0 and result["passed"] is True
+    stream.close()
+    assert time.monotonic() - started < 1.0
+    # Пул после отмены продолжает работать
+    stdout, _, err = run_python_code("print(42)", stdin="", timeout_sec=2.0)
+    assert err is None and _normalize_output(stdout) == "42"
+
+
+@pytest.mark.parametrize("pool_size", [2, 0])
+def test_run_python_code_output_limit(settings, pool_size):
+    settings.TASK_RUNNER_POOL_SIZE = pool_size
+    settings.TASK_RUNNER_OUTPUT_LIMIT_KB = 4
+    stdout, _, err = run_python_code("while True:\n    print('x' * 100)", stdin="", timeout_sec=2.0)
+    assert err == "Превышен лимит объёма вывода"
+    assert len(stdout) <= 4 * 1024
+
+
+@pytest.mark.parametrize("pool_size", [2, 0])
+def test_run_python_code_cpu_and_memory_limits(settings, pool_size):
+    settings.TASK_RUNNER_POOL_SIZE = pool_size
+    settings.TASK_RUNNER_CPU_LIMIT_SEC = 1
+    settings.TASK_RUNNER_MEMORY_LIMIT_MB = 256
+    _, _, err = run_python_code("while True: pass", stdin="", timeout_sec=5.0)
+    assert err == "Превышен лимит процессорного времени"
+    _, _, err = run_python_code("x = bytearray(512 * 1024 * 1024)", stdin="", timeout_sec=5.0)
+    assert err is not None and "MemoryError" in err
+
+
+def test_external_sigkill_is_not_reported_as_cpu_limit(tmp_path):
+    from apps.tasks.sandbox_worker import HostSlots, execute_many
+
+    source = "import os, signal\nos.kill(os.getpid(), signal.SIGKILL)"
+    limits = {"cpu_sec": 5, "memory_bytes": 0, "output_bytes": 0}
+    results = execute_many(
+        source, compile(source, "<solution>", "exec"), [""], 5.0, 1, HostSlots(str(tmp_path), 0), limits=limits
+    )
+    assert results[0]["limit"] is None
+
+
+def test_run_tests_reports_resource_usage():
+    task = Task(
+        title="T",
+        track_id="x",
+        test_cases=[TaskCaseEmbed(id="c1", input="", expected_output="ok")],
+    )
+    result = run_tests(task, "s = sum(range(300000))\nprint('ok')")[0]
+    assert result["passed"] is True
+    assert isinstance(result["cpuTimeMs"], int) and result["cpuTimeMs"] >= 0
+    assert isinstance(result["peakMemoryKb"], int) and result["peakMemoryKb"] > 0
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node не установлен")
+def test_run_tests_javascript():
+    task = Task(
+        title="T",
+        track_id="x",
+        language="javascript",
+        test_cases=[
+            TaskCaseEmbed(id="c1", input="2", expected_output="4"),
+            TaskCaseEmbed(id="c2", input="5", expected_output="10"),
+        ],
+    )
+    code = "const n = Number(require('fs').readFileSync(0, 'utf8'));\nconsole.log(n * 2);"
+    results = run_tests(task, code)
+    assert [r["passed"] for r in results] == [True, True]
+    broken = run_tests(task, "throw new Error('boom');")
+    assert broken[0]["passed"] is False and "boom" in broken[0]["actualOutput"]
+    assert "kavnt-run-" not in broken[0]["actualOutput"]
+
+
+@pytest.mark.skipif(shutil.which("g++") is None, reason="g++ не установлен")
+def test_run_tests_cpp_uses_build_cache(settings, tmp_path):
+    settings.TASK_RUNNER_BUILD_CACHE_DIR = str(tmp_path)
+    task = Task(
+        title="T",
+        track_id="x",
+        language="cpp",
+        test_cases=[
+            TaskCaseEmbed(id="c1", input="2", expected_output="4"),
+            TaskCaseEmbed(id="c2", input="7", expected_output="14"),
+        ],
+    )
+    code = "#include <iostream>\nint main() { int n; std::cin >> n; std::cout << n * 2 << std::endl; }"
+    results = run_tests(task, code)
+    assert [r["passed"] for r in results] == [True, True]
+    assert len(os.listdir(tmp_path)) == 1
+    # Те же исходники для другой задачи — бинарник берётся из кэша, а не компилируется заново
+    task.test_cases[0].expected_output = "5"
+    assert run_tests(task, code)[0]["passed"] is False
+    assert len(os.listdir(tmp_path)) == 1
+
+
+@pytest.mark.skipif(shutil.which("g++") is None, reason="g++ не установлен")
+def test_run_tests_cpp_compile_error(settings, tmp_path):
+    settings.TASK_RUNNER_BUILD_CACHE_DIR = str(tmp_path)
+    task = Task(
+        title="T",
+        track_id="x",
+        language="cpp",
+        test_cases=[
+            TaskCaseEmbed(id="c1", input="", expected_output=""),
+            TaskCaseEmbed(id="c2", input="", expected_output=""),
+        ],
+    )
+    results = run_tests(task, "int main() { return undefined_name; }")
+    assert all(not r["passed"] and r["error"].startswith("Ошибка компиляции") for r in results)
+    assert "solution.cpp" in results[0]["actualOutput"]
+    assert "kavnt-run-" not in results[0]["actualOutput"]
+    assert os.listdir(tmp_path) == []
+
+
+def test_run_tests_unknown_language():
+    from apps.tasks.runner import get_engine
+    results = list(get_engine("cobol").iter_batch("x", ["", ""], 1.0, 2))
+    assert [i for i, _ in results] == [0, 1]
+    assert results[0][1]["error"] == "Язык cobol не поддерживается на сервере"
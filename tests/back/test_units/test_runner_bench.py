@@ -0,0 +1,33 @@
+"""Unit tests: runner benchmark harness (tests/bench/runner_bench.py)."""
+import os
+import sys
+
+BENCH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "bench"))
+if BENCH not in sys.path:
+    sys.path.insert(0, BENCH)
+
+import runner_bench
+
+
+def test_percentile():
+    values = [10, 20, 30, 40, 50]
+    assert runner_bench.percentile(values, 50) == 30
+    assert runner_bench.percentile(values, 95) == 48
+    assert runner_bench.percentile([], 95) == 0.0
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    baseline = {"scenarios": {"s": {"p50_ms": 10, "p95_ms": 20, "executions_per_sec": 100}}}
+    ok = {"scenarios": {"s": {"p50_ms": 14, "p95_ms": 29, "executions_per_sec": 70}}}
+    assert runner_bench.compare(ok, baseline, 0.5) == []
+    slow = {"scenarios": {"s": {"p50_ms": 16, "p95_ms": 20, "executions_per_sec": 60}}}
+    regressions = runner_bench.compare(slow, baseline, 0.5)
+    assert [r.split(":")[0] for r in regressions] == ["s.p50_ms", "s.executions_per_sec"]
+
+
+def test_run_benchmarks_smoke(settings):
+    settings.TASK_RESULT_CACHE_SIZE = 0
+    report = runner_bench.run_benchmarks(["trivial_print", "many_cases"], 3)
+    row = report["scenarios"]["trivial_print"]
+    assert row["iterations"] == 3 and row["executions_per_sec"] > 0
+    assert report["scenarios"]["many_cases"]["executions"] == 50
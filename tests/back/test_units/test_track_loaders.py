@@ -0,0 +1,60 @@
+"""Unit tests: apps.tracks.loaders (пакетная загрузка уроков на запрос)."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+OID_1 = "65f000000000000000000001"
+OID_2 = "65f000000000000000000002"
+
+
+class _FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def only(self, *fields):
+        return self
+
+    def as_pymongo(self):
+        return iter(self.rows)
+
+
+@pytest.fixture
+def loader_module(monkeypatch):
+    from apps.tracks import loaders
+
+    queries = []
+
+    class FakeModel:
+        class objects:
+            def __new__(cls, id__in):
+                queries.append(sorted(str(i) for i in id__in))
+                return _FakeQuery([{"_id": ObjectId(OID_1), "public_id": "pub1", "title": "A", "hard": True}])
+
+    monkeypatch.setattr(loaders, "lesson_model", lambda lesson_type: FakeModel)
+    return loaders, queries
+
+
+def test_primed_refs_load_in_one_query_per_type(loader_module):
+    loaders, queries = loader_module
+    loader = loaders.LessonLoader()
+    loader.prime([SimpleNamespace(type="task", id=OID_1), SimpleNamespace(type="task", id=OID_2)])
+    entry = loader.load("task", OID_1)
+    assert entry["public_id"] == "pub1" and entry["hard"] is True
+    assert loader.load("task", OID_2) is None
+    assert queries == [[OID_1, OID_2]]
+
+
+def test_unprimed_and_invalid_ids(loader_module):
+    loaders, queries = loader_module
+    context = {}
+    loader = loaders.get_lesson_loader(context)
+    assert loaders.get_lesson_loader(context) is loader
+    assert loader.load("task", "not-an-oid") is None
+    assert loader.load("unknown", OID_1) is None
+    assert queries == []
+    assert loader.load("lecture", OID_1)["id"] == OID_1
+    assert queries == [[OID_1]]
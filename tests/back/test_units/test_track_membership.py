@@ -0,0 +1,57 @@
+"""Unit tests: apps.tracks.membership (кэш id уроков треков)."""
+
+from __future__ import annotations
+
+import pytest
+
+OID = "65f000000000000000000001"
+
+
+@pytest.fixture
+def membership(monkeypatch, settings):
+    from apps.tracks import membership
+    from common import lesson_registry
+
+    builds = []
+
+    def build(key):
+        builds.append(key)
+        return [OID, "intro"]
+
+    settings.LESSON_REGISTRY_REDIS_URL = ""
+    settings.LESSON_REGISTRY_CHECK_SEC = 60
+    monkeypatch.setattr(membership, "_cache", lesson_registry.LessonRegistry(build=build, load=frozenset))
+    return membership, builds
+
+
+def test_ids_are_built_once_and_rebuilt_after_invalidate(membership):
+    membership, builds = membership
+    assert membership.in_track_lesson_ids() == frozenset({OID, "intro"})
+    assert membership.in_track_lesson_ids() == frozenset({OID, "intro"})
+    assert builds == ["in-track"]
+
+    membership.invalidate()
+    membership.in_track_lesson_ids()
+    assert builds == ["in-track", "in-track"]
+
+
+def test_track_save_invalidates_only_on_lessons_change(membership, monkeypatch):
+    from mongoengine import signals
+
+    from apps.tracks import lesson_index
+    from apps.tracks.documents import LessonRef, Track
+
+    membership, _ = membership
+    calls = []
+    monkeypatch.setattr(membership, "invalidate", lambda: calls.append(1))
+    monkeypatch.setattr(lesson_index, "sync_track_membership", lambda: calls.append(2))
+
+    track = Track(title="T")
+    track._clear_changed_fields()
+    track.title = "T2"
+    signals.post_save.send(Track, document=track, created=False)
+    assert calls == []
+
+    track.lessons = [LessonRef(id=OID, type="task", title="L", order=0)]
+    signals.post_save.send(Track, document=track, created=False)
+    assert sorted(calls) == [1, 2]
@@ -0,0 +1,174 @@
+"""Unit tests: tracks.progress.resolve_track_statuses."""
+
+from __future__ import annotations
+
+import pytest
+
+
+@pytest.mark.django_db
+def test_resolve_track_statuses_matches_per_lesson_status(test_user, test_track, test_task, test_puzzle):
+    from apps.lectures.documents import Lecture
+    from apps.submissions.documents import LessonProgress, Submission
+    from apps.tracks.documents import LessonRef
+    from apps.tracks.progress import resolve_track_statuses
+    from apps.tracks.serializers import _get_lesson_display_id, get_lesson_status_for_user
+
+    user_id = str(test_user.id)
+    lecture = Lecture(title="L", blocks=[{"type": "question", "id": "q1"}, {"type": "question", "id": "q2"}])
+    lecture.save()
+    try:
+        test_track.lessons = [
+            LessonRef(id=str(lecture.id), type="lecture", title="L", order=0),
+            LessonRef(id=str(test_task.id), type="task", title="T", order=1),
+            LessonRef(id=str(test_puzzle.id), type="puzzle", title="P", order=2),
+        ]
+        test_track.save()
+        lecture_display = str(lecture.public_id or lecture.id)
+        LessonProgress(user_id=user_id, lesson_id=f"{lecture_display}::q1", lesson_type="question", status="completed").save()
+        Submission(task_id=str(test_task.id), user_id=user_id, code="print()", passed=True).save()
+        LessonProgress(
+            user_id=user_id, lesson_id=str(test_puzzle.id), lesson_type="puzzle",
+            status="completed", completed_late=True, late_by_seconds=30,
+        ).save()
+
+        statuses = resolve_track_statuses(user_id, [test_track])[str(test_track.id)]
+        expected = {
+            _get_lesson_display_id(ref): get_lesson_status_for_user(user_id, ref, _get_lesson_display_id(ref))
+            for ref in test_track.lessons
+        }
+        assert statuses == expected
+        assert statuses[lecture_display] == ("started", 0)
+        assert list(statuses.values())[1:] == [("completed", 0), ("completed_late", 30)]
+    finally:
+        LessonProgress.objects(user_id=user_id).delete()
+        Submission.objects(user_id=user_id).delete()
+        lecture.delete()
+
+
+@pytest.mark.django_db
+def test_track_progress_updated_on_save_and_rebuilt(test_user, test_track, test_task, test_puzzle):
+    from django.core.management import call_command
+
+    from apps.submissions.documents import LessonProgress
+    from apps.submissions.progress import save_lesson_progress
+    from apps.tracks.documents import LessonRef, TrackProgress
+    from apps.tracks.progress import get_track_progress, resolve_track_statuses, track_statuses
+
+    user_id = str(test_user.id)
+    test_track.lessons = [
+        LessonRef(id=str(test_task.id), type="task", title="T", order=0),
+        LessonRef(id=str(test_puzzle.id), type="puzzle", title="P", order=1),
+    ]
+    test_track.save()
+    try:
+        tp = get_track_progress(user_id, [test_track])[str(test_track.id)]
+        assert (tp.total, tp.completed, tp.started) == (2, 0, 0)
+
+        task_display = str(test_task.public_id or test_task.id)
+        save_lesson_progress(user_id, task_display, "task", True)
+        tp = TrackProgress.objects.get(user_id=user_id, track_id=str(test_track.id))
+        assert (tp.completed, tp.started) == (1, 0)
+        assert tp.lessons[str(test_task.id)]["status"] == "completed"
+        assert track_statuses(tp) == resolve_track_statuses(user_id, [test_track])[str(test_track.id)]
+
+        # Прогресс записан в обход save_lesson_progress — rebuild восстанавливает
+        LessonProgress(user_id=user_id, lesson_id=str(test_puzzle.id), lesson_type="puzzle", status="started").save()
+        call_command("rebuild_track_progress", user=[user_id])
+        tp = TrackProgress.objects.get(user_id=user_id, track_id=str(test_track.id))
+        assert (tp.completed, tp.started) == (1, 1)
+
+        # Изменился состав трека — запись пересчитывается при чтении
+        test_track.lessons = test_track.lessons[:1]
+        test_track.save()
+        assert get_track_progress(user_id, [test_track])[str(test_track.id)].total == 1
+    finally:
+        LessonProgress.objects(user_id=user_id).delete()
+        TrackProgress.objects(user_id=user_id).delete()
+
+
+@pytest.mark.django_db
+def test_track_progress_write_is_conditional_on_version(test_user, test_track):
+    from apps.tracks.documents import TrackProgress
+    from apps.tracks.progress import _write_track_progress
+
+    user_id, key = str(test_user.id), str(test_track.id)
+    try:
+        assert _write_track_progress(user_id, key, None, {"total": 1}) is True
+        assert _write_track_progress(user_id, key, None, {"total": 2}) is False
+        assert _write_track_progress(user_id, key, 0, {"total": 3}) is False
+        assert _write_track_progress(user_id, key, 1, {"total": 4}) is True
+        tp = TrackProgress.objects.get(user_id=user_id, track_id=key)
+        assert (tp.total, tp.version) == (4, 2)
+    finally:
+        TrackProgress.objects(user_id=user_id).delete()
+
+
+@pytest.mark.django_db
+def test_track_progress_dropped_when_lesson_changes(test_user, test_track, test_puzzle):
+    from apps.lectures.documents import Lecture
+    from apps.tracks.documents import LessonRef, TrackProgress
+    from apps.tracks.progress import get_track_progress
+
+    user_id = str(test_user.id)
+    lecture = Lecture(title="L", track_id=str(test_track.id), blocks=[{"type": "question", "id": "q1"}])
+    lecture.save()
+    test_track.lessons = [
+        LessonRef(id=str(lecture.id), type="lecture", title="L", order=0),
+        LessonRef(id=str(test_puzzle.id), type="puzzle", title="P", order=1),
+    ]
+    test_track.save()
+    try:
+        get_track_progress(user_id, [test_track])
+        lecture.title = "L2"
+        lecture.save()
+        assert TrackProgress.objects(user_id=user_id).count() == 1
+
+        # Новый блок-вопрос меняет статус лекции — запись трека сбрасывается
+        lecture.blocks = lecture.blocks + [{"type": "question", "id": "q2"}]
+        lecture.save()
+        assert TrackProgress.objects(user_id=user_id).count() == 0
+
+        get_track_progress(user_id, [test_track])
+        lecture.delete()
+        assert TrackProgress.objects(user_id=user_id).count() == 0
+    finally:
+        TrackProgress.objects(user_id=user_id).delete()
+        Lecture.objects(id=lecture.id).delete()
+
+
+def test_progress_matrix_counts_by_track():
+    from apps.tracks.progress import STATUS_CODES, ProgressMatrix
+
+    lessons = [("t1", None, "a"), ("t1", None, "b"), ("t2", None, "c"), ("t2", None, "d"), ("t2", None, "e")]
+    codes = [STATUS_CODES[s] for s in ("completed", "started", "completed_late", "not_started", "completed")]
+    matrix = ProgressMatrix(lessons, {"s1": bytearray(codes)})
+    assert matrix.counts("s1", "t1") == {"total": 2, "completed": 1, "started": 1, "late": 0}
+    assert matrix.counts("s1", "t2") == {"total": 3, "completed": 2, "started": 0, "late": 1}
+    assert matrix.counts("s1") == {"total": 5, "completed": 3, "started": 1, "late": 1}
+    assert matrix.counts("unknown") == {"total": 5, "completed": 0, "started": 0, "late": 0}
+    assert matrix.counts("s1", "missing")["total"] == 0
+
+
+@pytest.mark.django_db
+def test_progress_matrix_matches_resolver(test_user, test_track, test_task, test_puzzle):
+    from apps.submissions.documents import LessonProgress, Submission
+    from apps.tracks.documents import LessonRef
+    from apps.tracks.progress import STATUS_CODES, build_progress_matrix, resolve_track_statuses
+
+    user_id = str(test_user.id)
+    test_track.lessons = [
+        LessonRef(id=str(test_task.id), type="task", title="T", order=0),
+        LessonRef(id=str(test_puzzle.id), type="puzzle", title="P", order=1),
+    ]
+    test_track.save()
+    try:
+        Submission(task_id=str(test_task.id), user_id=user_id, code="print()", passed=False).save()
+        LessonProgress(user_id=user_id, lesson_id=str(test_puzzle.id), lesson_type="puzzle", status="completed").save()
+        matrix = build_progress_matrix([user_id, "000000000000000000000000"], [test_track])
+        expected = resolve_track_statuses(user_id, [test_track])[str(test_track.id)]
+        assert list(matrix.rows[user_id]) == [STATUS_CODES[status] for status, _ in expected.values()]
+        assert matrix.counts(user_id, test_track.id) == {"total": 2, "completed": 1, "started": 1, "late": 0}
+        assert matrix.counts("000000000000000000000000")["completed"] == 0
+    finally:
+        LessonProgress.objects(user_id=user_id).delete()
+        Submission.objects(user_id=user_id).delete()
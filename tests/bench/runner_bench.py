@@ -0,0 +1,232 @@
+"""
+Benchmark of the task runner (apps/tasks/runner.py).
+
+Runs representative solutions through run_python_code / run_tests and reports
+p50/p95 latency, executions per second and peak memory of the solution process.
+Results can be saved as a JSON baseline and compared against it later:
+
+    python tests/bench/runner_bench.py                      # report only
+    python tests/bench/runner_bench.py --save-baseline      # overwrite baselines/runner.json
+    python tests/bench/runner_bench.py --compare            # exit 1 on regression
+
+The result cache is disabled for the run, otherwise repeated checks would
+measure cache lookups instead of execution.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACK_DIR = BENCH_DIR.parent.parent / "back"
+DEFAULT_BASELINE = BENCH_DIR / "baselines" / "runner.json"
+# Relative slowdown allowed before a metric counts as a regression (timings on shared hosts are noisy).
+DEFAULT_TOLERANCE = 0.5
+
+if str(BACK_DIR) not in sys.path:
+    sys.path.insert(0, str(BACK_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.test")
+
+
+def _setup_django() -> None:
+    import django
+    from django.conf import settings
+
+    django.setup()
+    settings.TASK_RESULT_CACHE_SIZE = 0
+
+
+def percentile(values: list, pct: float) -> float:
+    """Percentile with linear interpolation (pct in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(latencies_ms: list, executions: int, wall_sec: float, peak_memory_kb) -> dict:
+    return {
+        "iterations": len(latencies_ms),
+        "executions": executions,
+        "p50_ms": round(percentile(latencies_ms, 50), 2),
+        "p95_ms": round(percentile(latencies_ms, 95), 2),
+        "mean_ms": round(statistics.fmean(latencies_ms), 2) if latencies_ms else 0.0,
+        "executions_per_sec": round(executions / wall_sec, 1) if wall_sec > 0 else 0.0,
+        "peak_memory_kb": peak_memory_kb,
+    }
+
+
+def _make_task(cases: list):
+    return SimpleNamespace(
+        language="python",
+        test_cases=[
+            SimpleNamespace(id=f"c{i}", input=stdin, expected_output=expected, is_public=True)
+            for i, (stdin, expected) in enumerate(cases)
+        ],
+    )
+
+
+def _max_peak(values):
+    values = [v for v in values if v is not None]
+    return max(values) if values else None
+
+
+def bench_code(code: str, stdin: str, iterations: int) -> dict:
+    """Single runs, as run_python_code does them (the execution dict also carries resource usage)."""
+    from apps.tasks.runner import DEFAULT_TIMEOUT_SEC, _execute_python
+
+    latencies, peaks = [], []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        execution = _execute_python(code, stdin, DEFAULT_TIMEOUT_SEC)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        if execution["error"]:
+            raise RuntimeError(f"benchmark solution failed: {execution['error']}")
+        peaks.append(execution["peak_memory_kb"])
+    return summarize(latencies, iterations, time.perf_counter() - started, _max_peak(peaks))
+
+
+def bench_tests(task, code: str, iterations: int, submitters: int = 1) -> dict:
+    """Full checks via run_tests; submitters > 1 runs them from concurrent threads."""
+    from apps.tasks.runner import run_tests
+
+    latencies, peaks = [], []
+    lock = threading.Lock()
+    errors = []
+
+    def submitter(count: int) -> None:
+        for _ in range(count):
+            t0 = time.perf_counter()
+            results = run_tests(task, code)
+            elapsed = (time.perf_counter() - t0) * 1000
+            with lock:
+                latencies.append(elapsed)
+                peaks.extend(r.get("peakMemoryKb") for r in results)
+                if not all(r["passed"] for r in results):
+                    errors.append(next(r for r in results if not r["passed"]))
+
+    per_thread = max(1, iterations // submitters)
+    threads = [threading.Thread(target=submitter, args=(per_thread,)) for _ in range(submitters)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+    if errors:
+        raise RuntimeError(f"benchmark solution failed: {errors[0]}")
+    executions = len(latencies) * len(task.test_cases)
+    return summarize(latencies, executions, wall, _max_peak(peaks))
+
+
+LARGE_STDIN = "\n".join(str(i) for i in range(200000)) + "\n"
+
+SCENARIOS = {
+    "trivial_print": lambda n: bench_code("print('ok')", "", n),
+    "cpu_loop": lambda n: bench_code("s = 0\nfor i in range(300000):\n    s += i * i\nprint(s)", "", n),
+    "large_stdin": lambda n: bench_code(
+        "import sys\nprint(sum(map(int, sys.stdin.read().split())))", LARGE_STDIN, n
+    ),
+    "many_cases": lambda n: bench_tests(
+        _make_task([(str(i), str(i * 2)) for i in range(50)]), "print(int(input()) * 2)", max(1, n // 10)
+    ),
+    "concurrent_submitters": lambda n: bench_tests(
+        _make_task([(str(i), str(i + 1)) for i in range(10)]), "print(int(input()) + 1)", max(4, n // 2), submitters=4
+    ),
+}
+
+
+def run_benchmarks(names: list, iterations: int) -> dict:
+    from django.conf import settings
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "iterations": iterations,
+            "pool_size": settings.TASK_RUNNER_POOL_SIZE,
+            "parallelism": settings.TASK_RUNNER_PARALLELISM,
+            "host_concurrency": settings.TASK_RUNNER_HOST_CONCURRENCY,
+        },
+        "scenarios": {},
+    }
+    for name in names:
+        # Warm-up: the first run starts the pool workers
+        SCENARIOS[name](1)
+        report["scenarios"][name] = SCENARIOS[name](iterations)
+    return report
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions against the baseline: latency above or throughput below baseline by more than tolerance."""
+    regressions = []
+    for name, current in report["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            if base[key] and current[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{name}.{key}: {current[key]} > {base[key]} (+{tolerance:.0%})")
+        if base["executions_per_sec"] and current["executions_per_sec"] < base["executions_per_sec"] / (1 + tolerance):
+            regressions.append(
+                f"{name}.executions_per_sec: {current['executions_per_sec']} < {base['executions_per_sec']} (-{tolerance:.0%})"
+            )
+    return regressions
+
+
+def print_report(report: dict) -> None:
+    header = f"{'scenario':<24}{'p50 ms':>10}{'p95 ms':>10}{'exec/s':>10}{'peak KB':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, row in report["scenarios"].items():
+        peak = row["peak_memory_kb"] if row["peak_memory_kb"] is not None else "-"
+        print(f"{name:<24}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['executions_per_sec']:>10}{peak:>10}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=30, help="runs per scenario")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="run only these scenarios")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write the report to --baseline")
+    parser.add_argument("--compare", action="store_true", help="fail if slower than --baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--output", type=Path, help="also write the JSON report here")
+    args = parser.parse_args(argv)
+
+    _setup_django()
+    report = run_benchmarks(args.scenario or list(SCENARIOS), args.iterations)
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline saved: {args.baseline}")
+    if args.compare:
+        if not args.baseline.exists():
+            print(f"No baseline at {args.baseline}", file=sys.stderr)
+            return 2
+        regressions = compare(report, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        if regressions:
+            print("Regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())